@@ -0,0 +1,117 @@
+"""
+This module provides the middleware that compresses the responses with gzip or deflate, as chosen
+from the Accept-Encoding header of the request.
+
+Only the responses sent in a single message and at least as large as the threshold are
+compressed. The streamed responses are sent as they are produced, and the packed codes are not
+compressed, because a Huffman encoding leaves little redundancy for deflate to remove.
+
+A strong ETag identifies the exact bytes of a body, so the compressed body gets the tag with the
+content coding as a suffix.
+"""
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.api.negotiation import choose_content_coding
+from app.config import COMPRESSION_LEVEL, COMPRESSION_MIN_SIZE
+
+INCOMPRESSIBLE_MEDIA_TYPES = ("application/octet-stream",)
+
+
+def compress(body: bytes, coding: str, level: int = COMPRESSION_LEVEL) -> bytes:
+    """
+    Compresses a body with a content coding.
+
+    Args:
+        body (bytes): The body.
+        coding (str): "gzip", or "deflate" for the zlib format.
+        level (int): The compression level, from 1 to 9.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if coding == "gzip" else 15)
+    return compressor.compress(body) + compressor.flush()
+
+
+def coded_etag(etag: str, coding: str) -> str:
+    """
+    Returns the entity tag of a compressed body.
+
+    Args:
+        etag (str): The entity tag of the body without compression.
+        coding (str): The content coding.
+
+    Returns:
+        str: The strong tag with the coding as a suffix, such as "abc-gzip", or the weak tag as
+             it is.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+class CompressionMiddleware:
+    """
+    Compresses the responses whose client accepts gzip or deflate.
+
+    Attributes:
+        app (ASGIApp): The application.
+        minimum_size (int): The smallest body that is compressed, in bytes.
+        level (int): The compression level, from 1 to 9.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 level: int = COMPRESSION_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = choose_content_coding(request_headers.get("accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+
+        async def send_compressed(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # The headers depend on the body, so they are sent with its first message.
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            media_type = headers.get("content-type", "").split(";")[0].strip()
+            if response_start["status"] == 304 and "etag" in headers:
+                # A 304 has no body, so its tag is the compressed one if the client has it.
+                etag = coded_etag(headers["etag"], coding)
+                if etag in request_headers.get("if-none-match", ""):
+                    headers["ETag"] = etag
+                    headers.add_vary_header("Accept-Encoding")
+            if message.get("more_body", False) or len(body) < self.minimum_size or \
+                    "content-encoding" in headers or media_type in INCOMPRESSIBLE_MEDIA_TYPES:
+                await send(response_start)
+                await send(message)
+                return
+
+            body = compress(body, coding, self.level)
+            headers["Content-Encoding"] = coding
+            if "etag" in headers:
+                headers["ETag"] = coded_etag(headers["etag"], coding)
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,81 @@
+"""
+Router of the metrics of the application, in the Prometheus text format.
+"""
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.api.response_cache import response_cache
+from app.core.lru_cache import LRUCache
+from app.core.metrics import CONTENT_TYPE, metrics
+from app.core.tokenizer import syllable_tokenizer
+from app.services.decoder_service import DECODERS
+from app.services.encoder_service import ENCODERS
+from app.services.execution import loop_lag_monitor
+
+metrics_router = APIRouter(prefix="", tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Returns the metrics of the server process, with the histograms recorded in the worker
+    processes.
+    """
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
+def _cache_series(caches: dict[str, LRUCache], field: str, label: str | None):
+    """
+    Returns a field of the statistics of the caches of every algorithm, or of the only cache
+    without labels.
+    """
+    return [({label: name} if label else {}, getattr(cache.cache_info(), field))
+            for name, cache in caches.items()]
+
+
+def _register_cache(prefix: str, caches: dict[str, LRUCache], description: str,
+                    label: str | None = "algorithm"):
+    """
+    Registers the statistics of the LRU caches of the algorithms.
+    """
+    metrics.register_callback(f"{prefix}_hits_total", f"Lookups found in the {description}.",
+                              lambda: _cache_series(caches, "hits", label), "counter")
+    metrics.register_callback(f"{prefix}_misses_total", f"Lookups not found in the {description}.",
+                              lambda: _cache_series(caches, "misses", label), "counter")
+    metrics.register_callback(f"{prefix}_evictions_total", f"Entries evicted from the {description}.",
+                              lambda: _cache_series(caches, "evictions", label), "counter")
+    metrics.register_callback(f"{prefix}_entries", f"Entries in the {description}.",
+                              lambda: _cache_series(caches, "currsize", label))
+    metrics.register_callback(f"{prefix}_bytes", f"Estimated size in bytes of the {description}.",
+                              lambda: _cache_series(caches, "currbytes", label))
+
+
+_register_cache("huffman_codebook_cache",
+                {name: encoder.codebook_cache for name, encoder in ENCODERS.items()
+                 if hasattr(encoder, "codebook_cache")},
+                "cache of codes by frequency histogram")
+_register_cache("huffman_decoder_cache",
+                {name: decoder.table_cache for name, decoder in DECODERS.items()
+                 if hasattr(decoder, "table_cache")},
+                "cache of decoding tables by encoding map")
+_register_cache("huffman_response_cache", {"responses": response_cache.entries},
+                "cache of responses by request", label=None)
+
+metrics.register_callback("huffman_tokenizer_cache_hits_total",
+                          "Words whose syllables were found in the cache.",
+                          lambda: [({}, syllable_tokenizer.cache_info().hits)], "counter")
+metrics.register_callback("huffman_tokenizer_cache_misses_total",
+                          "Words that were syllabified.",
+                          lambda: [({}, syllable_tokenizer.cache_info().misses)], "counter")
+metrics.register_callback("huffman_tokenizer_cache_entries",
+                          "Words in the cache of syllables.",
+                          lambda: [({}, syllable_tokenizer.cache_info().currsize)])
+metrics.register_callback("huffman_event_loop_lag_seconds",
+                          "Lag of the event loop: the last measure and the largest one.",
+                          lambda: [({"statistic": "last"}, loop_lag_monitor.last),
+                                   ({"statistic": "max"}, loop_lag_monitor.max)])
+metrics.register_callback("huffman_event_loop_lag_seconds_total",
+                          "Sum of the lags of the event loop measured.",
+                          lambda: [({}, loop_lag_monitor.total)], "counter")
+metrics.register_callback("huffman_event_loop_lag_measures_total",
+                          "Number of measures of the event loop lag.",
+                          lambda: [({}, loop_lag_monitor.count)], "counter")
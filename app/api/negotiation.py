@@ -0,0 +1,134 @@
+"""
+This module provides the content negotiation of the API: the choice of the representation of a
+response from the Accept and Accept-Encoding headers, and the fast serialization of the JSON
+responses.
+
+The JSON responses are serialized with orjson if it is installed, and with the serializer of
+Pydantic otherwise, instead of converting the model to plain objects and encoding them with the
+`json` module as FastAPI does for a route that returns a model.
+"""
+import json
+from pydantic import BaseModel
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+ENVELOPE_MEDIA_TYPE = "application/vnd.huffman.envelope"
+CONTENT_CODINGS = ("gzip", "deflate")
+
+
+def parse_qualities(header: str | None) -> dict[str, float]:
+    """
+    Reads the values of an Accept or Accept-Encoding header with their quality.
+
+    Args:
+        header (str): The header, or None.
+
+    Returns:
+        dict[str, float]: The quality of every value, in lowercase and without parameters. A value
+                          without a valid quality has a quality of 1.
+    """
+    qualities = {}
+    for item in (header or "").split(","):
+        value, *parameters = item.split(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, number = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = min(max(float(number), 0.0), 1.0)
+                except ValueError:
+                    pass
+        qualities[value] = quality
+    return qualities
+
+
+def _media_type_quality(qualities: dict[str, float], media_type: str) -> float:
+    """
+    Returns the quality of a media type, from its most specific match.
+    """
+    main_type = media_type.split("/")[0]
+    for candidate in (media_type, f"{main_type}/*", "*/*"):
+        if candidate in qualities:
+            return qualities[candidate]
+    return 0.0
+
+
+def choose_media_type(accept: str | None, offered: tuple[str, ...]) -> str:
+    """
+    Chooses the representation of a response from the Accept header.
+
+    Args:
+        accept (str): The Accept header, or None.
+        offered (tuple[str, ...]): The media types of the route, the default one first.
+
+    Returns:
+        str: The offered media type with the highest quality, or the first one if none is
+             acceptable or there is no header.
+    """
+    if not accept:
+        return offered[0]
+    qualities = parse_qualities(accept)
+    best = max(offered, key=lambda media_type: _media_type_quality(qualities, media_type))
+    return best if _media_type_quality(qualities, best) > 0 else offered[0]
+
+
+def choose_content_coding(accept_encoding: str | None) -> str | None:
+    """
+    Chooses the compression of a response from the Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header, or None.
+
+    Returns:
+        str: "gzip" or "deflate", whichever has the highest quality, or None to send the response
+             without compression.
+    """
+    qualities = parse_qualities(accept_encoding)
+    best = max(CONTENT_CODINGS, key=lambda coding: qualities.get(coding, qualities.get("*", 0.0)))
+    return best if qualities.get(best, qualities.get("*", 0.0)) > 0 else None
+
+
+def dump_json(model: BaseModel) -> bytes:
+    """
+    Serializes a model to JSON, without its fields set to None.
+
+    A text with lone surrogates is not valid UTF-8, so it is serialized with the `json` module,
+    which escapes them.
+
+    Args:
+        model (BaseModel): The model.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    try:
+        if orjson is not None:
+            return orjson.dumps(model.model_dump(exclude_none=True))
+        return model.model_dump_json(exclude_none=True).encode("utf-8")
+    except (TypeError, ValueError):
+        return json.dumps(model.model_dump(exclude_none=True), separators=(",", ":")).encode("ascii")
+
+
+def json_response(model: BaseModel, status_code: int = 200,
+                  headers: dict[str, str] | None = None) -> Response:
+    """
+    Serializes a response model to JSON, without its fields set to None.
+
+    Args:
+        model (BaseModel): The response model.
+        status_code (int): The status code of the response.
+        headers (dict[str, str]): The headers of the response, or None.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return Response(content=dump_json(model), status_code=status_code, headers=headers,
+                    media_type=JSON_MEDIA_TYPE)
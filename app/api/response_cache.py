@@ -0,0 +1,155 @@
+"""
+This module provides the cache of the responses of the encoding and decoding routes, with their
+strong entity tags and the answers to conditional requests.
+
+The same text is often encoded again and again: the demonstrations, the retries of the clients and
+the forms sent again by the page. The body of a response is kept in a cache bounded by its size
+in bytes, by a hash of the text and the options that give that body, so a repeated request is
+answered without encoding the text or rendering the template again.
+
+Every response has a strong ETag, a hash of its body. The routes only compute an encoding, so a
+request with an If-None-Match header that matches it is answered with 304 Not Modified and no
+body, as a GET request would be, whether the response was cached or not.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from fastapi import Response, status
+from app.api.compression import coded_etag
+from app.api.negotiation import CONTENT_CODINGS
+from app.config import RESPONSE_CACHE_BYTES
+from app.core.lru_cache import LRUCache, sizeof_mapping
+
+NOT_MODIFIED_HEADERS = ("cache-control", "etag", "vary")
+
+
+def cache_key(route: str, text: str, *options) -> bytes:
+    """
+    Calculates the key of a response: a hash of the text and the options that give it.
+
+    Args:
+        route (str): The name of the route.
+        text (str): The text of the request.
+        *options: The other fields of the request that change the response, such as the
+                  algorithm, separate_syllables and use_spanish_frequencies, and the media type.
+
+    Returns:
+        bytes: A 128-bit digest.
+    """
+    digest = hashlib.blake2b(repr((route,) + options).encode("utf-8", "surrogatepass"),
+                             digest_size=16)
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checks whether an If-None-Match header matches an entity tag, with the weak comparison of the
+    header. The tags of the compressed bodies match too. The routes are POST requests, which
+    create no resource, so "*" does not mean that the client has a representation and does not
+    match.
+
+    Args:
+        if_none_match (str): The If-None-Match header, or None.
+        etag (str): The strong entity tag of the body.
+
+    Returns:
+        bool: Whether the client already has the response.
+    """
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or any(coded_etag(etag, coding) in tags for coding in CONTENT_CODINGS)
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    """
+    Represents a successful response kept in the cache.
+
+    Attributes:
+        body (bytes): The body.
+        headers (dict[str, str]): The headers, with the content type and the ETag and without the
+                                  content length.
+        etag (str): The strong entity tag of the body, quoted.
+    """
+    body: bytes
+    headers: dict[str, str]
+    etag: str
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        """
+        Keeps the body and the headers of a response, and tags its body.
+
+        Args:
+            response (Response): The response.
+
+        Returns:
+            CachedResponse: The response to cache.
+        """
+        etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+        headers = {name: value for name, value in response.headers.items()
+                   if name != "content-length"}
+        headers["etag"] = etag
+        return cls(body=response.body, headers=headers, etag=etag)
+
+    def to_response(self, if_none_match: str | None = None) -> Response:
+        """
+        Builds the response to a request.
+
+        Args:
+            if_none_match (str): The If-None-Match header of the request, or None.
+
+        Returns:
+            Response: 304 Not Modified if the header matches the ETag, or the response.
+        """
+        if etag_matches(if_none_match, self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers={name: value for name, value in self.headers.items()
+                                     if name in NOT_MODIFIED_HEADERS})
+        return Response(content=self.body, headers=self.headers)
+
+
+def _sizeof_response(response: CachedResponse) -> int:
+    """
+    Estimates the size in bytes of a cached response.
+    """
+    return len(response.body) + sizeof_mapping(response.headers)
+
+
+class ResponseCache:
+    """
+    A cache of responses, by the hash of their request, bounded by the size of their bodies.
+
+    Attributes:
+        entries (LRUCache): The cached responses. A response larger than the capacity, or any
+                            response if the capacity is zero, is not cached but still tagged.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.entries = LRUCache(max_bytes, sizeof=_sizeof_response)
+
+    async def respond(self, key: bytes, if_none_match: str | None,
+                      produce: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Answers a request from the cache, or produces the response and caches it.
+
+        Args:
+            key (bytes): The key of the request, from `cache_key`.
+            if_none_match (str): The If-None-Match header of the request, or None.
+            produce (Callable): A coroutine function that produces the response, called only if
+                                the response is not cached. An exception is not cached.
+
+        Returns:
+            Response: The response, or 304 Not Modified if the client already has it.
+        """
+        cached = self.entries.get(key)
+        if cached is None:
+            cached = CachedResponse.from_response(await produce())
+            self.entries.put(key, cached)
+        return cached.to_response(if_none_match)
+
+
+response_cache = ResponseCache()
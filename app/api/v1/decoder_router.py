@@ -1,9 +1,19 @@
 """
 Module for the decode router.
 """
-from fastapi import APIRouter, Depends, status
-from app.dependencies import get_decoder_service
-from app.schemas import DecodeResponse, DecodeRequest
+import json
+import sys
+from typing import Annotated
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from app.api.negotiation import ENVELOPE_MEDIA_TYPE, json_response
+from app.api.response_cache import cache_key, response_cache
+from app.core.envelope import read_envelope
+from app.dependencies import (get_batch_service, get_block_service, get_decoder_service,
+                              get_binary_decoder_service)
+from app.exceptions import InvalidEncodingMap, InvalidEncodedText
+from app.schemas import DecodeBatchRequest, DecodeBatchResponse, DecodeResponse, DecodeRequest
+from app.services.batch_service import BatchService
+from app.services.block_service import BlockService
 
 decoder_router = APIRouter(prefix="/decoder", tags=["Decoder"])
 
@@ -14,16 +24,165 @@ decoder_router = APIRouter(prefix="/decoder", tags=["Decoder"])
                      response_model=DecodeResponse,
                      status_code=status.HTTP_200_OK)
 async def test(request: DecodeRequest,
-               service=Depends(get_decoder_service)):
+               service=Depends(get_decoder_service),
+               if_none_match: Annotated[str | None, Header()] = None):
     """
     Decode the given text.
 
     - **request**: The request to decode the text.
         - **encoded_text**: The text to decode.
         - **encoding_map**: The encoding map to use.
+        - **codebook**: The canonical codebook to use, in base64, if there is no encoding map.
+        - **pretrained**: The name of the pretrained codebook the text was encoded with, if there
+                          is no encoding map nor codebook.
+        - **pretrained_fingerprint**: The fingerprint of the pretrained codebook returned by the
+                                      encoder. The text is rejected if the codebook changed.
 
-    Returns the decoded text.
+    Returns the decoded text. The responses are cached by the encoded text and the model to decode
+    it, and have a strong ETag: a request whose If-None-Match header matches it gets 304 Not
+    Modified without a body.
 
     Raises an Exception if the encoding algorithm is unknown.
     """
-    return await service.decode(request.encoded_text, request.encoding_map)
+    async def decode():
+        return json_response(await service.decode(request.encoded_text, request.encoding_map,
+                                                  request.codebook, request.pretrained,
+                                                  request.pretrained_fingerprint))
+
+    key = cache_key("decoder", request.encoded_text, request.algorithm, request.encoding_map,
+                    request.codebook, request.pretrained, request.pretrained_fingerprint)
+    return await response_cache.respond(key, if_none_match, decode)
+
+
+@decoder_router.post("/batch",
+                     summary="Decode several texts",
+                     response_description="The decoded texts or their errors, in order",
+                     response_model=DecodeBatchResponse,
+                     response_model_exclude_none=True,
+                     status_code=status.HTTP_200_OK)
+async def decode_batch(request: DecodeBatchRequest,
+                       service: Annotated[BatchService, Depends(get_batch_service)]):
+    """
+    Decode several texts in a single request. The texts are decoded in parallel on a pool of
+    worker processes.
+
+    - **items**: The texts to decode. Every item has the same fields as a request to decode a
+                 single text.
+
+    Returns a result for every item, in the same order. A result has the response, as returned
+    when decoding a single text, or the error if the text could not be decoded. An error in an item,
+    including an invalid field, does not affect the others.
+    """
+    return json_response(DecodeBatchResponse(results=await service.decode(request.items)))
+
+
+@decoder_router.post("/binary",
+                     summary="Decode packed codes",
+                     response_description="The decoded text",
+                     response_model=DecodeResponse,
+                     openapi_extra={"requestBody": {
+                         "content": {"application/octet-stream": {}, ENVELOPE_MEDIA_TYPE: {}},
+                         "required": True}},
+                     status_code=status.HTTP_200_OK)
+async def decode_binary(request: Request,
+                        service=Depends(get_binary_decoder_service),
+                        start: Annotated[int | None, Query(ge=0)] = None,
+                        stop: Annotated[int | None, Query(ge=0)] = None,
+                        x_encoding_map: Annotated[str | None, Header()] = None,
+                        x_codebook: Annotated[str | None, Header()] = None,
+                        x_bit_length: Annotated[int | None, Header()] = None,
+                        x_padding: Annotated[int, Header()] = 0,
+                        x_offset_index: Annotated[str | None, Header()] = None,
+                        x_pretrained: Annotated[str | None, Header()] = None,
+                        x_pretrained_fingerprint: Annotated[str | None, Header()] = None):
+    """
+    Decode the codes packed into bytes, as returned by the encoder with the "binary" output
+    format, or the envelope returned by the encoder to a request that accepts
+    application/vnd.huffman.envelope.
+
+    - **body**: The packed codes, or the envelope if the Content-Type is
+                application/vnd.huffman.envelope. The envelope has the model, the offset index and
+                the number of bits, so the headers of the model, X-Offset-Index, X-Bit-Length
+                and X-Padding are not read.
+    - **algorithm**: The decoding algorithm to use, as a query parameter. Default is "huffman".
+    - **X-Encoding-Map**: The encoding map to use, as a JSON object. Not needed by the "adaptive"
+                          algorithm.
+    - **X-Codebook**: The canonical codebook to use, in base64, if there is no X-Encoding-Map.
+    - **X-Pretrained**: The name of the pretrained codebook to use, if there is no X-Encoding-Map
+                        nor X-Codebook.
+    - **X-Pretrained-Fingerprint**: The fingerprint of the pretrained codebook returned by the
+                                    encoder. The codes are rejected if the codebook changed.
+    - **X-Bit-Length**: The number of meaningful bits in the body. If it is missing, it is
+                        computed from the size of the body and X-Padding.
+    - **X-Padding**: The number of zero bits added to complete the last byte. Default is 0.
+    - **start**, **stop**: The first symbol and the symbol after the last one to decode, as query
+                           parameters. Default is all the symbols.
+    - **X-Offset-Index**: The offset index returned by the encoder, in base64. With it only the
+                          bits around the range of symbols are decoded.
+
+    Returns the decoded text, or the symbols of the range.
+
+    Raises an Exception if the encoding algorithm is unknown or the codes cannot be decoded.
+    """
+    data = await request.body()
+
+    encoding_map = None
+    content_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if content_type == ENVELOPE_MEDIA_TYPE:
+        envelope = read_envelope(data)
+        data, x_bit_length = envelope.packed.data, envelope.packed.bit_length
+        x_offset_index = envelope.packed.index
+        encoding_map = envelope.encoding_map
+        if envelope.codebook is not None:
+            encoding_map = dict(envelope.codebook.encoding_map)
+        x_codebook = None
+        x_pretrained = envelope.pretrained
+        x_pretrained_fingerprint = envelope.fingerprint.hex() if envelope.fingerprint else None
+    elif x_encoding_map is not None:
+        try:
+            encoding_map = json.loads(x_encoding_map)
+        except json.JSONDecodeError as exc:
+            raise InvalidEncodingMap() from exc
+        if not isinstance(encoding_map, dict) or \
+                not all(isinstance(code, str) for code in encoding_map.values()):
+            raise InvalidEncodingMap()
+    elif x_codebook is None and x_pretrained is None and not service.decoder.adaptive:
+        raise InvalidEncodingMap()
+
+    if x_bit_length is None:
+        x_bit_length = len(data) * 8 - x_padding
+    if x_bit_length < 0:
+        raise InvalidEncodedText()
+
+    symbol_range = None
+    if start is not None or stop is not None:
+        symbol_range = (start or 0, stop if stop is not None else sys.maxsize)
+
+    return json_response(await service.decode_packed(data, x_bit_length, encoding_map, x_codebook,
+                                                     symbol_range, x_offset_index, x_pretrained,
+                                                     x_pretrained_fingerprint))
+
+
+@decoder_router.post("/blocks",
+                     summary="Decompress a block container",
+                     response_description="The decoded text",
+                     response_model=DecodeResponse,
+                     openapi_extra={"requestBody": {
+                         "content": {"application/octet-stream": {}},
+                         "required": True}},
+                     status_code=status.HTTP_200_OK)
+async def decode_blocks(request: Request,
+                        service: Annotated[BlockService, Depends(get_block_service)]):
+    """
+    Decompress a block container, as returned by the encoder in block mode. The blocks are decoded
+    in parallel on a pool of worker processes, after their checksums are verified.
+
+    - **body**: The block container.
+
+    Returns the decoded text.
+
+    Raises an Exception if the container is invalid, a checksum does not match or a block cannot
+    be decoded.
+    """
+    text = await service.decompress(await request.body())
+    return json_response(DecodeResponse(decoded_text=text))
@@ -1,11 +1,28 @@
 """
 Module for the encode router.
 """
-from typing import Annotated
-from fastapi import APIRouter, Depends, status
-from app.dependencies import get_encoder_service
-from app.services.encoder_service import EncoderService
-from app.schemas import EncodeRequest, EncodeResponse
+import json
+from typing import Annotated, AsyncIterator
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from starlette.types import Receive, Scope, Send
+from app.api.negotiation import (ENVELOPE_MEDIA_TYPE, JSON_MEDIA_TYPE, choose_media_type,
+                                 json_response)
+from app.api.response_cache import cache_key, response_cache
+from app.config import BLOCK_SIZE, MAX_HEADER_BYTES
+from app.core.codebook import Codebook
+from app.core.envelope import write_envelope
+from app.core.metrics import metrics
+from app.dependencies import (get_batch_service, get_block_service, get_encoder_service,
+                              get_stream_encoder_service)
+from app.exceptions import HeaderTooLarge, InvalidOptions, InvalidText
+from app.services.batch_service import BatchService
+from app.services.block_service import BlockService, MIN_BLOCK_SIZE
+from app.core.pretrained import registry
+from app.services.encoder_service import (EncoderService, STREAM_CHUNK_SIZE, serialize_codebook,
+                                          serialize_offset_index)
+from app.schemas import EncodeBatchRequest, EncodeBatchResponse, EncodeRequest, EncodeResponse
 
 encoder_router = APIRouter(prefix="/encoder", tags=["Encoder"])
 
@@ -14,21 +31,287 @@ encoder_router = APIRouter(prefix="/encoder", tags=["Encoder"])
                      summary="Encode text",
                      response_description="The encoded text and the encoding map",
                      response_model=EncodeResponse,
+                     response_model_exclude_none=True,
+                     responses={status.HTTP_200_OK: {
+                         "content": {"application/octet-stream": {}, ENVELOPE_MEDIA_TYPE: {}},
+                         "description": "The packed codes when output_format is \"binary\", or "
+                                        "the envelope when it is accepted"}},
                      status_code=status.HTTP_200_OK)
 async def test(request: EncodeRequest,
-               service: Annotated[EncoderService, Depends(get_encoder_service)]):
+               service: Annotated[EncoderService, Depends(get_encoder_service)],
+               accept: Annotated[str | None, Header()] = None,
+               if_none_match: Annotated[str | None, Header()] = None):
     """
     Encode the given text.
 
     - **request**: The request to encode the text.
         - **algorithm**: The encoding algorithm to use. Default is "huffman".
-        - **separate_syllables**: Whether to separate the syllables in the encoded text. Default is 
+        - **separate_syllables**: Whether to separate the syllables in the encoded text. Default is
                                   False.
+        - **use_spanish_frequencies**: Whether to use the letter frequency in Spanish instead of the
+                                       frequency of the symbols in the text. Default is False.
+        - **output_format**: "text" to return the codes separated by spaces, or "binary" to
+                             download the codes packed into bytes. Default is "text".
+        - **canonical**: Whether to use canonical codes and return the compact codebook, in base64,
+                         instead of the encoding map. Default is False.
+        - **max_code_length**: The maximum length of the codes. If the Huffman codes are longer,
+                               optimal length-limited canonical codes are used instead, and the
+                               response includes the compression cost of the limit. Default is
+                               no limit.
+        - **index_interval**: With the "binary" output format or the envelope, the number of
+                              symbols between the checkpoints of an offset index, which lets the
+                              decoder decode a range of symbols without decoding the symbols
+                              before it. Default is no index.
+        - **pretrained**: The name of a pretrained codebook, as listed by GET /encoder/pretrained.
+                          The text is separated with the tokenizer of the codebook and encoded
+                          with its codes, without counting the frequencies of its symbols, and
+                          the response has the name instead of the encoding map. It cannot be
+                          combined with use_spanish_frequencies or max_code_length. Default is
+                          none.
         - **text**: The text to encode.
 
-    Returns the encoded text and the encoding map.
+    Returns the encoded text and the encoding map, or the codebook with canonical codes. With the
+    "binary" output format the body is the packed codes, and the encoding map (or the codebook, or
+    the name of the pretrained codebook), the number of bits and the padding are sent in the
+    X-Encoding-Map (or X-Codebook, or X-Pretrained), X-Bit-Length and X-Padding headers, the
+    compression cost in the X-Compression-Cost header, and the offset index, in base64, in the
+    X-Offset-Index header. The encoding map grows with the alphabet and the offset index with the
+    text, so a header larger than HUFFMAN_MAX_HEADER_BYTES is rejected; the envelope carries them
+    in the body instead.
+
+    With the "text" output format, a client that prefers "application/vnd.huffman.envelope" in its
+    Accept header gets a binary envelope instead of the JSON response: the encoding map (or the
+    codebook, or the name of the pretrained codebook) and the packed codes in a single body, which
+    POST /decoder/binary decodes when it is sent with that Content-Type. The envelope has no compression cost.
+
+    The responses are cached by the text and the options, and have a strong ETag: a request whose
+    If-None-Match header matches it gets 304 Not Modified without a body.
 
     Raises an Exception if the encoding algorithm is unknown.
     """
+    media_type = choose_media_type(accept, (JSON_MEDIA_TYPE, ENVELOPE_MEDIA_TYPE))
+    key = cache_key("encoder", request.text, request.algorithm, request.separate_syllables,
+                    request.use_spanish_frequencies, request.canonical, request.max_code_length,
+                    request.pretrained, request.output_format, request.index_interval, media_type)
+    return await response_cache.respond(key, if_none_match,
+                                        lambda: _encode(request, service, media_type))
+
+
+async def _encode(request: EncodeRequest, service: EncoderService, media_type: str) -> Response:
+    """
+    Encodes the text of a request into the response of the chosen representation.
+    """
+    if request.index_interval is not None and request.output_format != "binary" and \
+            media_type != ENVELOPE_MEDIA_TYPE:
+        raise InvalidOptions()
+
+    if request.output_format == "binary":
+        enc_map, packed = await service.encode_packed(request.text,
+                                                      request.separate_syllables,
+                                                      request.use_spanish_frequencies,
+                                                      request.canonical,
+                                                      request.max_code_length,
+                                                      request.index_interval,
+                                                      request.pretrained)
+        headers = {"Content-Disposition": 'attachment; filename="encoded.bin"',
+                   "X-Bit-Length": str(packed.bit_length),
+                   "X-Padding": str(packed.padding)}
+        if request.pretrained is not None:
+            headers["X-Pretrained"] = request.pretrained
+            headers["X-Pretrained-Fingerprint"] = enc_map.fingerprint.hex()
+        elif request.canonical:
+            headers["X-Codebook"] = serialize_codebook(enc_map.map)
+        else:
+            headers["X-Encoding-Map"] = json.dumps(dict(enc_map.map))
+        if packed.index is not None:
+            headers["X-Offset-Index"] = serialize_offset_index(packed.index)
+        if packed.compression_cost is not None:
+            headers["X-Compression-Cost"] = repr(packed.compression_cost)
+        # The encoding map grows with the alphabet and the index with the text, and a server or
+        # a proxy rejects the headers past a few kilobytes.
+        if any(len(value) > MAX_HEADER_BYTES for value in headers.values()):
+            raise HeaderTooLarge()
+        return Response(content=packed.data,
+                        media_type="application/octet-stream",
+                        headers=headers)
+
+    if media_type == ENVELOPE_MEDIA_TYPE:
+        enc_map, packed = await service.encode_packed(request.text,
+                                                      request.separate_syllables,
+                                                      request.use_spanish_frequencies,
+                                                      request.canonical,
+                                                      request.max_code_length,
+                                                      request.index_interval,
+                                                      request.pretrained)
+        with metrics.stage("encode", "serialize"):
+            if request.pretrained is not None:
+                data = write_envelope(packed, pretrained=request.pretrained,
+                                      fingerprint=enc_map.fingerprint)
+            elif request.canonical:
+                data = write_envelope(packed, codebook=Codebook.from_encoding_map(enc_map.map))
+            else:
+                data = write_envelope(packed, enc_map.map)
+        return Response(content=data, media_type=ENVELOPE_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+    response = await service.encode(request.text,
+                                    request.separate_syllables,
+                                    request.use_spanish_frequencies,
+                                    request.canonical,
+                                    request.max_code_length,
+                                    request.pretrained)
+    # The representation is chosen from the Accept header, so a shared cache must not send the
+    # JSON response to a client that asked for the envelope.
+    return json_response(response, headers={"Vary": "Accept"})
+
+
+@encoder_router.get("/pretrained",
+                    summary="List the pretrained codebooks",
+                    response_description="The names of the pretrained codebooks",
+                    response_model=list[str],
+                    status_code=status.HTTP_200_OK)
+async def list_pretrained():
+    """
+    List the names of the pretrained codebooks that a text can be encoded with.
+    """
+    return registry.names()
+
+
+@encoder_router.post("/batch",
+                     summary="Encode several texts",
+                     response_description="The encoded texts or their errors, in order",
+                     response_model=EncodeBatchResponse,
+                     response_model_exclude_none=True,
+                     status_code=status.HTTP_200_OK)
+async def encode_batch(request: EncodeBatchRequest,
+                       service: Annotated[BatchService, Depends(get_batch_service)]):
+    """
+    Encode several texts in a single request. The texts are encoded in parallel on a pool of
+    worker processes.
+
+    - **items**: The texts to encode. Every item has the same fields as a request to encode a
+                 single text, except the output format.
+
+    Returns a result for every item, in the same order. A result has the response, as returned
+    when encoding a single text, or the error if the text could not be encoded. An error in an item,
+    including an invalid field, does not affect the others.
+    """
+    return json_response(EncodeBatchResponse(results=await service.encode(request.items)))
+
+
+@encoder_router.post("/blocks",
+                     summary="Compress a text in blocks",
+                     response_description="The block container",
+                     response_class=Response,
+                     responses={status.HTTP_200_OK: {"content": {"application/octet-stream": {}}}},
+                     openapi_extra={"requestBody": {
+                         "content": {"text/plain": {}, "application/octet-stream": {}},
+                         "required": True}},
+                     status_code=status.HTTP_200_OK)
+async def encode_blocks(request: Request,
+                        service: Annotated[BlockService, Depends(get_block_service)],
+                        block_size: Annotated[int, Query(ge=MIN_BLOCK_SIZE)] = BLOCK_SIZE,
+                        shared_codebook: bool = False):
+    """
+    Compress a large UTF-8 text, sent as the request body, in blocks that are encoded in parallel
+    on a pool of worker processes. The characters are the symbols.
+
+    - **block_size**: The number of characters of every block, as a query parameter. Default is
+                      1048576, and the minimum is 1024.
+    - **shared_codebook**: Whether all the blocks use the codebook of the whole text instead of
+                           their own, as a query parameter. Default is False.
+
+    Returns the block container: a header, a table with the size, the number of bits, the number
+    of characters and the CRC-32 of every block, and the blocks, each one with its canonical
+    codebook unless it is shared. The number of blocks is also sent in the X-Block-Count header.
+
+    Raises an Exception if the text is not valid UTF-8.
+    """
+    try:
+        text = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise InvalidText() from exc
+
+    data = await service.compress(text, block_size, shared_codebook)
+    headers = {"Content-Disposition": 'attachment; filename="encoded.hufb"',
+               "X-Block-Count": str(-(-len(text) // block_size))}
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
+
+
+@encoder_router.post("/stream",
+                     summary="Encode a text stream",
+                     response_description="The codebook header and the packed codes",
+                     response_class=StreamingResponse,
+                     responses={status.HTTP_200_OK: {"content": {"application/octet-stream": {}}}},
+                     openapi_extra={"requestBody": {
+                         "content": {"text/plain": {},
+                                     "application/octet-stream": {},
+                                     "multipart/form-data": {"schema": {
+                                         "type": "object",
+                                         "properties": {"file": {"type": "string",
+                                                                 "format": "binary"}}}}},
+                         "required": True}},
+                     status_code=status.HTTP_200_OK)
+async def encode_stream(request: Request,
+                        service: Annotated[EncoderService, Depends(get_stream_encoder_service)],
+                        separate_syllables: bool = False,
+                        use_spanish_frequencies: bool = False):
+    """
+    Encode a UTF-8 text sent as the request body, which may use chunked transfer encoding, or as
+    the "file" field of a multipart form. The memory used does not depend on the size of the text.
+
+    - **algorithm**: The encoding algorithm to use, as a query parameter. Default is "huffman".
+    - **separate_syllables**: Whether to separate the syllables, as a query parameter. Default is
+                              False.
+    - **use_spanish_frequencies**: Whether to use the letter frequency in Spanish, as a query
+                                   parameter. Default is False.
+
+    Returns a stream with the canonical codebook header, the number of meaningful bits as a varint,
+    and the packed codes. The number of bits is also sent in the X-Bit-Length header. With the
+    "adaptive" algorithm the text is encoded as it arrives, and the stream is only the packed codes
+    followed by an end mark.
 
-    return await service.encode(request.text, request.separate_syllables)
+    Raises an Exception if the text is not valid UTF-8. With the "adaptive" algorithm, only the
+    first chunk is checked before the response starts: if a later chunk is not valid UTF-8, the
+    stream ends with an abort mark instead of the end mark, which the decoder rejects.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="The file field is required")
+        chunks = _read_upload(upload)
+    else:
+        chunks = request.stream()
+
+    bit_length, stream = await service.encode_stream(chunks,
+                                                     separate_syllables,
+                                                     use_spanish_frequencies)
+    headers = {"Content-Disposition": 'attachment; filename="encoded.huf"'}
+    if bit_length is None:
+        # The text is still being read while the codes are sent.
+        return _DuplexStreamingResponse(stream, media_type="application/octet-stream",
+                                        headers=headers)
+    headers["X-Bit-Length"] = str(bit_length)
+    return StreamingResponse(stream, media_type="application/octet-stream", headers=headers)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    A streaming response that is sent while the request body is read. StreamingResponse listens
+    for the disconnection of the client while it sends the body, and that would take the chunks of
+    the request body.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _read_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+    """
+    Reads an uploaded file in chunks.
+    """
+    while data := await upload.read(STREAM_CHUNK_SIZE):
+        yield data
@@ -1,12 +1,20 @@
 """
 Module for the views router.
 """
+import asyncio
 from typing import Optional, Annotated
-from fastapi import APIRouter, Request, Form, Depends
+from fastapi import APIRouter, Request, Form, Depends, Header, WebSocket, WebSocketDisconnect, \
+    status
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from pydantic import ValidationError
+from app.api.negotiation import dump_json
+from app.api.response_cache import cache_key, response_cache
 from app.dependencies import get_huffman_enc_service
+from app.schemas import EncodingSessionUpdate
 from app.services.encoder_service import EncoderService
+from app.services.execution import get_thread_executor
+from app.services.session_service import EncodingSession
 
 views_router = APIRouter(prefix="", tags=["Views"])
 
@@ -27,17 +35,55 @@ async def huffman_coding(request: Request,
                          text: Optional[str] = Form(None),
                          separate_syllables: bool = Form(
                              False, alias="separate-syllables"),
-                         use_spanish_frequencies: bool = Form(False, alias="use-spanish-frequencies")):
+                         use_spanish_frequencies: bool = Form(False, alias="use-spanish-frequencies"),
+                         if_none_match: Annotated[str | None, Header()] = None):
     """
-    Returns the result of the Huffman coding algorithm.
+    Returns the result of the Huffman coding algorithm. The rendered results are cached by the
+    text and the options.
     """
     if not text:
         text = ""
 
-    enc_response = await service.encode(text, separate_syllables, use_spanish_frequencies)
+    async def render():
+        enc_response = await service.encode(text, separate_syllables, use_spanish_frequencies)
+        return templates.TemplateResponse(
+            request=request,
+            name="huffman_coding_result.html",
+            context={"encoded_text": enc_response.encoded_text,
+                     "encoding_map": enc_response.encoding_map})
 
-    return templates.TemplateResponse(
-        request=request,
-        name="huffman_coding_result.html",
-        context={"encoded_text": enc_response.encoded_text,
-                 "encoding_map": enc_response.encoding_map})
+    key = cache_key("huffman-coding", text, service.algorithm, separate_syllables,
+                    use_spanish_frequencies)
+    return await response_cache.respond(key, if_none_match, render)
+
+
+@views_router.websocket("/huffman-coding/ws")
+async def huffman_coding_session(websocket: WebSocket,
+                                 service: Annotated[EncoderService,
+                                                    Depends(get_huffman_enc_service)]):
+    """
+    Encodes the text of the page as it is edited. Every message has the whole text and the
+    options, and the answer has only the changes of the encoding map and the encoded text.
+    """
+    await websocket.accept()
+    session = EncodingSession(service.encoder)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                update = EncodingSessionUpdate.model_validate_json(await websocket.receive_text())
+            except (ValidationError, KeyError):
+                # A binary message has no text.
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+            args = (update.text, update.separate_syllables, update.use_spanish_frequencies)
+            # The session keeps its state in this process, so it never runs in a worker process.
+            executor = None if service.backend.select(len(update.text)) == "inline" else \
+                get_thread_executor()
+            if executor is None:
+                diff = session.update(*args)
+            else:
+                diff = await loop.run_in_executor(executor, session.update, *args)
+            await websocket.send_text(dump_json(diff).decode("utf-8"))
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,251 @@
+"""
+This module provides the command-line interface, which compresses large local files without the
+web application and trains the pretrained codebooks:
+
+    python -m app.cli compress INPUT OUTPUT [--window BYTES]
+    python -m app.cli decompress INPUT OUTPUT
+    python -m app.cli train NAME CORPUS... [--tokenizer NAME] [--max-code-length BITS]
+                                           [--output DIRECTORY]
+
+The bytes of the file are the symbols. The input is read through a memory map, one window at a
+time: a first pass counts the bytes of every window, and a second one packs the codes of every
+window with the codebook of the whole file and writes them to the output. The output is a block
+container with a shared codebook and a block per window, so the memory used depends on the size
+of the window and not on the size of the file, and the windows are decoded one at a time too.
+
+The throughput and the peak resident memory of the process are reported on the standard error.
+
+A codebook is trained from the UTF-8 files of a corpus, where the bytes that are not valid UTF-8
+are replaced, and written to the directory of the pretrained codebooks of the application.
+"""
+import argparse
+import mmap
+import os
+import resource
+import sys
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+from app.config import BLOCK_SIZE, PRETRAINED_DIR
+from app.core import vectorized
+from app.core.block_container import Block, decode_block, read_container, write_header
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.core.pretrained import TOKENIZERS, PretrainedRegistry, train
+from app.exceptions import ERROR_DETAILS, CustomException, InvalidContainer, InvalidEncodedText
+
+
+@contextmanager
+def _map_file(file: BinaryIO) -> Iterator[bytes]:
+    """
+    Maps a file to memory for reading. An empty file cannot be mapped, so it is read as no bytes.
+    """
+    file.seek(0, 2)
+    if file.tell() == 0:
+        yield b""
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+def _count_bytes(window: bytes) -> list[int]:
+    """
+    Counts the bytes of a window, with NumPy if it is available.
+    """
+    if vectorized.AVAILABLE:
+        return vectorized.count_bytes(window)
+    counts = Counter(window)
+    return [counts[value] for value in range(256)]
+
+
+def compress_file(source: BinaryIO, target: BinaryIO, window: int = BLOCK_SIZE,
+                  encoder: HuffmanEncoder | None = None) -> int:
+    """
+    Compresses a file into a block container.
+
+    The sizes of the payloads are known from the counts of the first pass, so the header is
+    written before the payloads and written again with their CRC-32 values at the end.
+
+    Args:
+        source (BinaryIO): The file to compress, opened for reading in binary mode.
+        target (BinaryIO): The file of the container, opened for writing in binary mode. It must
+                           be seekable.
+        window (int): The number of bytes of every window.
+        encoder (HuffmanEncoder): The encoder, or None to create one.
+
+    Returns:
+        int: The number of bytes of the input.
+    """
+    encoder = encoder or HuffmanEncoder()
+    with _map_file(source) as data:
+        starts = range(0, len(data), window)
+        counts = [_count_bytes(data[start:start + window]) for start in starts]
+
+        # The bytes are added in order, so the codebook of a file is always the same.
+        frequencies = {chr(value): sum(window_counts[value] for window_counts in counts)
+                       for value in range(256)}
+        frequencies = {char: count for char, count in frequencies.items() if count}
+        codebook = encoder.build_codebook(frequencies) if frequencies else None
+        encoding_map = codebook.encoding_map if codebook is not None else {}
+
+        lengths = [len(encoding_map.get(chr(value), "")) for value in range(256)]
+        blocks = []
+        for window_counts in counts:
+            bit_length = sum(map(int.__mul__, window_counts, lengths))
+            blocks.append(Block(size=-(-bit_length // 8), bit_length=bit_length,
+                                symbols=sum(window_counts), crc=0))
+
+        target.write(write_header(window, blocks, codebook))
+        for start, block in zip(starts, blocks):
+            packed = encoder.pack_text(data[start:start + window].decode("latin-1"),
+                                       encoding_map)
+            block.crc = zlib.crc32(packed.data)
+            target.write(packed.data)
+        target.seek(0)
+        target.write(write_header(window, blocks, codebook))
+        return len(data)
+
+
+def decompress_file(source: BinaryIO, target: BinaryIO,
+                    decoder: HuffmanDecoder | None = None) -> int:
+    """
+    Decompresses a block container written by `compress_file`, a block at a time.
+
+    Args:
+        source (BinaryIO): The file of the container, opened for reading in binary mode.
+        target (BinaryIO): The decompressed file, opened for writing in binary mode.
+        decoder (HuffmanDecoder): The decoder, or None to create one.
+
+    Returns:
+        int: The number of bytes of the output.
+
+    Raises:
+        InvalidContainer: If the container cannot be read, a checksum does not match or its
+                          symbols are not bytes.
+        InvalidCodebook: If the codebook of a block cannot be read.
+        InvalidEncodedText: If the codes of a block cannot be decoded.
+    """
+    decoder = decoder or HuffmanDecoder()
+    size = 0
+    with _map_file(source) as data:
+        container = read_container(data)
+        for payload, block in zip(container.iter_payloads(data), container.blocks):
+            text = decode_block(decoder, payload, block.bit_length, container.codebook)
+            if len(text) != block.symbols:
+                raise InvalidEncodedText()
+            try:
+                size += target.write(text.encode("latin-1"))
+            except UnicodeEncodeError as exc:
+                # A container of the web application may have characters that are not bytes.
+                raise InvalidContainer() from exc
+    return size
+
+
+def train_codebook(name: str, corpus: list[str], tokenizer: str, directory: str = PRETRAINED_DIR,
+                   max_code_length: int | None = None) -> str:
+    """
+    Trains a pretrained codebook from the files of a corpus and writes it to a directory.
+
+    Args:
+        name (str): The name of the codebook.
+        corpus (list[str]): The paths of the files of the corpus.
+        tokenizer (str): The name of the tokenizer, one of TOKENIZERS.
+        directory (str): The directory of the pretrained codebooks.
+        max_code_length (int): The maximum code length, or None for no limit.
+
+    Returns:
+        str: The path of the codebook.
+
+    Raises:
+        InvalidMaxCodeLength: If the maximum code length is too short for the symbols.
+    """
+    def texts() -> Iterator[str]:
+        for path in corpus:
+            with open(path, encoding="utf-8", errors="replace") as file:
+                yield file.read()
+
+    return PretrainedRegistry(directory).save(train(name, tokenizer, texts(),
+                                                    max_code_length=max_code_length))
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident memory of the process, in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports the peak in kilobytes and macOS in bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Runs a command and reports its throughput and the peak resident memory.
+
+    Args:
+        argv (list[str]): The arguments, or None to read them from the command line.
+
+    Returns:
+        int: The exit status: 0 on success and 1 if the input cannot be read or decoded.
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    compress = commands.add_parser("compress", help="compress a file into a block container")
+    compress.add_argument("input")
+    compress.add_argument("output")
+    compress.add_argument("--window", type=int, default=BLOCK_SIZE,
+                          help=f"bytes of every window and block (default {BLOCK_SIZE})")
+    decompress = commands.add_parser("decompress", help="decompress a block container")
+    decompress.add_argument("input")
+    decompress.add_argument("output")
+    trainer = commands.add_parser("train", help="train a pretrained codebook from a corpus")
+    trainer.add_argument("name")
+    trainer.add_argument("corpus", nargs="+")
+    trainer.add_argument("--tokenizer", choices=TOKENIZERS, default="characters",
+                         help="how the texts are separated into symbols (default characters)")
+    trainer.add_argument("--max-code-length", type=int, default=None,
+                         help="maximum length of the codes, in bits (default no limit)")
+    trainer.add_argument("--output", default=PRETRAINED_DIR,
+                         help=f"directory of the codebooks (default {PRETRAINED_DIR})")
+    args = parser.parse_args(argv)
+    if args.command == "compress" and args.window < 1:
+        parser.error("the window must be at least 1 byte")
+    if args.command == "train" and (os.path.basename(args.name) != args.name or
+                                    args.name.startswith(".")):
+        parser.error("the name must be a file name")
+
+    start = time.perf_counter()
+    try:
+        if args.command == "train":
+            path = train_codebook(args.name, args.corpus, args.tokenizer, args.output,
+                                  args.max_code_length)
+            print(f"train: {sum(map(os.path.getsize, args.corpus))} bytes of corpus -> "
+                  f"{os.path.getsize(path)} bytes in {path} in "
+                  f"{time.perf_counter() - start:.2f} s", file=sys.stderr)
+            return 0
+        with open(args.input, "rb") as source, open(args.output, "wb") as target:
+            if args.command == "compress":
+                compress_file(source, target, args.window)
+            else:
+                decompress_file(source, target)
+    except CustomException as exc:
+        print(f"error: {ERROR_DETAILS[type(exc)]}", file=sys.stderr)
+        return 1
+    except OSError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    seconds = time.perf_counter() - start
+
+    input_size, output_size = os.path.getsize(args.input), os.path.getsize(args.output)
+    # The throughput is measured on the uncompressed size in both directions.
+    size = input_size if args.command == "compress" else output_size
+    print(f"{args.command}: {input_size} -> {output_size} bytes in {seconds:.2f} s, "
+          f"{size / max(seconds, 1e-9) / 1e6:.1f} MB/s, peak RSS {peak_rss() / 1e6:.1f} MB",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+This module reads the settings of the application from environment variables.
+"""
+import os
+
+
+def _int_from_env(name: str, default: int) -> int:
+    """
+    Reads an integer setting from an environment variable.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (int): The value used if the variable is not set.
+
+    Returns:
+        int: The value of the setting.
+
+    Raises:
+        ValueError: If the variable is not an integer.
+    """
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def _float_from_env(name: str, default: float) -> float:
+    """
+    Reads a decimal setting from an environment variable.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (float): The value used if the variable is not set.
+
+    Returns:
+        float: The value of the setting.
+
+    Raises:
+        ValueError: If the variable is not a number.
+    """
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def _str_from_env(name: str, default: str, choices: tuple[str, ...]) -> str:
+    """
+    Reads a setting with a fixed set of values from an environment variable.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (str): The value used if the variable is not set.
+        choices (tuple[str, ...]): The valid values.
+
+    Returns:
+        str: The value of the setting, in lowercase.
+
+    Raises:
+        ValueError: If the value is not one of the choices.
+    """
+    value = os.environ.get(name, "").strip().lower() or default
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}")
+    return value
+
+
+def _bool_from_env(name: str, default: bool) -> bool:
+    """
+    Reads an on/off setting from an environment variable.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (bool): The value used if the variable is not set.
+
+    Returns:
+        bool: The value of the setting.
+
+    Raises:
+        ValueError: If the value is not one of 1, 0, true, false, yes, no, on or off.
+    """
+    value = os.environ.get(name, "").strip().lower()
+    if value == "":
+        return default
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+CODEBOOK_CACHE_BYTES = _int_from_env("HUFFMAN_CODEBOOK_CACHE_BYTES", 16 << 20)
+VECTORIZE_MIN_SIZE = _int_from_env("HUFFMAN_VECTORIZE_MIN_SIZE", 1 << 14)
+DECODER_CACHE_BYTES = _int_from_env("HUFFMAN_DECODER_CACHE_BYTES", 32 << 20)
+PROCESS_WORKERS = _int_from_env("HUFFMAN_PROCESS_WORKERS", os.cpu_count() or 1)
+THREAD_WORKERS = _int_from_env("HUFFMAN_THREAD_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+EXECUTION_BACKEND = _str_from_env("HUFFMAN_EXECUTION_BACKEND", "auto",
+                                  ("auto", "inline", "thread", "process"))
+INLINE_MAX_SIZE = _int_from_env("HUFFMAN_INLINE_MAX_SIZE", 1 << 14)
+PROCESS_MIN_SIZE = _int_from_env("HUFFMAN_PROCESS_MIN_SIZE", 1 << 20)
+LOOP_LAG_INTERVAL = _float_from_env("HUFFMAN_LOOP_LAG_INTERVAL", 0.5)
+LOOP_LAG_WARNING = _float_from_env("HUFFMAN_LOOP_LAG_WARNING", 0.1)
+BATCH_MAX_ITEMS = _int_from_env("HUFFMAN_BATCH_MAX_ITEMS", 10000)
+BLOCK_SIZE = _int_from_env("HUFFMAN_BLOCK_SIZE", 1 << 20)
+METRICS_ENABLED = _bool_from_env("HUFFMAN_METRICS_ENABLED", True)
+PRETRAINED_DIR = os.environ.get("HUFFMAN_PRETRAINED_DIR", "").strip() or \
+    os.path.join(os.path.dirname(__file__), "pretrained")
+COMPRESSION_MIN_SIZE = _int_from_env("HUFFMAN_COMPRESSION_MIN_SIZE", 1 << 10)
+COMPRESSION_LEVEL = _int_from_env("HUFFMAN_COMPRESSION_LEVEL", 1)
+RESPONSE_CACHE_BYTES = _int_from_env("HUFFMAN_RESPONSE_CACHE_BYTES", 32 << 20)
+MAX_HEADER_BYTES = _int_from_env("HUFFMAN_MAX_HEADER_BYTES", 4 << 10)
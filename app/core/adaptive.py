@@ -0,0 +1,507 @@
+"""
+This module provides the adaptive Huffman coding of the FGK algorithm: the `AdaptiveHuffmanTree`
+model, and the `AdaptiveHuffmanEncoder` and `AdaptiveHuffmanDecoder` that encode and decode in a
+single pass, without sending an encoding map.
+
+The encoder and the decoder start with the same empty tree and update it after every symbol, so
+they always agree on the codes. A symbol seen for the first time is sent as the code of the NYT
+("not yet transmitted") leaf followed by the symbol itself: the number of bytes of its UTF-8 form as
+a varint and those bytes. The NYT code followed by a length of zero marks the end of a stream, and
+followed by the single byte ABORT_MARK, which is never valid UTF-8, marks a stream that the encoder
+stopped because the rest of its text was not valid UTF-8.
+"""
+from typing import Iterable, Iterator
+from .bitstream import BitWriter, encode_varint
+from .containers import UnencodedSymbols, EncodedSymbols, EncodingMap, PackedSymbols
+from .decoder import Decoder
+from .encoder import Encoder
+from .metrics import metrics
+from app.exceptions import InvalidEncodedText, InvalidOptions, InvalidText
+
+END_OF_STREAM = ""
+ABORT_MARK = b"\xff"
+
+
+class AdaptiveHuffmanTree:
+    """
+    A Huffman tree that is updated after every symbol with the FGK algorithm.
+
+    The nodes are stored in parallel lists, in decreasing order of their FGK numbers, so the root is
+    the node 0 and the weights never increase along the lists (the sibling property). To update the
+    tree, every node from the leaf of the symbol up to the root is swapped with the first node of
+    the lists with its weight, unless that node is its parent, and its weight is incremented. A new
+    symbol splits the NYT leaf, which is always the last node, into an internal node whose left
+    child is the new NYT leaf and whose right child is the leaf of the symbol.
+
+    The nodes with the same weight are consecutive, so the first node of every weight, the leader
+    of its block, is kept in a dictionary and found in constant time, however many nodes share
+    the weight.
+
+    The left branches are "0" and the right branches are "1".
+    """
+
+    def __init__(self):
+        self._weight = [0]
+        self._parent = [-1]
+        self._left = [-1]
+        self._right = [-1]
+        self._symbol = [None]
+        self._leaves = {}
+        self._leaders = {0: 0}
+        self._nyt = 0
+
+    def __len__(self) -> int:
+        """
+        The number of distinct symbols in the tree.
+        """
+        return len(self._leaves)
+
+    def _code(self, node: int) -> str:
+        """
+        Returns the code of a node, walking from the node up to the root.
+        """
+        parent, left = self._parent, self._left
+        bits = []
+        while (up := parent[node]) != -1:
+            bits.append("0" if left[up] == node else "1")
+            node = up
+        return "".join(reversed(bits))
+
+    def _add(self, symbol: str) -> int:
+        """
+        Splits the NYT leaf to add the leaf of a new symbol, with weight 0.
+
+        Returns:
+            int: The node of the new leaf.
+        """
+        old = self._nyt
+        leaf, nyt = len(self._weight), len(self._weight) + 1
+        self._weight += (0, 0)
+        self._parent += (old, old)
+        self._left += (-1, -1)
+        self._right += (-1, -1)
+        self._symbol += (symbol, None)
+        self._left[old], self._right[old] = nyt, leaf
+        self._leaves[symbol] = leaf
+        self._nyt = nyt
+        return leaf
+
+    def _swap(self, a: int, b: int):
+        """
+        Exchanges the subtrees of two nodes with the same weight, keeping their positions.
+        """
+        left, right, symbol, parent = self._left, self._right, self._symbol, self._parent
+        left[a], left[b] = left[b], left[a]
+        right[a], right[b] = right[b], right[a]
+        symbol[a], symbol[b] = symbol[b], symbol[a]
+        for node in (a, b):
+            if left[node] != -1:
+                parent[left[node]] = parent[right[node]] = node
+            elif symbol[node] is not None:
+                self._leaves[symbol[node]] = node
+            else:
+                self._nyt = node
+
+    def _update(self, node: int):
+        """
+        Increments the weight of a leaf and its ancestors, keeping the sibling property.
+        """
+        weight, parent, leaders = self._weight, self._parent, self._leaders
+        last = len(weight) - 1
+        skipped = -1
+        while node != -1:
+            current = weight[node]
+            leader = leaders[current]
+            if leader == parent[node]:
+                # The node is the sibling of the NYT leaf and comes right after its parent, which
+                # is incremented next, so the block keeps its leader until then.
+                skipped = node
+            elif leader != node:
+                self._swap(node, leader)
+                node = leader
+            weight[node] = current + 1
+
+            if leaders[current] == node:
+                following = node + 1
+                if following == skipped:
+                    following += 1
+                if following <= last and weight[following] == current:
+                    leaders[current] = following
+                else:
+                    del leaders[current]
+            if leaders.get(current + 1, node + 1) > node:
+                leaders[current + 1] = node
+            node = parent[node]
+
+    def encode(self, symbol: str) -> str:
+        """
+        Returns the bits of a symbol and updates the tree.
+
+        Args:
+            symbol (str): The symbol, which must not be empty.
+
+        Returns:
+            str: The code of the symbol, or the code of the NYT leaf and the symbol if it is new.
+        """
+        node = self._leaves.get(symbol)
+        if node is None:
+            bits = self._code(self._nyt) + _literal_bits(symbol)
+            node = self._add(symbol)
+        else:
+            bits = self._code(node)
+        self._update(node)
+        return bits
+
+    def end(self) -> str:
+        """
+        Returns the bits of the end of a stream: the code of the NYT leaf and an empty symbol.
+
+        Returns:
+            str: The bits of the end of the stream.
+        """
+        return self._code(self._nyt) + _literal_bits(END_OF_STREAM)
+
+    def abort(self) -> str:
+        """
+        Returns the bits of the abort mark of a stream: the code of the NYT leaf and ABORT_MARK.
+
+        Returns:
+            str: The bits of the abort mark.
+        """
+        return self._code(self._nyt) + _to_bits(encode_varint(len(ABORT_MARK)) + ABORT_MARK)
+
+    def decode(self, bits: str, position: int) -> tuple[str | None, int]:
+        """
+        Reads a symbol and updates the tree.
+
+        Args:
+            bits (str): A string of '0' and '1' characters.
+            position (int): The position of the symbol in bits.
+
+        Returns:
+            tuple[str | None, int]: The symbol, or END_OF_STREAM at the end of a stream, and the
+            position right after it. If bits ends before the symbol, None and the given position.
+
+        Raises:
+            InvalidEncodedText: If a new symbol is not valid UTF-8.
+            InvalidText: If the bits are the abort mark of a stream.
+        """
+        start = position
+        left, right = self._left, self._right
+        node = 0
+        while left[node] != -1:
+            if position == len(bits):
+                return None, start
+            node = right[node] if bits[position] == "1" else left[node]
+            position += 1
+
+        if node != self._nyt:
+            symbol = self._symbol[node]
+        else:
+            symbol, position = _read_literal(bits, position)
+            if symbol is None:
+                return None, start
+            if symbol == END_OF_STREAM:
+                return symbol, position
+            node = self._add(symbol)
+        self._update(node)
+        return symbol, position
+
+
+def _to_bits(data: bytes) -> str:
+    """
+    Writes bytes as a string of bits, most significant bit first.
+    """
+    return format(int.from_bytes(data, "big"), f"0{len(data) * 8}b") if data else ""
+
+
+def _literal_bits(symbol: str) -> str:
+    """
+    Writes a new symbol: the number of bytes of its UTF-8 form as a varint, and those bytes.
+    """
+    data = symbol.encode("utf-8", "surrogatepass")
+    return _to_bits(encode_varint(len(data)) + data)
+
+
+def _read_literal(bits: str, position: int) -> tuple[str | None, int]:
+    """
+    Reads a symbol written by `_literal_bits`.
+
+    Returns:
+        tuple[str | None, int]: The symbol and the position right after it, or None and the given
+        position if bits ends before the symbol.
+
+    Raises:
+        InvalidEncodedText: If the symbol is not valid UTF-8.
+        InvalidText: If the symbol is the abort mark of a stream.
+    """
+    length = shift = 0
+    while True:
+        if position + 8 > len(bits):
+            return None, position
+        byte = int(bits[position:position + 8], 2)
+        position += 8
+        length |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+
+    end = position + length * 8
+    if end > len(bits):
+        return None, position
+    data = int(bits[position:end], 2).to_bytes(length, "big") if length else b""
+    if data == ABORT_MARK:
+        raise InvalidText()
+    try:
+        symbol = data.decode("utf-8", "surrogatepass")
+    except UnicodeDecodeError as exc:
+        raise InvalidEncodedText() from exc
+    return symbol, end
+
+
+class AdaptiveHuffmanEncoder(Encoder):
+    """
+    An encoder that uses adaptive Huffman coding, so the symbols are encoded in a single pass and
+    there is no encoding map. The codes of a symbol change while the text is encoded, so the
+    encoded symbols can only be decoded in order, from the start.
+    """
+    adaptive = True
+
+    def encode(self, list_of_symbols: UnencodedSymbols, canonical: bool = False,
+               max_code_length: int | None = None) -> tuple[EncodingMap, EncodedSymbols]:
+        """
+        Encodes a list of symbols with adaptive Huffman coding.
+
+        Args:
+            list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Not supported, it must be False.
+            max_code_length (int): Not supported, it must be None.
+
+        Returns:
+            tuple[EncodingMap, EncodedSymbols]: An empty encoding map and the bits of every symbol.
+
+        Raises:
+            InvalidOptions: If canonical codes or a maximum code length are requested.
+        """
+        if canonical or max_code_length is not None:
+            raise InvalidOptions()
+        tree = AdaptiveHuffmanTree()
+        with metrics.stage("encode", "emit"):
+            encoded = list(map(tree.encode, list_of_symbols.unencoded))
+        return EncodingMap(map={}), EncodedSymbols(encoded=encoded)
+
+    def encode_stream(self, chunks: Iterable[list[str]]) -> Iterator[bytes]:
+        """
+        Encodes the symbols of a stream as they arrive, with memory that does not depend on the
+        length of the stream.
+
+        Args:
+            chunks (Iterable[list[str]]): The symbols of the stream, a list at a time.
+
+        Yields:
+            bytes: The packed bits, ending with the end of the stream and zero padding.
+        """
+        writer = AdaptiveStreamWriter()
+        for symbols in chunks:
+            if packed := writer.write(symbols):
+                yield packed
+        yield writer.close()
+
+
+class AdaptiveHuffmanDecoder(Decoder):
+    """
+    A decoder of the symbols encoded by `AdaptiveHuffmanEncoder`. The encoding map is ignored.
+    """
+    adaptive = True
+
+    def decode(self, encoding_map: EncodingMap, encoded_symbols: EncodedSymbols) -> UnencodedSymbols:
+        """
+        Decodes a list of symbols encoded with adaptive Huffman coding. The bits may be split
+        anywhere, because they are read as a single sequence.
+
+        Args:
+            encoding_map (EncodingMap): Ignored.
+            encoded_symbols (EncodedSymbols): The encoded symbols.
+
+        Returns:
+            UnencodedSymbols: The decoded symbols.
+
+        Raises:
+            InvalidEncodedText: If the bits are not a sequence of encoded symbols.
+        """
+        bits = "".join(encoded_symbols.encoded)
+        if bits.strip("01"):
+            raise InvalidEncodedText()
+        with metrics.stage("decode", "symbols"):
+            return UnencodedSymbols(unencoded=_decode_bits(bits))
+
+    def decode_packed(self, encoding_map: EncodingMap, packed_symbols: PackedSymbols) -> UnencodedSymbols:
+        """
+        Decodes a list of symbols encoded with adaptive Huffman coding and packed into bytes, such
+        as the binary output of the encoder or a stream written by `encode_stream`, which ends with
+        its end mark.
+
+        Args:
+            encoding_map (EncodingMap): Ignored.
+            packed_symbols (PackedSymbols): The packed symbols.
+
+        Returns:
+            UnencodedSymbols: The decoded symbols.
+
+        Raises:
+            InvalidEncodedText: If the bits are not a sequence of encoded symbols.
+            InvalidText: If the stream ends with its abort mark.
+        """
+        if packed_symbols.bit_length > len(packed_symbols.data) * 8:
+            raise InvalidEncodedText()
+        bits = _to_bits(packed_symbols.data)[:packed_symbols.bit_length]
+        with metrics.stage("decode", "symbols"):
+            return UnencodedSymbols(unencoded=_decode_bits(bits))
+
+    def decode_stream(self, chunks: Iterable[bytes]) -> Iterator[list[str]]:
+        """
+        Decodes a stream written by `AdaptiveHuffmanEncoder.encode_stream` as its bytes arrive,
+        keeping only the bits of the symbol that is not complete yet.
+
+        Args:
+            chunks (Iterable[bytes]): The bytes of the stream.
+
+        Yields:
+            list[str]: The symbols completed by every chunk.
+
+        Raises:
+            InvalidEncodedText: If the stream ends before its end mark.
+            InvalidText: If the stream ends with its abort mark.
+        """
+        reader = AdaptiveStreamReader()
+        for data in chunks:
+            symbols = reader.read(data)
+            yield symbols
+            if reader.ended:
+                return
+        reader.close()
+
+
+class AdaptiveStreamWriter:
+    """
+    Encodes a stream of symbols with adaptive Huffman coding, a part at a time.
+    """
+
+    def __init__(self):
+        self._tree = AdaptiveHuffmanTree()
+        self._writer = BitWriter()
+
+    def write(self, symbols: Iterable[str]) -> bytes:
+        """
+        Encodes the next symbols of the stream.
+
+        Args:
+            symbols (Iterable[str]): The symbols, which must not be empty strings.
+
+        Returns:
+            bytes: The bytes completed by these symbols.
+        """
+        self._writer.write_codes(map(self._tree.encode, symbols))
+        return self._writer.read()
+
+    def close(self) -> bytes:
+        """
+        Writes the end of the stream.
+
+        Returns:
+            bytes: The remaining bytes, with the end of the stream and zero padding.
+        """
+        self._writer.write(self._tree.end())
+        return self._writer.close()
+
+    def abort(self) -> bytes:
+        """
+        Writes the abort mark instead of the end of the stream, when the rest of the symbols cannot
+        be read.
+
+        Returns:
+            bytes: The remaining bytes, with the abort mark and zero padding.
+        """
+        self._writer.write(self._tree.abort())
+        return self._writer.close()
+
+
+class AdaptiveStreamReader:
+    """
+    Decodes a stream written by `AdaptiveStreamWriter` as its bytes arrive, keeping only the bits
+    of the symbol that is not complete yet.
+
+    Attributes:
+        ended (bool): Whether the end of the stream was read. The bytes after it are ignored.
+    """
+
+    def __init__(self):
+        self._tree = AdaptiveHuffmanTree()
+        self._pending = ""
+        self.ended = False
+
+    def read(self, data: bytes) -> list[str]:
+        """
+        Decodes the next bytes of the stream.
+
+        Args:
+            data (bytes): The bytes.
+
+        Returns:
+            list[str]: The symbols completed by these bytes.
+
+        Raises:
+            InvalidEncodedText: If a new symbol is not valid UTF-8.
+            InvalidText: If the bytes have the abort mark of the stream.
+        """
+        if self.ended:
+            return []
+        bits = self._pending + _to_bits(data)
+        symbols = []
+        position = 0
+        while True:
+            symbol, position = self._tree.decode(bits, position)
+            if symbol is None:
+                break
+            if symbol == END_OF_STREAM:
+                self.ended = True
+                break
+            symbols.append(symbol)
+        self._pending = "" if self.ended else bits[position:]
+        return symbols
+
+    def close(self):
+        """
+        Checks that the stream is complete.
+
+        Raises:
+            InvalidEncodedText: If the end of the stream was not read.
+        """
+        if not self.ended:
+            raise InvalidEncodedText()
+
+
+def _decode_bits(bits: str) -> list[str]:
+    """
+    Decodes all the symbols of a string of bits. The bits may end with the end mark of a stream,
+    as written by `AdaptiveStreamWriter`, followed by less than a byte of zero padding.
+
+    Raises:
+        InvalidEncodedText: If the bits end in the middle of a symbol, or anything but the padding
+                            follows the end mark.
+        InvalidText: If the bits have the abort mark of a stream.
+    """
+    tree = AdaptiveHuffmanTree()
+    symbols = []
+    position = 0
+    while position < len(bits):
+        symbol, position = tree.decode(bits, position)
+        if symbol is None:
+            raise InvalidEncodedText()
+        if symbol == END_OF_STREAM:
+            padding = bits[position:]
+            if len(padding) >= 8 or padding.strip("0"):
+                raise InvalidEncodedText()
+            break
+        symbols.append(symbol)
+    return symbols
@@ -0,0 +1,143 @@
+"""
+This module provides the `BitWriter` class and helpers for packing Huffman codes and integers into
+bytes.
+"""
+from itertools import islice
+from typing import Iterable
+from .containers import PackedSymbols
+
+CHUNK_SIZE = 1 << 16
+
+
+class BitWriter:
+    """
+    Packs binary codes into bytes, most significant bit first.
+
+    The codes are packed in chunks: every chunk is joined into a single string of bits and
+    converted to bytes at once, so there is no per-bit or per-symbol arithmetic in Python. The bits
+    that do not fill a whole byte are kept until the next write.
+
+    Attributes:
+        bit_length (int): The number of bits written so far.
+    """
+
+    def __init__(self):
+        self.bit_length = 0
+        self._buffer = bytearray()
+        self._pending = ""
+
+    def write(self, bits: str):
+        """
+        Appends a string of bits to the stream.
+
+        Args:
+            bits (str): A string of '0' and '1' characters.
+        """
+        self.bit_length += len(bits)
+        bits = self._pending + bits
+        whole = len(bits) - len(bits) % 8
+        if whole:
+            self._buffer += int(bits[:whole], 2).to_bytes(whole // 8, "big")
+        self._pending = bits[whole:]
+
+    def write_codes(self, codes: Iterable[str], chunk_size: int = CHUNK_SIZE):
+        """
+        Appends a sequence of codes to the stream.
+
+        Args:
+            codes (Iterable[str]): The codes to append.
+            chunk_size (int): The number of codes packed at once.
+        """
+        codes = iter(codes)
+        while chunk := "".join(islice(codes, chunk_size)):
+            self.write(chunk)
+
+    def read(self) -> bytes:
+        """
+        Returns the complete bytes written since the last read and removes them from the buffer.
+
+        Returns:
+            bytes: The packed bytes.
+        """
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def close(self) -> bytes:
+        """
+        Pads the last byte with zeros and returns the remaining bytes.
+
+        Returns:
+            bytes: The packed bytes not returned by a previous read.
+        """
+        if self._pending:
+            self._pending = self._pending.ljust(8, "0")
+            self._buffer += int(self._pending, 2).to_bytes(1, "big")
+            self._pending = ""
+        return self.read()
+
+    @property
+    def padding(self) -> int:
+        """
+        The number of zero bits needed to complete the last byte.
+        """
+        return -self.bit_length % 8
+
+
+def pack_codes(codes: Iterable[str]) -> PackedSymbols:
+    """
+    Packs a sequence of codes into bytes.
+
+    Args:
+        codes (Iterable[str]): The codes to pack.
+
+    Returns:
+        PackedSymbols: The packed bytes, the number of meaningful bits and the padding.
+    """
+    writer = BitWriter()
+    writer.write_codes(codes)
+    return PackedSymbols(data=writer.close(), bit_length=writer.bit_length, padding=writer.padding)
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    Encodes a non-negative integer with 7 bits per byte, least significant group first.
+
+    Args:
+        value (int): The integer to encode.
+
+    Returns:
+        bytes: The encoded integer.
+    """
+    data = bytearray()
+    while value > 0x7F:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def decode_varint(data: bytes, offset: int = 0) -> tuple[int, int]:
+    """
+    Decodes an integer encoded with `encode_varint`.
+
+    Args:
+        data (bytes): The data that contains the integer.
+        offset (int): The position of the integer in data.
+
+    Returns:
+        tuple[int, int]: The integer and the position right after it.
+
+    Raises:
+        ValueError: If data ends before the integer.
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
@@ -0,0 +1,257 @@
+"""
+This module defines the block container, the format of a text compressed in independent blocks that
+can be encoded and decoded in parallel, and the encoding and decoding of a single block.
+
+The container is:
+
+- A header with the magic bytes b"HUFB", a version byte, a flags byte, the block size, the number
+  of blocks and, if the blocks share a codebook, the canonical codebook header.
+- A block table with, for every block, the size of its payload, the number of meaningful bits, the
+  number of characters and the CRC-32 of the payload. The CRC-32 of the header and the table
+  follows it.
+- The payloads of the blocks, one after the other. A payload is the canonical codebook header of
+  the block, unless the codebook is shared, followed by the packed codes.
+
+All the integers are varints, except the CRC-32 values, which are 4 bytes in big-endian order.
+"""
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from .bitstream import decode_varint, encode_varint
+from .codebook import Codebook
+from .containers import EncodingMap, PackedSymbols
+from .decoder import HuffmanDecoder
+from .encoder import HuffmanEncoder
+from app.exceptions import InvalidCodebook, InvalidContainer, InvalidEncodedText
+
+MAGIC = b"HUFB"
+VERSION = 1
+FLAG_SHARED_CODEBOOK = 0x01
+
+
+@dataclass(slots=True)
+class Block:
+    """
+    An entry of the block table.
+
+    Attributes:
+        size (int): The number of bytes of the payload.
+        bit_length (int): The number of meaningful bits of the packed codes.
+        symbols (int): The number of characters of the block.
+        crc (int): The CRC-32 of the payload.
+    """
+    size: int
+    bit_length: int
+    symbols: int
+    crc: int
+
+
+@dataclass(slots=True)
+class BlockContainer:
+    """
+    The header and the block table of a container.
+
+    Attributes:
+        block_size (int): The number of characters of every block but the last one.
+        blocks (list[Block]): The block table.
+        codebook (Codebook): The codebook shared by all the blocks, or None if every block has its
+                             own.
+        offset (int): The position where the first payload starts.
+    """
+    block_size: int
+    blocks: list[Block]
+    codebook: Codebook | None
+    offset: int
+
+    def payloads(self, data: bytes) -> list[bytes]:
+        """
+        Returns the payload of every block, checking its CRC-32.
+
+        Args:
+            data (bytes): The container.
+
+        Returns:
+            list[bytes]: The payloads, in order.
+
+        Raises:
+            InvalidContainer: If a payload is truncated or its CRC-32 does not match.
+        """
+        return list(self.iter_payloads(data))
+
+    def iter_payloads(self, data: bytes) -> Iterator[bytes]:
+        """
+        Yields the payload of every block, checking its CRC-32, so only one payload is copied from
+        the container at a time.
+
+        Args:
+            data (bytes): The container, such as a memory-mapped file.
+
+        Yields:
+            bytes: The payloads, in order.
+
+        Raises:
+            InvalidContainer: If a payload is truncated or its CRC-32 does not match.
+        """
+        offset = self.offset
+        for block in self.blocks:
+            payload = data[offset:offset + block.size]
+            if len(payload) != block.size or zlib.crc32(payload) != block.crc:
+                raise InvalidContainer()
+            yield payload
+            offset += block.size
+
+
+def split_blocks(text: str, block_size: int) -> list[str]:
+    """
+    Splits a text into blocks of the given number of characters; the last one may be shorter.
+
+    Args:
+        text (str): The text.
+        block_size (int): The number of characters of every block.
+
+    Returns:
+        list[str]: The blocks.
+    """
+    return [text[start:start + block_size] for start in range(0, len(text), block_size)]
+
+
+def encode_block(encoder: HuffmanEncoder, text: str,
+                 encoding_map: dict[str, str] | None = None) -> tuple[bytes, int]:
+    """
+    Encodes a block with canonical codes.
+
+    Args:
+        encoder (HuffmanEncoder): The encoder.
+        text (str): The characters of the block.
+        encoding_map (dict): The encoding map of the shared codebook, or None to build the codebook
+                             of the block and write it at the start of the payload.
+
+    Returns:
+        tuple[bytes, int]: The payload and the number of meaningful bits of its packed codes.
+    """
+    if encoding_map is not None:
+        packed = encoder.pack_text(text, encoding_map)
+        return packed.data, packed.bit_length
+
+    enc_map, packed = encoder.encode_text_packed(text, canonical=True)
+    return Codebook.from_encoding_map(enc_map.map).to_header() + packed.data, packed.bit_length
+
+
+def decode_block(decoder: HuffmanDecoder, payload: bytes, bit_length: int,
+                 codebook: Codebook | None = None) -> str:
+    """
+    Decodes a block.
+
+    Args:
+        decoder (HuffmanDecoder): The decoder.
+        payload (bytes): The payload of the block.
+        bit_length (int): The number of meaningful bits of the packed codes.
+        codebook (Codebook): The shared codebook, or None if it is at the start of the payload.
+
+    Returns:
+        str: The characters of the block.
+
+    Raises:
+        InvalidCodebook: If the codebook of the block cannot be read.
+        InvalidEncodedText: If the packed codes cannot be decoded.
+    """
+    offset = 0
+    if codebook is None:
+        codebook, offset = Codebook.read_header(payload)
+    data = payload[offset:]
+    if bit_length > len(data) * 8:
+        raise InvalidEncodedText()
+    packed = PackedSymbols(data=data, bit_length=bit_length, padding=-bit_length % 8)
+    return "".join(decoder.decode_packed(EncodingMap(map=codebook.encoding_map), packed).unencoded)
+
+
+def write_container(block_size: int, blocks: list[tuple[bytes, int, int]],
+                    codebook: Codebook | None = None) -> bytes:
+    """
+    Writes a container.
+
+    Args:
+        block_size (int): The number of characters of every block but the last one.
+        blocks (list[tuple[bytes, int, int]]): The payload, the number of meaningful bits and the
+                                               number of characters of every block.
+        codebook (Codebook): The codebook shared by the blocks, or None.
+
+    Returns:
+        bytes: The container.
+    """
+    table = [Block(size=len(payload), bit_length=bit_length, symbols=symbols,
+                   crc=zlib.crc32(payload))
+             for payload, bit_length, symbols in blocks]
+    return b"".join([write_header(block_size, table, codebook)] +
+                    [payload for payload, _, _ in blocks])
+
+
+def write_header(block_size: int, blocks: list[Block], codebook: Codebook | None = None) -> bytes:
+    """
+    Writes the header and the block table of a container, which the payloads follow.
+
+    The CRC-32 values have a fixed size, so a header written before the payloads are known can
+    be written again over itself with their CRC-32 values.
+
+    Args:
+        block_size (int): The number of characters of every block but the last one.
+        blocks (list[Block]): The block table.
+        codebook (Codebook): The codebook shared by the blocks, or None.
+
+    Returns:
+        bytes: The header and the block table.
+    """
+    header = bytearray(MAGIC)
+    header += bytes([VERSION, FLAG_SHARED_CODEBOOK if codebook is not None else 0])
+    header += encode_varint(block_size)
+    header += encode_varint(len(blocks))
+    if codebook is not None:
+        header += codebook.to_header()
+    for block in blocks:
+        header += encode_varint(block.size)
+        header += encode_varint(block.bit_length)
+        header += encode_varint(block.symbols)
+        header += block.crc.to_bytes(4, "big")
+    header += zlib.crc32(header).to_bytes(4, "big")
+    return bytes(header)
+
+
+def read_container(data: bytes) -> BlockContainer:
+    """
+    Reads the header and the block table of a container.
+
+    Args:
+        data (bytes): The container, or at least its header and block table.
+
+    Returns:
+        BlockContainer: The header and the block table.
+
+    Raises:
+        InvalidContainer: If the header or the block table cannot be read, or their CRC-32 does
+                          not match.
+    """
+    if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + 2 or data[len(MAGIC)] != VERSION:
+        raise InvalidContainer()
+    flags = data[len(MAGIC) + 1]
+    try:
+        block_size, offset = decode_varint(data, len(MAGIC) + 2)
+        count, offset = decode_varint(data, offset)
+        codebook = None
+        if flags & FLAG_SHARED_CODEBOOK:
+            codebook, offset = Codebook.read_header(data, offset)
+        blocks = []
+        for _ in range(count):
+            size, offset = decode_varint(data, offset)
+            bit_length, offset = decode_varint(data, offset)
+            symbols, offset = decode_varint(data, offset)
+            crc = int.from_bytes(data[offset:offset + 4], "big")
+            blocks.append(Block(size=size, bit_length=bit_length, symbols=symbols, crc=crc))
+            offset += 4
+    except (ValueError, InvalidCodebook) as exc:
+        raise InvalidContainer() from exc
+
+    if offset + 4 > len(data) or \
+            zlib.crc32(data[:offset]) != int.from_bytes(data[offset:offset + 4], "big"):
+        raise InvalidContainer()
+    return BlockContainer(block_size=block_size, blocks=blocks, codebook=codebook,
+                          offset=offset + 4)
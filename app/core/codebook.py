@@ -0,0 +1,183 @@
+"""
+This module provides the `Codebook` class, a canonical Huffman codebook that can be rebuilt from
+the code lengths alone and serialized into a compact header.
+"""
+from app.exceptions import InvalidCodebook
+from .bitstream import decode_varint, encode_varint
+from .decoding_table import DecodingTable
+
+HEADER_VERSION = 1
+
+
+class Codebook:
+    """
+    A canonical Huffman codebook.
+
+    The codes are assigned from the code lengths: the symbols are sorted by code length and, within
+    the same length, by symbol; the first symbol gets a code of zeros and every next symbol gets the
+    previous code plus one, shifted left when the length grows. Only the symbols and their lengths
+    are needed to rebuild the codes.
+
+    Attributes:
+        symbols (list[str]): The symbols in canonical order.
+        lengths (list[int]): The code length of each symbol.
+    """
+
+    def __init__(self, symbols: list[str], lengths: list[int]):
+        self.symbols = symbols
+        self.lengths = lengths
+        self._encoding_map = None
+
+    @classmethod
+    def from_lengths(cls, lengths: dict[str, int]) -> "Codebook":
+        """
+        Creates a codebook from the code length of each symbol.
+
+        Args:
+            lengths (dict[str, int]): A dictionary mapping symbols to their code lengths.
+
+        Returns:
+            Codebook: The canonical codebook.
+        """
+        items = sorted(lengths.items(), key=lambda x: (x[1], x[0]))
+        return cls([symbol for symbol, _ in items], [length for _, length in items])
+
+    @classmethod
+    def from_encoding_map(cls, encoding_map: dict[str, str]) -> "Codebook":
+        """
+        Creates a codebook with the code lengths of an encoding map.
+
+        Args:
+            encoding_map (dict[str, str]): A dictionary mapping symbols to their codes.
+
+        Returns:
+            Codebook: The canonical codebook.
+        """
+        return cls.from_lengths({symbol: len(code) for symbol, code in encoding_map.items()})
+
+    @property
+    def encoding_map(self) -> dict[str, str]:
+        """
+        A dictionary mapping the symbols to their canonical codes, sorted by code.
+        """
+        if self._encoding_map is None:
+            encoding_map = {}
+            code = 0
+            previous_length = self.lengths[0] if self.lengths else 0
+            for symbol, length in zip(self.symbols, self.lengths):
+                code <<= length - previous_length
+                if code >> length:
+                    raise InvalidCodebook()
+                encoding_map[symbol] = format(code, f"0{length}b")
+                code += 1
+                previous_length = length
+            self._encoding_map = encoding_map
+        return self._encoding_map
+
+    def decoding_table(self) -> DecodingTable:
+        """
+        Builds the lookup table to decode the codes of the codebook.
+
+        Returns:
+            DecodingTable: The decoding table.
+        """
+        return DecodingTable(self.encoding_map)
+
+    def to_header(self) -> bytes:
+        """
+        Serializes the codebook.
+
+        The header contains a version byte, the number of symbols, the maximum code length, the
+        number of codes of each length from 1 to the maximum, and the symbols in canonical order,
+        each one as its UTF-8 size followed by its UTF-8 bytes. All the integers are varints. A
+        lone surrogate of a symbol is written as its three bytes, as the rest of the formats do.
+
+        Returns:
+            bytes: The serialized codebook.
+        """
+        max_length = self.lengths[-1] if self.lengths else 0
+        counts = [0] * (max_length + 1)
+        for length in self.lengths:
+            counts[length] += 1
+
+        header = bytearray([HEADER_VERSION])
+        header += encode_varint(len(self.symbols))
+        header += encode_varint(max_length)
+        for count in counts[1:]:
+            header += encode_varint(count)
+        for symbol in self.symbols:
+            data = symbol.encode("utf-8", "surrogatepass")
+            header += encode_varint(len(data))
+            header += data
+        return bytes(header)
+
+    @classmethod
+    def read_header(cls, data: bytes, offset: int = 0) -> tuple["Codebook", int]:
+        """
+        Deserializes a codebook that starts at a given position of the data.
+
+        Args:
+            data (bytes): The data that contains the serialized codebook.
+            offset (int): The position of the codebook in data.
+
+        Returns:
+            tuple[Codebook, int]: The codebook and the position right after it.
+
+        Raises:
+            InvalidCodebook: If the data does not contain a valid codebook.
+        """
+        try:
+            if data[offset] != HEADER_VERSION:
+                raise InvalidCodebook()
+            size, offset = decode_varint(data, offset + 1)
+            max_length, offset = decode_varint(data, offset)
+            # Every count and every symbol takes at least a byte, so sizes that do not fit in the
+            # rest of the data are rejected before anything is allocated for them.
+            if size > len(data) - offset or max_length > len(data) - offset:
+                raise InvalidCodebook()
+
+            lengths = []
+            for length in range(1, max_length + 1):
+                count, offset = decode_varint(data, offset)
+                if len(lengths) + count > size:
+                    raise InvalidCodebook()
+                lengths.extend([length] * count)
+            if len(lengths) != size:
+                raise InvalidCodebook()
+
+            symbols = []
+            for _ in range(size):
+                symbol_size, offset = decode_varint(data, offset)
+                if offset + symbol_size > len(data):
+                    raise InvalidCodebook()
+                symbols.append(bytes(data[offset:offset + symbol_size]).decode("utf-8",
+                                                                                "surrogatepass"))
+                offset += symbol_size
+        except (IndexError, ValueError) as exc:
+            raise InvalidCodebook() from exc
+
+        codebook = cls(symbols, lengths)
+        if len(set(symbols)) != size:
+            raise InvalidCodebook()
+        # Assigning the codes checks that the lengths can form a prefix code.
+        _ = codebook.encoding_map
+        return codebook, offset
+
+    @classmethod
+    def from_header(cls, data: bytes) -> "Codebook":
+        """
+        Deserializes a codebook.
+
+        Args:
+            data (bytes): The serialized codebook.
+
+        Returns:
+            Codebook: The codebook.
+
+        Raises:
+            InvalidCodebook: If the data is not a valid codebook.
+        """
+        codebook, offset = cls.read_header(data)
+        if offset != len(data):
+            raise InvalidCodebook()
+        return codebook
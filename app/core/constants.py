@@ -10,13 +10,15 @@ class Constants(Enum):
     """
     @staticmethod
     def get_encoders():
+        from app.core.adaptive import AdaptiveHuffmanEncoder
         from app.core.encoder import HuffmanEncoder
-        return {'huffman': HuffmanEncoder()}
+        return {'huffman': HuffmanEncoder(), 'adaptive': AdaptiveHuffmanEncoder()}
 
     @staticmethod
     def get_decoders():
+        from app.core.adaptive import AdaptiveHuffmanDecoder
         from app.core.decoder import HuffmanDecoder
-        return {'huffman': HuffmanDecoder()}
+        return {'huffman': HuffmanDecoder(), 'adaptive': AdaptiveHuffmanDecoder()}
 
     LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzÁÉÍÓÚáéíóúÑñÜü"
     LETTERS_FREQ_IN_SPANISH = {
@@ -0,0 +1,44 @@
+"""
+This module defines the framing of the encoded streams: a canonical codebook header, the number of
+meaningful bits, and the packed codes.
+"""
+from .bitstream import decode_varint, encode_varint
+from .codebook import Codebook
+from app.exceptions import InvalidEncodedText
+
+
+def write_stream_header(codebook: Codebook, bit_length: int) -> bytes:
+    """
+    Serializes the header of an encoded stream.
+
+    Args:
+        codebook (Codebook): The canonical codebook of the stream.
+        bit_length (int): The number of meaningful bits of the packed codes.
+
+    Returns:
+        bytes: The codebook header followed by the number of bits as a varint.
+    """
+    return codebook.to_header() + encode_varint(bit_length)
+
+
+def read_stream_header(data: bytes) -> tuple[Codebook, int, int]:
+    """
+    Deserializes the header of an encoded stream.
+
+    Args:
+        data (bytes): The encoded stream, or at least its header.
+
+    Returns:
+        tuple[Codebook, int, int]: The codebook, the number of meaningful bits of the packed codes
+        and the position where the packed codes start.
+
+    Raises:
+        InvalidCodebook: If the codebook cannot be read.
+        InvalidEncodedText: If the number of bits cannot be read.
+    """
+    codebook, offset = Codebook.read_header(data)
+    try:
+        bit_length, offset = decode_varint(data, offset)
+    except ValueError as exc:
+        raise InvalidEncodedText() from exc
+    return codebook, bit_length, offset
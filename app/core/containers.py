@@ -0,0 +1,74 @@
+"""
+This module defines the containers that the encoders and decoders of `app.core` receive and return.
+
+They are slotted dataclasses that keep a reference to their lists and dictionaries without checking
+or copying their elements, so wrapping millions of symbols costs the same as wrapping one. The data
+is validated once, by the request schemas in `app.schemas`, before it reaches the core.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .offset_index import OffsetIndex
+
+
+@dataclass(slots=True)
+class UnencodedSymbols:
+    """
+    Represents a list of unencoded symbols.
+
+    Attributes:
+        unencoded (list[str]): The list of unencoded symbols
+    """
+    unencoded: list[str]
+
+
+@dataclass(slots=True)
+class EncodedSymbols:
+    """
+    Represents a list of encoded symbols.
+
+    Attributes:
+        encoded (list[str]): The list of encoded symbols
+    """
+    encoded: list[str]
+
+
+@dataclass(slots=True)
+class PackedSymbols:
+    """
+    Represents a list of encoded symbols packed into bytes.
+
+    Attributes:
+        data (bytes): The codes of the symbols, most significant bit first
+        bit_length (int): The number of meaningful bits in data
+        padding (int): The number of zero bits added to complete the last byte
+        index (OffsetIndex): The bit offsets of every N-th symbol, if they were requested
+        compression_cost (float): How much larger the codes are because of the maximum code
+                                  length, if one was given
+    """
+    data: bytes
+    bit_length: int
+    padding: int
+    index: "OffsetIndex | None" = None
+    compression_cost: float | None = None
+
+
+@dataclass(slots=True)
+class EncodingMap:
+    """
+    Represents an encoding map.
+
+    Attributes:
+        map (Mapping[str, str]): The encoding map
+        fingerprint (bytes): A digest that identifies the encoding map, such as the one of a
+                             pretrained codebook, or None to calculate it from the map
+    """
+    map: Mapping[str, str]
+    fingerprint: bytes | None = None
+
+    def __reduce__(self):
+        # The encoders share read-only views of their cached maps, which cannot be pickled, so the
+        # map is copied when it is sent to or from a worker process.
+        return EncodingMap, (dict(self.map), self.fingerprint)
@@ -2,14 +2,28 @@
 This module provides an abstract base class `Decoder` and a concrete implementation `HuffmanDecoder`
 for decoding symbols using Huffman coding.
 """
+import hashlib
+import sys
 from abc import ABC, abstractmethod
-from app.schemas import UnencodedSymbols, EncodedSymbols, EncodingMap
+from app.config import DECODER_CACHE_BYTES
+from app.exceptions import InvalidEncodedText, InvalidOffsetIndex
+from .containers import UnencodedSymbols, EncodedSymbols, EncodingMap, PackedSymbols
+from .decoding_table import DecodingTable, validate_prefix_free
+from .lru_cache import LRUCache, sizeof_mapping
+from .offset_index import OffsetIndex
+from .metrics import metrics
 
 
 class Decoder(ABC):
     """
     An abstract base class that defines the interface for decoders.
+
+    Attributes:
+        adaptive (bool): Whether the codes change while the symbols are decoded, so the encoding
+                         map is not needed.
     """
+    adaptive = False
+
     @abstractmethod
     def decode(self, encoding_map: EncodingMap, encoded_symbols: EncodedSymbols) -> UnencodedSymbols:
         """
@@ -24,12 +38,103 @@ class Decoder(ABC):
         """
         pass
 
+    @abstractmethod
+    def decode_packed(self, encoding_map: EncodingMap, packed_symbols: PackedSymbols) -> UnencodedSymbols:
+        """
+        Decodes a list of symbols packed into bytes using the given encoding map and returns the
+        decoded symbols.
+
+        Args:
+            encoding_map (EncodingMap): The encoding map.
+            packed_symbols (PackedSymbols): The packed symbols.
+
+        Returns:
+            UnencodedSymbols: The decoded symbols.
+        """
+        pass
+
 
 class HuffmanDecoder(Decoder):
     """
     A decoder that uses the Huffman coding algorithm to decode a list of symbols.
+
+    The decoding maps and lookup tables are kept in a cache keyed by a fingerprint of the encoding
+    map, so the maps sent again by a client are validated and compiled only once.
+
+    Attributes:
+        table_cache (LRUCache): The decoding maps and lookup tables of the recent encoding maps.
     """
 
+    def __init__(self, table_cache_bytes: int = DECODER_CACHE_BYTES):
+        self.table_cache = LRUCache(table_cache_bytes, sizeof=_sizeof_table)
+
+    @staticmethod
+    def _map_fingerprint(encoding_map: dict[str, str]) -> bytes:
+        """
+        Calculates a fingerprint of an encoding map.
+
+        The items are hashed in the order they are given, which is the same every time a client
+        sends the same map, so the map does not have to be sorted.
+
+        Args:
+            encoding_map (dict[str, str]): The encoding map.
+
+        Returns:
+            bytes: A 128-bit digest of the encoding map.
+        """
+        return hashlib.blake2b(repr(tuple(encoding_map.items())).encode("utf-8", "surrogatepass"),
+                               digest_size=16).digest()
+
+    def _decoding_map(self, encoding_map: dict[str, str],
+                      fingerprint: bytes | None = None) -> dict[str, str]:
+        """
+        Returns the map from codes to symbols, validating and caching it if the encoding map was
+        not seen recently.
+
+        Args:
+            encoding_map (dict[str, str]): The encoding map.
+            fingerprint (bytes): The fingerprint of the encoding map, or None to calculate it.
+
+        Returns:
+            dict[str, str]: A dictionary mapping codes to symbols.
+
+        Raises:
+            InvalidEncodingMap: If the codes are not a prefix code.
+        """
+        key = (fingerprint or self._map_fingerprint(encoding_map), "map")
+        decoding_map = self.table_cache.get(key)
+        if decoding_map is None:
+            with metrics.stage("decode", "table"):
+                validate_prefix_free(encoding_map)
+                decoding_map = {code: symbol for symbol, code in encoding_map.items()}
+            self.table_cache.put(key, decoding_map)
+        return decoding_map
+
+    def _decoding_table(self, encoding_map: dict[str, str],
+                        fingerprint: bytes | None = None) -> DecodingTable:
+        """
+        Returns the lookup table of an encoding map, validating and caching it if the encoding map
+        was not seen recently.
+
+        Args:
+            encoding_map (dict[str, str]): The encoding map.
+            fingerprint (bytes): The fingerprint of the encoding map, or None to calculate it.
+
+        Returns:
+            DecodingTable: The lookup table.
+
+        Raises:
+            InvalidEncodingMap: If the codes are not a prefix code.
+        """
+        key = (fingerprint or self._map_fingerprint(encoding_map), "table")
+        table = self.table_cache.get(key)
+        if table is None:
+            with metrics.stage("decode", "table"):
+                validate_prefix_free(encoding_map)
+                table = DecodingTable(encoding_map)
+            self.table_cache.put(key, table)
+        return table
+
     def decode(self, encoding_map: EncodingMap, encoded_symbols: EncodedSymbols) -> UnencodedSymbols:
         """
         Decodes a list of symbols using the given encoding map and returns the decoded symbols.
@@ -40,10 +145,82 @@ class HuffmanDecoder(Decoder):
 
         Returns:
             UnencodedSymbols: The decoded symbols.
+
+        Raises:
+            InvalidEncodingMap: If the codes are not a prefix code.
+            InvalidEncodedText: If a code is not in the encoding map.
         """
-        decoding_map = {v: k for k, v in encoding_map.map.items()}
+        decoding_map = self._decoding_map(encoding_map.map, encoding_map.fingerprint)
 
-        decoded_symbols = [decoding_map[symbol]
-                           for symbol in encoded_symbols.encoded]
+        try:
+            with metrics.stage("decode", "symbols"):
+                decoded_symbols = list(map(decoding_map.__getitem__, encoded_symbols.encoded))
+        except KeyError as exc:
+            raise InvalidEncodedText() from exc
 
         return UnencodedSymbols(unencoded=decoded_symbols)
+
+    def decode_packed(self, encoding_map: EncodingMap, packed_symbols: PackedSymbols) -> UnencodedSymbols:
+        """
+        Decodes a list of symbols packed into bytes using a lookup table built from the given
+        encoding map, without separators between the codes.
+
+        Args:
+            encoding_map (EncodingMap): The encoding map.
+            packed_symbols (PackedSymbols): The packed symbols.
+
+        Returns:
+            UnencodedSymbols: The decoded symbols.
+
+        Raises:
+            InvalidEncodingMap: If the codes are not a prefix code.
+            InvalidEncodedText: If the bits are not a sequence of codes of the encoding map.
+        """
+        table = self._decoding_table(encoding_map.map, encoding_map.fingerprint)
+        with metrics.stage("decode", "symbols"):
+            decoded_symbols = table.decode(packed_symbols.data, packed_symbols.bit_length)
+
+        return UnencodedSymbols(unencoded=decoded_symbols)
+
+    def decode_range(self, encoding_map: EncodingMap, packed_symbols: PackedSymbols, start: int,
+                     stop: int, index: OffsetIndex | None = None) -> UnencodedSymbols:
+        """
+        Decodes the symbols from `start` to `stop` of a list of symbols packed into bytes. With
+        an offset index only the bits from the checkpoint before the range to the checkpoint after
+        it are decoded; without it the symbols before the range are decoded too.
+
+        Args:
+            encoding_map (EncodingMap): The encoding map.
+            packed_symbols (PackedSymbols): The packed symbols.
+            start (int): The first symbol of the range.
+            stop (int): The symbol after the last one of the range.
+            index (OffsetIndex): The offset index of the packed symbols, or None.
+
+        Returns:
+            UnencodedSymbols: The decoded symbols of the range, which is shorter if the packed
+                              symbols end before stop.
+
+        Raises:
+            InvalidEncodingMap: If the codes are not a prefix code.
+            InvalidEncodedText: If the bits are not a sequence of codes of the encoding map.
+            InvalidOffsetIndex: If the offsets of the index are out of the packed symbols.
+        """
+        table = self._decoding_table(encoding_map.map, encoding_map.fingerprint)
+        stop = max(start, stop)
+        first_bit, end_bit, skip = 0, packed_symbols.bit_length, start
+        if index is not None:
+            start, stop = min(start, index.symbols), min(stop, index.symbols)
+            first_bit, end_bit, skip = index.bit_range(start, stop, packed_symbols.bit_length)
+            if not first_bit <= end_bit <= packed_symbols.bit_length:
+                raise InvalidOffsetIndex()
+        with metrics.stage("decode", "symbols"):
+            decoded_symbols = table.decode(packed_symbols.data, end_bit, first_bit)
+
+        return UnencodedSymbols(unencoded=decoded_symbols[skip:skip + stop - start])
+
+
+def _sizeof_table(value: dict | DecodingTable) -> int:
+    """
+    Estimates the size in bytes of a decoding map or a lookup table.
+    """
+    return sizeof_mapping(value) if isinstance(value, dict) else sys.getsizeof(value)
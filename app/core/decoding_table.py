@@ -0,0 +1,177 @@
+"""
+This module provides the `DecodingTable` class, a multi-bit lookup table for decoding bitstreams
+encoded with a prefix code.
+"""
+import sys
+from app.exceptions import InvalidEncodedText, InvalidEncodingMap
+
+LOOKUP_BITS = 12
+REFILL_BITS = 256
+
+
+def validate_prefix_free(encoding_map: dict[str, str]):
+    """
+    Checks that the codes of an encoding map are binary and that no code is a prefix of another.
+
+    When the codes are sorted, a code that is a prefix of other codes is followed by one of them,
+    so only adjacent codes are compared.
+
+    Args:
+        encoding_map (dict[str, str]): The encoding map.
+
+    Raises:
+        InvalidEncodingMap: If a code is empty, is not binary, or is a prefix of another code.
+    """
+    codes = sorted(encoding_map.values())
+    for code in codes:
+        if not code or code.strip("01"):
+            raise InvalidEncodingMap()
+    for code, next_code in zip(codes, codes[1:]):
+        if next_code.startswith(code):
+            raise InvalidEncodingMap()
+
+
+class DecodingTable:
+    """
+    A lookup table that decodes a prefix code several bits at a time.
+
+    The primary table is indexed by the next `lookup_bits` bits of the stream, and every entry
+    stores the symbol whose code is a prefix of those bits and the length of that code. A second
+    table stores all the symbols whose codes fit one after the other in those bits, so a single
+    lookup usually resolves several symbols. The codes longer than `lookup_bits` are resolved by a
+    fallback that reads one more bit at a time.
+
+    Attributes:
+        lookup_bits (int): The number of bits used to index the primary table.
+        max_length (int): The length of the longest code.
+    """
+
+    def __init__(self, encoding_map: dict[str, str], lookup_bits: int = LOOKUP_BITS):
+        self.max_length = max((len(code) for code in encoding_map.values()), default=0)
+        self.lookup_bits = min(lookup_bits, self.max_length)
+        self._symbols = [None] * (1 << self.lookup_bits)
+        self._lengths = [0] * (1 << self.lookup_bits)
+        self._long_codes = {}
+
+        for symbol, code in encoding_map.items():
+            length = len(code)
+            if length == 0 or code.strip("01"):
+                raise InvalidEncodingMap()
+
+            value = int(code, 2)
+            if length > self.lookup_bits:
+                self._long_codes[(length, value)] = symbol
+                continue
+
+            shift = self.lookup_bits - length
+            start = value << shift
+            for index in range(start, start + (1 << shift)):
+                if self._lengths[index]:
+                    raise InvalidEncodingMap()
+                self._symbols[index] = symbol
+                self._lengths[index] = length
+
+        self._runs = [()] * (1 << self.lookup_bits)
+        self._run_lengths = [0] * (1 << self.lookup_bits)
+        mask = (1 << self.lookup_bits) - 1
+        for index in range(1 << self.lookup_bits):
+            run = []
+            consumed = 0
+            while True:
+                length = self._lengths[(index << consumed) & mask]
+                if not length or consumed + length > self.lookup_bits:
+                    break
+                run.append(self._symbols[(index << consumed) & mask])
+                consumed += length
+            self._runs[index] = tuple(run)
+            self._run_lengths[index] = consumed
+
+    def decode(self, data: bytes, bit_length: int, start: int = 0) -> list[str]:
+        """
+        Decodes the first `bit_length` bits of a bitstream, or the bits from `start` to
+        `bit_length` when the first code does not start at the beginning of the data.
+
+        Args:
+            data (bytes): The codes packed into bytes, most significant bit first.
+            bit_length (int): The number of meaningful bits in data.
+            start (int): The bit where the first code starts. Default is 0.
+
+        Returns:
+            list[str]: The decoded symbols.
+
+        Raises:
+            InvalidEncodedText: If the bits are not a sequence of codes of the table.
+        """
+        if bit_length < start or start < 0 or bit_length > len(data) * 8:
+            raise InvalidEncodedText()
+
+        symbols, lengths = self._symbols, self._lengths
+        runs, run_lengths = self._runs, self._run_lengths
+        lookup_bits, max_length = self.lookup_bits, self.max_length
+        mask = (1 << lookup_bits) - 1
+        refill_bytes = REFILL_BITS // 8
+
+        decoded = []
+        append, extend = decoded.append, decoded.extend
+        remaining = bit_length - start
+        position = start // 8
+        buffer = available = 0
+        if start % 8:
+            # The buffer starts with the unread bits of the first byte.
+            buffer, available = data[position], 8 - start % 8
+            position += 1
+
+        while remaining > 0:
+            while available < max_length:
+                chunk = data[position:position + refill_bytes]
+                position += refill_bytes
+                buffer = ((buffer & ((1 << available) - 1)) << REFILL_BITS) | \
+                    int.from_bytes(chunk.ljust(refill_bytes, b"\0"), "big")
+                available += REFILL_BITS
+
+            index = (buffer >> (available - lookup_bits)) & mask
+            # The runs may read past the end of the stream, so the last bits are decoded one
+            # symbol at a time.
+            length = run_lengths[index] if remaining >= lookup_bits else 0
+            if length:
+                extend(runs[index])
+            elif lengths[index]:
+                length = lengths[index]
+                append(symbols[index])
+            else:
+                symbol, length = self._decode_long_code(buffer, available)
+                append(symbol)
+
+            if length > remaining:
+                raise InvalidEncodedText()
+            available -= length
+            remaining -= length
+
+        return decoded
+
+    def __sizeof__(self) -> int:
+        getsizeof = sys.getsizeof
+        return object.__sizeof__(self) + getsizeof(self._symbols) + getsizeof(self._lengths) + \
+            getsizeof(self._runs) + sum(map(getsizeof, self._runs)) + \
+            getsizeof(self._run_lengths) + getsizeof(self._long_codes)
+
+    def _decode_long_code(self, buffer: int, available: int) -> tuple[str, int]:
+        """
+        Finds a code longer than the primary table index.
+
+        Args:
+            buffer (int): The bits read from the stream.
+            available (int): The number of unread bits at the end of buffer.
+
+        Returns:
+            tuple[str, int]: The symbol and the length of the code at the start of the unread bits.
+
+        Raises:
+            InvalidEncodedText: If no code matches the unread bits.
+        """
+        for length in range(self.lookup_bits + 1, self.max_length + 1):
+            value = (buffer >> (available - length)) & ((1 << length) - 1)
+            symbol = self._long_codes.get((length, value))
+            if symbol is not None:
+                return symbol, length
+        raise InvalidEncodedText()
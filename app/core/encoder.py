@@ -2,55 +2,154 @@
 This module provides an abstract base class `Encoder` and a concrete implementation `HuffmanEncoder`
 for encoding symbols using Huffman coding.
 """
+import hashlib
+import heapq
 from abc import ABC, abstractmethod
-from app.schemas import UnencodedSymbols, EncodedSymbols, EncodingMap
-from .node_tree import NodeTree
+from types import MappingProxyType
+from typing import Mapping
+from .containers import UnencodedSymbols, EncodedSymbols, EncodingMap, PackedSymbols
+from . import vectorized
+from .bitstream import pack_codes
+from .codebook import Codebook
+from .lru_cache import LRUCache, sizeof_mapping
+from .metrics import metrics
+from .node_tree import HuffmanTree
+from .static_codebook import StaticCodebook
+from app.config import CODEBOOK_CACHE_BYTES, VECTORIZE_MIN_SIZE
 from app.core.constants import Constants
+from app.exceptions import InvalidMaxCodeLength
 
 
 class Encoder(ABC):
     """
     An abstract base class that defines the interface for encoders.
+
+    Attributes:
+        adaptive (bool): Whether the codes change while the symbols are encoded, so there is no
+                         encoding map, canonical codes or maximum code length.
     """
+    adaptive = False
+
     @abstractmethod
-    def encode(self, list_of_symbols: UnencodedSymbols) -> tuple[EncodingMap, EncodedSymbols]:
+    def encode(self, list_of_symbols: UnencodedSymbols, canonical: bool = False,
+               max_code_length: int | None = None) -> tuple[EncodingMap, EncodedSymbols]:
         """
         Encodes a list of symbols and returns the encoding map and the encoded symbols.
 
         Args:
             list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Whether to use canonical codes, which can be rebuilt from the code
+                              lengths alone.
+            max_code_length (int): The maximum code length, or None for no limit.
 
         Returns:
             tuple[EncodingMap, EncodedSymbols]: The encoding map and the encoded symbols.
         """
         pass
 
+    def encode_packed(self, list_of_symbols: UnencodedSymbols, canonical: bool = False,
+                      max_code_length: int | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encodes a list of symbols and returns the encoding map and the codes packed into bytes.
+
+        Args:
+            list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols.
+        """
+        encoding_map, encoded_symbols = self.encode(list_of_symbols, canonical, max_code_length)
+        return encoding_map, pack_codes(encoded_symbols.encoded)
+
+    def encode_text(self, text: str, canonical: bool = False,
+                    max_code_length: int | None = None) -> tuple[EncodingMap, str]:
+        """
+        Encodes the characters of a text and returns the encoding map and the codes separated by
+        spaces.
+
+        Args:
+            text (str): The text whose characters are the symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, str]: The encoding map and the encoded text.
+        """
+        encoding_map, encoded_symbols = self.encode(UnencodedSymbols(unencoded=list(text)),
+                                                    canonical, max_code_length)
+        return encoding_map, " ".join(encoded_symbols.encoded)
+
+    def encode_text_packed(self, text: str, canonical: bool = False,
+                           max_code_length: int | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encodes the characters of a text and returns the encoding map and the codes packed into
+        bytes.
+
+        Args:
+            text (str): The text whose characters are the symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols.
+        """
+        return self.encode_packed(UnencodedSymbols(unencoded=list(text)), canonical,
+                                  max_code_length)
+
 
 class HuffmanEncoder(Encoder):
     """
     An encoder that uses the Huffman coding algorithm to encode a list of symbols.
+
+    The codes of the texts are kept in a cache keyed by a fingerprint of their frequency
+    histogram, so texts with the same distribution of symbols do not build the tree again. The
+    characters of the texts with at least vectorize_min_size characters are counted and encoded
+    with NumPy, if it is installed.
+
+    Attributes:
+        spanish_codebook (StaticCodebook): The codes for the letter frequency in Spanish, compiled
+                                           when the encoder is created.
+        codebook_cache (LRUCache): The codes of the recent frequency histograms.
+        vectorize_min_size (int): The length from which a text is encoded with NumPy.
     """
 
-    def _huffman_code_tree(self, node, left=True, bin_string="") -> dict:
+    def __init__(self, codebook_cache_bytes: int = CODEBOOK_CACHE_BYTES,
+                 vectorize_min_size: int = VECTORIZE_MIN_SIZE):
+        self.spanish_codebook = StaticCodebook(self._get_letter_frequency_in_spanish(),
+                                               self._generate_codes)
+        self.codebook_cache = LRUCache(codebook_cache_bytes, sizeof=sizeof_mapping)
+        self.vectorize_min_size = vectorize_min_size
+
+    def _huffman_code_tree(self, tree: HuffmanTree) -> dict:
         """
-        Recursively generates the Huffman codes for the symbols in the tree.
+        Generates the Huffman codes for the symbols in the tree.
+
+        The tree is walked from the root down over its arrays, so deep trees do not hit the
+        recursion limit, and the codes are sorted once at the end.
 
         Args:
-            node (NodeTree): The current node in the tree.
-            left (bool): A flag indicating whether the current node is the left child of its parent.
-            bin_string (str): The binary string representing the code for the current node.
+            tree (HuffmanTree): The Huffman tree.
 
         Returns:
-            dict: A dictionary mapping symbols to their Huffman codes.
+            dict: A dictionary mapping symbols to their Huffman codes, sorted by length and code.
+        """
+        return dict(sorted(tree.codes().items(), key=lambda x: (len(x[1]), x[1])))
+
+    def _code_lengths(self, tree: HuffmanTree) -> dict:
+        """
+        Calculates the code length of each symbol in the tree, which is the depth of its leaf.
+
+        Args:
+            tree (HuffmanTree): The Huffman tree.
+
+        Returns:
+            dict: A dictionary mapping symbols to their code lengths.
         """
-        if type(node) is str:
-            return {node: bin_string}
-        (left, right) = node.children()
-        codes = dict()
-        codes.update(self._huffman_code_tree(left, True, bin_string + "1"))
-        codes.update(self._huffman_code_tree(right, False, bin_string + "0"))
-        codes = sorted(codes.items(), key=lambda x: (len(x[1]), x[1]))
-        return dict(codes)
+        if tree.is_leaf(tree.root):
+            return {tree.symbols[0]: 1}
+        return tree.code_lengths()
 
     def _calculate_frequencies(self, list_of_symbols: UnencodedSymbols):
         """
@@ -83,28 +182,211 @@ class HuffmanEncoder(Encoder):
         """
         Builds a Huffman tree from the list of nodes.
 
+        The nodes are kept in a binary heap, so every merge costs O(log n). When two nodes have the
+        same frequency, the one that was inserted last is merged first, which is the order given by
+        a stable descending sort where new nodes are appended after the existing ones.
+
+        Args:
+            nodes (list): A list of nodes where each node is a tuple containing a symbol and its
+            frequency, sorted by frequency from highest to lowest.
+
+        Returns:
+            tuple: The Huffman tree and the frequency of its root.
+        """
+        tree = HuffmanTree([symbol for symbol, _ in nodes])
+        heap = [(frequency, -order, order) for order, (_, frequency) in enumerate(nodes)]
+        heapq.heapify(heap)
+
+        # The tree adds the nodes in the order of the merges, so the order of a node is its
+        # position in the arrays of the tree.
+        while len(heap) > 1:
+            c1, _, key1 = heapq.heappop(heap)
+            c2, _, key2 = heapq.heappop(heap)
+            order = tree.merge(key1, key2)
+            heapq.heappush(heap, (c1 + c2, -order, order))
+
+        frequency, _, _ = heap[0]
+        return (tree, frequency)
+
+    def _length_limited_code_lengths(self, nodes, max_code_length: int) -> dict:
+        """
+        Calculates optimal code lengths that do not exceed a maximum, with the package-merge
+        algorithm.
+
+        The symbols are coins whose value is their frequency. At every level from the deepest one
+        up, the cheapest items of the previous level are packaged in pairs and merged with the
+        symbols. The code length of a symbol is the number of times it appears in the 2n - 2
+        cheapest items of the last level. It takes O(n * max_code_length) time.
+
+        Args:
+            nodes (list): A list of tuples containing the symbols and their frequencies.
+            max_code_length (int): The maximum code length.
+
+        Returns:
+            dict: A dictionary mapping symbols to their code lengths.
+
+        Raises:
+            InvalidMaxCodeLength: If there are more than 2 ** max_code_length symbols.
+        """
+        if len(nodes) > 1 << max_code_length:
+            raise InvalidMaxCodeLength()
+        if len(nodes) == 1:
+            return {nodes[0][0]: 1}
+
+        # An item is (weight, index) for a symbol or (weight, (item, item)) for a package.
+        leaves = sorted(((frequency, index) for index, (_, frequency) in enumerate(nodes)),
+                        key=lambda x: x[0])
+        items = leaves
+        for _ in range(max_code_length - 1):
+            packages = [(items[i][0] + items[i + 1][0], (items[i], items[i + 1]))
+                        for i in range(0, len(items) - 1, 2)]
+            items = list(heapq.merge(leaves, packages, key=lambda x: x[0]))
+
+        lengths = [0] * len(nodes)
+        stack = items[:2 * len(nodes) - 2]
+        while stack:
+            _, content = stack.pop()
+            if type(content) is int:
+                lengths[content] += 1
+            else:
+                stack.extend(content)
+
+        return {symbol: lengths[index] for index, (symbol, _) in enumerate(nodes)}
+
+    def code_lengths(self, frequencies: dict[str, int], max_code_length: int | None = None) -> dict:
+        """
+        Calculates the Huffman code lengths for the given symbol frequencies.
+
+        Args:
+            frequencies (dict[str, int]): A dictionary mapping symbols to their frequencies, in order
+                                          of first appearance.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            dict: A dictionary mapping symbols to their code lengths.
+        """
+        nodes = sorted(frequencies.items(), key=lambda x: x[1], reverse=True)
+        tree, _ = self._build_huffman_tree(nodes)
+        lengths = self._code_lengths(tree)
+        if max_code_length is not None and max(lengths.values()) > max_code_length:
+            lengths = self._length_limited_code_lengths(nodes, max_code_length)
+        return lengths
+
+    def build_codebook(self, frequencies: dict[str, int],
+                       max_code_length: int | None = None) -> Codebook:
+        """
+        Builds the canonical codebook for the given symbol frequencies.
+
         Args:
-            nodes (list): A list of nodes where each node is a tuple containing a symbol and its 
-            frequency.
+            frequencies (dict[str, int]): A dictionary mapping symbols to their frequencies, in order
+                                          of first appearance.
+            max_code_length (int): The maximum code length, or None for no limit.
 
         Returns:
-            NodeTree: The root node of the Huffman tree.
+            Codebook: The canonical codebook.
         """
-        while len(nodes) > 1:
-            (key1, c1) = nodes[-1]
-            (key2, c2) = nodes[-2]
-            nodes = nodes[:-2]
-            node = NodeTree(key1, key2)
-            nodes.append((node, c1 + c2))
-            nodes = sorted(nodes, key=lambda x: x[1], reverse=True)
-        return nodes[0]
+        return Codebook.from_lengths(self.code_lengths(frequencies, max_code_length))
 
-    def encode(self, list_of_symbols: UnencodedSymbols) -> tuple[EncodingMap, EncodedSymbols]:
+    def _generate_codes(self, nodes, canonical: bool = False,
+                        max_code_length: int | None = None) -> dict:
+        """
+        Generates the Huffman codes for a list of nodes sorted by frequency.
+
+        A single symbol is a tree without edges, so it gets the code "0" to have at least one bit.
+        If the Huffman tree is deeper than max_code_length, the code lengths are limited with the
+        package-merge algorithm and the codes are always canonical.
+
+        Args:
+            nodes (list): A list of tuples containing the symbols and their frequencies.
+            canonical (bool): Whether to assign canonical codes from the code lengths instead of
+                              the codes given by the branches of the tree.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            dict: A dictionary mapping symbols to their Huffman codes.
+        """
+        with metrics.stage("encode", "tree"):
+            tree, _ = self._build_huffman_tree(nodes)
+        with metrics.stage("encode", "codes"):
+            if max_code_length is not None or canonical:
+                lengths = self._code_lengths(tree)
+                if max_code_length is not None and max(lengths.values()) > max_code_length:
+                    lengths = self._length_limited_code_lengths(nodes, max_code_length)
+                    return Codebook.from_lengths(lengths).encoding_map
+                if canonical:
+                    return Codebook.from_lengths(lengths).encoding_map
+            if tree.is_leaf(tree.root):
+                return {tree.symbols[0]: "0"}
+            return self._huffman_code_tree(tree)
+
+    @staticmethod
+    def _histogram_fingerprint(nodes) -> bytes:
+        """
+        Calculates a fingerprint of a frequency histogram.
+
+        The order of the nodes is part of the fingerprint, because it breaks the ties between
+        symbols with the same frequency.
+
+        Args:
+            nodes (list): A list of tuples containing the symbols and their frequencies, sorted by
+                          frequency from highest to lowest.
+
+        Returns:
+            bytes: A 128-bit digest of the histogram.
+        """
+        return hashlib.blake2b(repr(nodes).encode("utf-8", "surrogatepass"),
+                               digest_size=16).digest()
+
+    def _cached_codes(self, nodes, canonical: bool = False,
+                      max_code_length: int | None = None) -> dict:
+        """
+        Returns the Huffman codes for a list of nodes from the codebook cache, generating and
+        caching them if the histogram was not seen recently.
+
+        Args:
+            nodes (list): A list of tuples containing the symbols and their frequencies.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            dict: A read-only dictionary mapping symbols to their Huffman codes.
+        """
+        key = (self._histogram_fingerprint(nodes), canonical, max_code_length)
+        codes = self.codebook_cache.get(key)
+        if codes is None:
+            codes = self._generate_codes(nodes, canonical, max_code_length)
+            self.codebook_cache.put(key, codes)
+        return MappingProxyType(codes)
+
+    def codes(self, frequencies: dict[str, int], canonical: bool = False,
+              max_code_length: int | None = None) -> Mapping[str, str]:
+        """
+        Returns the Huffman codes for the given symbol frequencies, the same codes that `encode`
+        assigns to a list of symbols with those frequencies.
+
+        Args:
+            frequencies (dict[str, int]): A dictionary mapping symbols to their frequencies, in order
+                                          of first appearance.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            Mapping[str, str]: A read-only dictionary mapping symbols to their Huffman codes.
+        """
+        if not frequencies:
+            return MappingProxyType({})
+        nodes = sorted(frequencies.items(), key=lambda x: x[1], reverse=True)
+        return self._cached_codes(nodes, canonical, max_code_length)
+
+    def encode(self, list_of_symbols: UnencodedSymbols, canonical: bool = False,
+               max_code_length: int | None = None) -> tuple[EncodingMap, EncodedSymbols]:
         """
         Encodes a list of symbols using the Huffman coding algorithm.
 
         Args:
             list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
 
         Returns:
             tuple[EncodingMap, EncodedSymbols]: The encoding map and the encoded symbols.
@@ -112,24 +394,127 @@ class HuffmanEncoder(Encoder):
         if len(list_of_symbols.unencoded) == 0:
             return EncodingMap(map={}), EncodedSymbols(encoded=[])
 
-        nodes = self._calculate_frequencies(list_of_symbols)
-        tree = self._build_huffman_tree(nodes)
-        codes = self._huffman_code_tree(tree[0])
-        enc_symbols = [codes[symbol] for symbol in list_of_symbols.unencoded]
+        with metrics.stage("encode", "frequencies"):
+            nodes = self._calculate_frequencies(list_of_symbols)
+        codes = self._cached_codes(nodes, canonical, max_code_length)
+        with metrics.stage("encode", "emit"):
+            enc_symbols = [codes[symbol] for symbol in list_of_symbols.unencoded]
         return EncodingMap(map=codes), EncodedSymbols(encoded=enc_symbols)
 
-    def encode_using_letter_frequency_in_spanish(self, list_of_symbols: UnencodedSymbols) -> tuple[EncodingMap, EncodedSymbols]:
+    def encode_packed(self, list_of_symbols: UnencodedSymbols, canonical: bool = False,
+                      max_code_length: int | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encodes a list of symbols using the Huffman coding algorithm and packs the codes into bytes
+        without building the list of encoded symbols.
+
+        Args:
+            list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols.
+        """
+        if len(list_of_symbols.unencoded) == 0:
+            return EncodingMap(map={}), pack_codes([])
+
+        with metrics.stage("encode", "frequencies"):
+            nodes = self._calculate_frequencies(list_of_symbols)
+        codes = self._cached_codes(nodes, canonical, max_code_length)
+        with metrics.stage("encode", "emit"):
+            packed = pack_codes(map(codes.__getitem__, list_of_symbols.unencoded))
+        return EncodingMap(map=codes), packed
+
+    def _vectorized_codes(self, text: str, canonical: bool, max_code_length: int | None):
+        """
+        Counts the characters of a text with NumPy and returns their code points and codes, or
+        None if the text must be encoded by the Python path.
+        """
+        if not vectorized.AVAILABLE or not text or len(text) < self.vectorize_min_size:
+            return None
+        with metrics.stage("encode", "frequencies"):
+            points = vectorized.code_points(text)
+            nodes = vectorized.count_characters(text, points)
+        return points, self._cached_codes(nodes, canonical, max_code_length)
+
+    def encode_text(self, text: str, canonical: bool = False,
+                    max_code_length: int | None = None) -> tuple[EncodingMap, str]:
+        """
+        Encodes the characters of a text and returns the encoding map and the codes separated by
+        spaces, with NumPy if the text is long enough.
+
+        Args:
+            text (str): The text whose characters are the symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, str]: The encoding map and the encoded text.
+        """
+        result = self._vectorized_codes(text, canonical, max_code_length)
+        if result is None:
+            return super().encode_text(text, canonical, max_code_length)
+        points, codes = result
+        with metrics.stage("encode", "emit"):
+            encoded_text = vectorized.join_characters(points, codes)
+        return EncodingMap(map=codes), encoded_text
+
+    def encode_text_packed(self, text: str, canonical: bool = False,
+                           max_code_length: int | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encodes the characters of a text and returns the encoding map and the codes packed into
+        bytes, with NumPy if the text is long enough.
+
+        Args:
+            text (str): The text whose characters are the symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols.
+        """
+        result = self._vectorized_codes(text, canonical, max_code_length)
+        if result is None:
+            return super().encode_text_packed(text, canonical, max_code_length)
+        points, codes = result
+        with metrics.stage("encode", "emit"):
+            packed = vectorized.pack_characters(points, codes)
+        return EncodingMap(map=codes), packed
+
+    def pack_text(self, text: str, encoding_map: Mapping[str, str]) -> PackedSymbols:
+        """
+        Packs the codes of the characters of a text with a given encoding map, with NumPy if the
+        text is long enough.
+
+        Args:
+            text (str): The text whose characters are the symbols to encode.
+            encoding_map (Mapping[str, str]): The codes, which must include every character of the
+                                              text.
+
+        Returns:
+            PackedSymbols: The packed symbols.
+        """
+        with metrics.stage("encode", "emit"):
+            if vectorized.AVAILABLE and text and len(text) >= self.vectorize_min_size:
+                return vectorized.pack_characters(vectorized.code_points(text), encoding_map)
+            return pack_codes(map(encoding_map.__getitem__, text))
+
+    def encode_using_letter_frequency_in_spanish(self, list_of_symbols: UnencodedSymbols,
+                                                 canonical: bool = False,
+                                                 max_code_length: int | None = None) -> tuple[EncodingMap, EncodedSymbols]:
         """
         Encodes a list of symbols using the Huffman coding algorithm with the letter frequency in Spanish.
 
         Args:
             list_of_symbols (UnencodedSymbols): The list of symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
 
         Returns:
             tuple[EncodingMap, EncodedSymbols]: The encoding map and the encoded symbols.
         """
-        nodes = self._get_letter_frequency_in_spanish()
-        tree = self._build_huffman_tree(nodes)
-        codes = self._huffman_code_tree(tree[0])
-        enc_symbols = [codes[symbol] for symbol in list_of_symbols.unencoded]
-        return EncodingMap(map=codes), EncodedSymbols(encoded=enc_symbols)
+        codebook = self.spanish_codebook
+        with metrics.stage("encode", "emit"):
+            enc_symbols = codebook.encode(list_of_symbols.unencoded, canonical, max_code_length)
+        return EncodingMap(map=codebook.encoding_map(canonical, max_code_length)), \
+            EncodedSymbols(encoded=enc_symbols)
@@ -0,0 +1,152 @@
+"""
+This module provides the binary envelope of an encoding: the codes of the text packed into bytes,
+with the encoding map, the canonical codebook or the name of the pretrained codebook needed to
+decode them, in a single body. It is the compact alternative to the JSON response, whose encoded
+text takes a character per bit and a space per symbol.
+
+The envelope starts with the magic bytes b"HUFE", a version byte and the kind of its model:
+
+- An encoding map: the number of symbols, then every symbol as its UTF-8 size and bytes followed
+  by the length of its code, all as varints, and then the codes of the map packed into bytes.
+- A canonical codebook: the codebook header.
+- A pretrained codebook: the size and the ASCII bytes of its name, and its 16-byte fingerprint.
+
+The model is followed by the size of the serialized offset index of the packed codes, zero if
+there is no index, and the index, then by the number of meaningful bits of the packed codes, both
+sizes as varints, and the packed codes until the end.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass
+from .bitstream import decode_varint, encode_varint, pack_codes
+from .codebook import Codebook
+from .containers import PackedSymbols
+from .offset_index import OffsetIndex
+from app.exceptions import InvalidCodebook, InvalidContainer, InvalidOffsetIndex
+
+MAGIC = b"HUFE"
+VERSION = 1
+ENCODING_MAP = 0
+CODEBOOK = 1
+PRETRAINED = 2
+FINGERPRINT_SIZE = 16
+
+
+@dataclass(slots=True)
+class Envelope:
+    """
+    Represents an encoding read from an envelope. Only one of the models is set.
+
+    Attributes:
+        packed (PackedSymbols): The packed codes, with their offset index if the envelope has one.
+        encoding_map (dict[str, str]): The encoding map, or None.
+        codebook (Codebook): The canonical codebook, or None.
+        pretrained (str): The name of the pretrained codebook, or None.
+        fingerprint (bytes): The fingerprint of the pretrained codebook, or None.
+    """
+    packed: PackedSymbols
+    encoding_map: dict[str, str] | None = None
+    codebook: Codebook | None = None
+    pretrained: str | None = None
+    fingerprint: bytes | None = None
+
+
+def write_envelope(packed: PackedSymbols, encoding_map: Mapping[str, str] | None = None,
+                   codebook: Codebook | None = None, pretrained: str | None = None,
+                   fingerprint: bytes | None = None) -> bytes:
+    """
+    Serializes an encoding with the first model given.
+
+    Args:
+        packed (PackedSymbols): The packed codes, with their offset index or None.
+        encoding_map (Mapping[str, str]): The encoding map, or None.
+        codebook (Codebook): The canonical codebook, used if there is no encoding map.
+        pretrained (str): The name of the pretrained codebook, used if there is no encoding map
+                          nor codebook.
+        fingerprint (bytes): The fingerprint of the pretrained codebook.
+
+    Returns:
+        bytes: The envelope.
+    """
+    data = bytearray(MAGIC)
+    if encoding_map is not None:
+        data += bytes([VERSION, ENCODING_MAP]) + encode_varint(len(encoding_map))
+        for symbol, code in encoding_map.items():
+            symbol = symbol.encode("utf-8", "surrogatepass")
+            data += encode_varint(len(symbol)) + symbol + encode_varint(len(code))
+        data += pack_codes(encoding_map.values()).data
+    elif codebook is not None:
+        data += bytes([VERSION, CODEBOOK]) + codebook.to_header()
+    else:
+        name = pretrained.encode("ascii")
+        data += bytes([VERSION, PRETRAINED]) + encode_varint(len(name)) + name + fingerprint
+    index = packed.index.to_bytes() if packed.index is not None else b""
+    data += encode_varint(len(index)) + index
+    data += encode_varint(packed.bit_length)
+    data += packed.data
+    return bytes(data)
+
+
+def read_envelope(data: bytes) -> Envelope:
+    """
+    Deserializes an envelope.
+
+    Args:
+        data (bytes): The envelope.
+
+    Returns:
+        Envelope: The packed codes and the model to decode them.
+
+    Raises:
+        InvalidContainer: If the envelope cannot be read.
+    """
+    if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + 2 or data[len(MAGIC)] != VERSION:
+        raise InvalidContainer()
+    kind, offset = data[len(MAGIC) + 1], len(MAGIC) + 2
+    encoding_map = codebook = pretrained = fingerprint = None
+    try:
+        if kind == ENCODING_MAP:
+            count, offset = decode_varint(data, offset)
+            symbols, lengths = [], []
+            for _ in range(count):
+                size, offset = decode_varint(data, offset)
+                symbols.append(data[offset:offset + size].decode("utf-8", "surrogatepass"))
+                length, offset = decode_varint(data, offset + size)
+                lengths.append(length)
+            size = -(-sum(lengths) // 8)
+            bits = "".join(format(byte, "08b") for byte in data[offset:offset + size])
+            offset += size
+            encoding_map = {}
+            position = 0
+            for symbol, length in zip(symbols, lengths):
+                encoding_map[symbol] = bits[position:position + length]
+                position += length
+            if position > len(bits):
+                raise ValueError("Truncated codes")
+        elif kind == CODEBOOK:
+            codebook, offset = Codebook.read_header(data, offset)
+        elif kind == PRETRAINED:
+            size, offset = decode_varint(data, offset)
+            pretrained = data[offset:offset + size].decode("ascii")
+            offset += size
+            fingerprint = bytes(data[offset:offset + FINGERPRINT_SIZE])
+            if len(fingerprint) != FINGERPRINT_SIZE:
+                raise ValueError("Truncated fingerprint")
+            offset += FINGERPRINT_SIZE
+        else:
+            raise ValueError("Invalid kind")
+        size, offset = decode_varint(data, offset)
+        if offset + size > len(data):
+            raise ValueError("Truncated offset index")
+        index = OffsetIndex.from_bytes(data[offset:offset + size]) if size else None
+        offset += size
+        bit_length, offset = decode_varint(data, offset)
+    except (ValueError, InvalidCodebook, InvalidOffsetIndex) as exc:
+        raise InvalidContainer() from exc
+
+    payload = bytes(data[offset:])
+    if len(payload) != -(-bit_length // 8):
+        raise InvalidContainer()
+    packed = PackedSymbols(data=payload, bit_length=bit_length, padding=-bit_length % 8,
+                           index=index)
+    return Envelope(packed=packed, encoding_map=encoding_map, codebook=codebook,
+                    pretrained=pretrained, fingerprint=fingerprint)
@@ -0,0 +1,138 @@
+"""
+This module provides the `LRUCache` class, a cache bounded by the approximate size in bytes of its
+entries, shared by the caches of codebooks, decoding tables and responses.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    """
+    The statistics of a cache.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+    currbytes: int
+    maxbytes: int
+
+
+def sizeof_mapping(mapping) -> int:
+    """
+    Estimates the size in bytes of a mapping of strings, including its keys and values.
+
+    Args:
+        mapping (Mapping): The mapping.
+
+    Returns:
+        int: The approximate size in bytes.
+    """
+    getsizeof = sys.getsizeof
+    return getsizeof(mapping) + sum(getsizeof(key) + getsizeof(value)
+                                    for key, value in mapping.items())
+
+
+class LRUCache:
+    """
+    A least recently used cache whose capacity is a number of bytes instead of a number of entries.
+
+    The size of every entry is estimated when it is added, and the least recently used entries are
+    evicted until the total size fits in the capacity. An entry larger than the whole capacity is
+    not cached. The cache can be shared between threads.
+
+    Attributes:
+        max_bytes (int): The capacity of the cache in bytes. Zero disables the cache.
+        sizeof (Callable): A function that estimates the size in bytes of a value.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value of a key and marks it as the most recently used.
+
+        Args:
+            key (Hashable): The key.
+            default (Any): The value returned if the key is not in the cache.
+
+        Returns:
+            Any: The cached value, or the default value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Adds a value to the cache, evicting the least recently used entries if needed.
+
+        Args:
+            key (Hashable): The key.
+            value (Any): The value.
+        """
+        size = self.sizeof(value) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Returns the statistics of the cache.
+
+        Returns:
+            CacheInfo: The hits, misses, evictions, number of entries, current size in bytes and
+            capacity of the cache.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, len(self._entries),
+                             self._bytes, self.max_bytes)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of lookups that found their key in the cache.
+        """
+        info = self.cache_info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Removes all the entries from the cache and resets its statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = self._hits = self._misses = self._evictions = 0
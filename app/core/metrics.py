@@ -0,0 +1,299 @@
+"""
+This module provides the metrics of the encoding and decoding work: histograms of the time spent in
+every stage, the input sizes, the alphabet sizes and the output sizes, and the values read when the
+metrics are exported, written in the Prometheus text format.
+
+When the metrics are disabled, a stage is a shared context manager that does nothing and an
+observation is a single attribute check, so the instrumented code costs the same as without them.
+"""
+import math
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Iterable
+from app.config import METRICS_ENABLED
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                10.0)
+SIZE_BUCKETS = tuple(float(1 << exponent) for exponent in range(4, 30, 2))
+ALPHABET_BUCKETS = (2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 256.0, 512.0, 1024.0, 4096.0, 16384.0,
+                    65536.0)
+
+_DISABLED_STAGE = nullcontext()
+
+
+class Histogram:
+    """
+    A Prometheus histogram with labels: the number of observations not greater than every bucket,
+    their sum and their count, for every combination of label values.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The help text of the metric.
+        labelnames (tuple[str, ...]): The names of the labels.
+        buckets (tuple[float, ...]): The upper bounds of the buckets, in increasing order.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...],
+                 buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple[str, ...]):
+        """
+        Adds an observation.
+
+        Args:
+            value (float): The observed value.
+            labels (tuple[str, ...]): The values of the labels, in the order of labelnames.
+        """
+        index = _bucket_index(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """
+        Returns a copy of the observations of every combination of labels.
+
+        Args:
+            reset (bool): Whether to remove the observations after copying them.
+
+        Returns:
+            dict: The bucket counts, the sum and the count, by label values.
+        """
+        with self._lock:
+            series = {labels: [list(counts), total, count]
+                      for labels, (counts, total, count) in self._series.items()}
+            if reset:
+                self._series.clear()
+        return series
+
+    def merge(self, series: dict):
+        """
+        Adds the observations of a snapshot, such as one taken in a worker process.
+
+        Args:
+            series (dict): The snapshot of a histogram with the same buckets.
+        """
+        with self._lock:
+            for labels, (counts, total, count) in series.items():
+                current = self._series.get(labels)
+                if current is None:
+                    current = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+    def render(self) -> list[str]:
+        """
+        Writes the histogram in the Prometheus text format.
+
+        Returns:
+            list[str]: The lines of the histogram.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+class _StageTimer:
+    """
+    Measures the time spent in a block and adds it to the histogram of the stages.
+    """
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start, self._labels)
+        return False
+
+
+class Metrics:
+    """
+    The metrics of the application.
+
+    The histograms are recorded by the encoders, the decoders and their services while they work.
+    The other metrics, such as the statistics of the caches, are read by functions that are called
+    when the metrics are rendered. The metrics of every process are separate; the execution
+    backend takes the observations of the worker processes and merges them into the server.
+
+    Attributes:
+        enabled (bool): Whether the observations are recorded.
+        stage_seconds (Histogram): The seconds spent in every stage of an operation.
+        input_size (Histogram): The number of characters of the inputs.
+        alphabet_size (Histogram): The number of distinct symbols of the encoding maps.
+        output_bytes (Histogram): The number of bytes of the outputs.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.stage_seconds = Histogram("huffman_stage_duration_seconds",
+                                       "Seconds spent in every stage of an operation.",
+                                       ("operation", "stage"), TIME_BUCKETS)
+        self.input_size = Histogram("huffman_input_size_characters",
+                                    "Number of characters of the inputs.",
+                                    ("operation",), SIZE_BUCKETS)
+        self.alphabet_size = Histogram("huffman_alphabet_size_symbols",
+                                       "Number of distinct symbols of the encoding maps.",
+                                       ("operation",), ALPHABET_BUCKETS)
+        self.output_bytes = Histogram("huffman_output_size_bytes",
+                                      "Number of bytes of the outputs.",
+                                      ("operation",), SIZE_BUCKETS)
+        self._histograms = (self.stage_seconds, self.input_size, self.alphabet_size,
+                            self.output_bytes)
+        self._callbacks = {}
+
+    def stage(self, operation: str, stage: str):
+        """
+        Returns a context manager that measures the time spent in a stage.
+
+        Args:
+            operation (str): The operation, such as "encode" or "decode".
+            stage (str): The stage, such as "frequencies" or "tree".
+
+        Returns:
+            A context manager.
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _StageTimer(self.stage_seconds, (operation, stage))
+
+    def observe_sizes(self, operation: str, input_size: int, alphabet_size: int,
+                      output_bytes: int):
+        """
+        Records the sizes of an operation.
+
+        Args:
+            operation (str): The operation, such as "encode" or "decode".
+            input_size (int): The number of characters of the input.
+            alphabet_size (int): The number of distinct symbols of the encoding map.
+            output_bytes (int): The number of bytes of the output.
+        """
+        if not self.enabled:
+            return
+        labels = (operation,)
+        self.input_size.observe(input_size, labels)
+        self.alphabet_size.observe(alphabet_size, labels)
+        self.output_bytes.observe(output_bytes, labels)
+
+    def register_callback(self, name: str, documentation: str,
+                          collect: Callable[[], Iterable[tuple[dict[str, str], float]]],
+                          metric_type: str = "gauge"):
+        """
+        Registers a metric whose values are read when the metrics are rendered, replacing the
+        metric with the same name.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            collect (Callable): A function that returns the labels and the value of every series
+                                of the metric.
+            metric_type (str): "gauge", or "counter" for values that only grow.
+        """
+        self._callbacks[name] = (documentation, collect, metric_type)
+
+    def collect(self) -> dict:
+        """
+        Takes the observations recorded since the last call and removes them. It is called in the
+        worker processes, so the server can merge their observations.
+
+        Returns:
+            dict: The observations, by histogram name.
+        """
+        return {histogram.name: histogram.snapshot(reset=True) for histogram in self._histograms}
+
+    def merge(self, observations: dict):
+        """
+        Adds the observations taken in another process.
+
+        Args:
+            observations (dict): The observations returned by collect.
+        """
+        for histogram in self._histograms:
+            if histogram.name in observations:
+                histogram.merge(observations[histogram.name])
+
+    def render(self) -> str:
+        """
+        Writes all the metrics in the Prometheus text format.
+
+        Returns:
+            str: The metrics.
+        """
+        lines = []
+        for histogram in self._histograms:
+            lines.extend(histogram.render())
+        for name, (documentation, collect, metric_type) in self._callbacks.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(list(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _bucket_index(buckets: tuple[float, ...], value: float) -> int:
+    """
+    Returns the index of the first bucket whose upper bound is not less than the value.
+    """
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    """
+    Writes the labels of a sample, escaping their values.
+    """
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{_escape(str(value))}"' for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes the backslashes, quotes and line breaks of a label value.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """
+    Writes the value of a sample.
+    """
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+
+metrics = Metrics()
@@ -1,22 +1,116 @@
 """
-This module contains the NodeTree class.
+This module contains the HuffmanTree class, a binary tree stored in parallel arrays of integers.
 """
+import sys
+from array import array
+from collections.abc import Sequence
 
+NO_NODE = -1
+_NO_NODES = array("i", [NO_NODE])
 
-class NodeTree(object):
+
+class HuffmanTree:
     """
-    A class that represents a node in a binary tree.
+    A binary tree whose nodes are the positions of parallel arrays, instead of one object per node.
+
+    The tree is created with its leaves, which are the first nodes, and the arrays have room for
+    the internal nodes of a full binary tree. Every internal node is added after its children, so
+    the parent of a node is always after it and the last node is the root. The tree is walked by
+    going over the positions from the root down, without recursion or a stack. The left branch is
+    "1" and the right branch is "0".
+
+    Attributes:
+        symbols (list[str]): The symbols of the leaves.
+        left (array): The left child of every node, or NO_NODE for a leaf.
+        right (array): The right child of every node, or NO_NODE for a leaf.
+        parent (array): The parent of every node, or NO_NODE for the root.
+        symbol (array): The position in symbols of the symbol of every leaf, or NO_NODE for an
+                        internal node.
+        size (int): The number of nodes added.
     """
+    __slots__ = ("symbols", "left", "right", "parent", "symbol", "size")
+
+    def __init__(self, symbols: Sequence[str]):
+        capacity = max(2 * len(symbols) - 1, 0)
+        self.symbols = list(symbols)
+        self.left = _NO_NODES * capacity
+        self.right = _NO_NODES * capacity
+        self.parent = _NO_NODES * capacity
+        self.symbol = array("i", range(len(symbols))) + _NO_NODES * (capacity - len(symbols))
+        self.size = len(symbols)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __sizeof__(self) -> int:
+        getsizeof = sys.getsizeof
+        return object.__sizeof__(self) + getsizeof(self.symbols) + getsizeof(self.left) + \
+            getsizeof(self.right) + getsizeof(self.parent) + getsizeof(self.symbol)
+
+    @property
+    def root(self) -> int:
+        """
+        The root of the tree, which is the last node added.
+        """
+        return self.size - 1
+
+    def is_leaf(self, node: int) -> bool:
+        """
+        Returns whether a node is a leaf.
+        """
+        return self.symbol[node] != NO_NODE
+
+    def merge(self, left: int, right: int) -> int:
+        """
+        Adds an internal node with two children.
 
-    def __init__(self, left=None, right=None):
-        self.left = left
-        self.right = right
+        Args:
+            left (int): The left child.
+            right (int): The right child.
+
+        Returns:
+            int: The new node.
+        """
+        node = self.size
+        self.left[node] = left
+        self.right[node] = right
+        self.parent[left] = self.parent[right] = node
+        self.size = node + 1
+        return node
+
+    def depths(self) -> list[int]:
+        """
+        Calculates the depth of every node, from the root down.
+
+        Returns:
+            list[int]: The depth of every node.
+        """
+        parent = self.parent
+        depths = [0] * self.size
+        for node in range(self.size - 2, -1, -1):
+            depths[node] = depths[parent[node]] + 1
+        return depths
+
+    def code_lengths(self) -> dict[str, int]:
+        """
+        Calculates the code length of each symbol, which is the depth of its leaf.
+
+        Returns:
+            dict[str, int]: A dictionary mapping symbols to their code lengths.
+        """
+        return dict(zip(self.symbols, self.depths()))
 
-    def children(self):
+    def codes(self) -> dict[str, str]:
         """
-        Returns the children of the node.
+        Calculates the code of each symbol, which is the path from the root to its leaf.
 
         Returns:
-            tuple: A tuple containing the left and right children of the node.
+            dict[str, str]: A dictionary mapping symbols to their codes, in the order of the
+                            leaves.
         """
-        return (self.left, self.right)
+        parent, left = self.parent, self.left
+        paths = [""] * self.size
+        for node in range(self.size - 2, -1, -1):
+            above = parent[node]
+            paths[node] = paths[above] + ("1" if left[above] == node else "0")
+        return dict(zip(self.symbols, paths))
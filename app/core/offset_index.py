@@ -0,0 +1,109 @@
+"""
+This module provides the `OffsetIndex` class, a sparse index of the packed codes that gives the bit
+offset of every N-th symbol, so a range of symbols can be decoded without decoding the symbols
+before it.
+
+The serialized index is the interval, the number of symbols and the differences between the
+consecutive offsets, all as varints.
+"""
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from itertools import accumulate, islice
+from .bitstream import decode_varint, encode_varint
+from app.exceptions import InvalidOffsetIndex
+
+
+@dataclass(slots=True)
+class OffsetIndex:
+    """
+    Represents the checkpoints of a packed text.
+
+    Attributes:
+        interval (int): The number of symbols between two checkpoints.
+        symbols (int): The number of symbols of the packed text.
+        offsets (list[int]): The bit offset of the symbols 0, interval, 2 * interval, ... up to the
+                             number of symbols.
+    """
+    interval: int
+    symbols: int
+    offsets: list[int]
+
+    @classmethod
+    def build(cls, symbols: Sequence[str], encoding_map: Mapping[str, str],
+              interval: int) -> "OffsetIndex":
+        """
+        Builds the index of the codes of some symbols, keeping only the checkpoints in memory.
+
+        Args:
+            symbols (Sequence[str]): The symbols, in the order they are packed.
+            encoding_map (Mapping[str, str]): The codes of the symbols.
+            interval (int): The number of symbols between two checkpoints.
+
+        Returns:
+            OffsetIndex: The index.
+        """
+        lengths = {symbol: len(code) for symbol, code in encoding_map.items()}
+        offsets = accumulate(map(lengths.__getitem__, symbols), initial=0)
+        return cls(interval=interval, symbols=len(symbols),
+                   offsets=list(islice(offsets, 0, None, interval)))
+
+    def bit_range(self, start: int, stop: int, bit_length: int) -> tuple[int, int, int]:
+        """
+        Finds the bits to decode to get a range of symbols.
+
+        Args:
+            start (int): The first symbol of the range.
+            stop (int): The symbol after the last one of the range.
+            bit_length (int): The number of meaningful bits of the packed text.
+
+        Returns:
+            tuple[int, int, int]: The first bit and the bit after the last one to decode, and the
+                                  number of decoded symbols to skip before the range.
+        """
+        first = start // self.interval
+        last = -(-stop // self.interval)
+        end = self.offsets[last] if last < len(self.offsets) else bit_length
+        return self.offsets[first], end, start - first * self.interval
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the index.
+
+        Returns:
+            bytes: The serialized index.
+        """
+        data = bytearray(encode_varint(self.interval) + encode_varint(self.symbols))
+        previous = 0
+        for offset in self.offsets[1:]:
+            data += encode_varint(offset - previous)
+            previous = offset
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "OffsetIndex":
+        """
+        Reads a serialized index.
+
+        Args:
+            data (bytes): The serialized index.
+
+        Returns:
+            OffsetIndex: The index.
+
+        Raises:
+            InvalidOffsetIndex: If the index cannot be read.
+        """
+        try:
+            interval, position = decode_varint(data)
+            symbols, position = decode_varint(data, position)
+            if interval < 1:
+                raise ValueError("Invalid interval")
+            offsets = [0]
+            for _ in range(symbols // interval):
+                delta, position = decode_varint(data, position)
+                offsets.append(offsets[-1] + delta)
+        except ValueError as exc:
+            raise InvalidOffsetIndex() from exc
+        if position != len(data):
+            raise InvalidOffsetIndex()
+        return cls(interval=interval, symbols=symbols, offsets=offsets)
@@ -0,0 +1,281 @@
+"""
+This module provides the pretrained codebooks: canonical codebooks trained offline from the local
+corpora of a domain, such as Spanish syllables or JSON documents, so the texts of that domain are
+encoded without counting their frequencies and decoded without sending the encoding map.
+
+A pretrained codebook is stored in a file named after it, with the extension ".codebook". The file
+has the magic bytes b"HUFM", a version byte, the name of the tokenizer as its size and its ASCII
+bytes, and the canonical codebook header.
+"""
+import hashlib
+import os
+from collections import Counter
+from collections.abc import Callable, Iterable
+from types import MappingProxyType
+from typing import Mapping
+from .codebook import Codebook
+from .constants import Constants
+from .containers import EncodingMap
+from .encoder import HuffmanEncoder
+from .tokenizer import normalize_spanish_letters, syllable_tokenizer
+from app.config import PRETRAINED_DIR
+from app.exceptions import InvalidCodebook, InvalidPretrainedCodebook, InvalidSymbol
+
+MAGIC = b"HUFM"
+VERSION = 1
+EXTENSION = ".codebook"
+
+TOKENIZERS: dict[str, Callable[[str], list[str]]] = {
+    "characters": list,
+    "syllables": syllable_tokenizer.tokenize,
+    "spanish-letters": lambda text: list(normalize_spanish_letters(text)),
+}
+
+# Every character of the alphabet of the tokenizer is counted once more when a codebook is
+# trained, so the texts with characters that are not in the corpus can be encoded.
+SMOOTHING_ALPHABET = "\t\n\r" + "".join(map(chr, range(0x20, 0x7F))) + \
+    "".join(map(chr, range(0xA0, 0x100)))
+SMOOTHING_ALPHABETS = {
+    "characters": SMOOTHING_ALPHABET,
+    "syllables": SMOOTHING_ALPHABET,
+    "spanish-letters": "".join(Constants.LETTERS_FREQ_IN_SPANISH.value),
+}
+
+
+class PretrainedCodebook:
+    """
+    A canonical codebook for the texts of a domain, with the tokenizer that separates them into
+    its symbols.
+
+    A symbol of the text that is not in the codebook is encoded as its characters, such as a
+    syllable that was not in the corpus. The decoded text is the same, because the decoder joins
+    the symbols.
+
+    Attributes:
+        name (str): The name of the codebook.
+        tokenizer (str): The name of the tokenizer, one of TOKENIZERS.
+        codebook (Codebook): The canonical codebook.
+        fingerprint (bytes): A digest of the codebook that identifies its decoding tables.
+    """
+    __slots__ = ("name", "tokenizer", "codebook", "fingerprint", "_encoding_map")
+
+    def __init__(self, name: str, tokenizer: str, codebook: Codebook):
+        if tokenizer not in TOKENIZERS:
+            raise InvalidPretrainedCodebook()
+        self.name = name
+        self.tokenizer = tokenizer
+        self.codebook = codebook
+        self.fingerprint = hashlib.blake2b(self.to_bytes(), digest_size=16).digest()
+        self._encoding_map = MappingProxyType(codebook.encoding_map)
+
+    @property
+    def encoding_map(self) -> Mapping[str, str]:
+        """
+        A read-only view of the encoding map.
+        """
+        return self._encoding_map
+
+    def to_encoding_map(self) -> EncodingMap:
+        """
+        Returns the encoding map with the fingerprint of the codebook, so the decoder finds its
+        tables without hashing the map.
+
+        Returns:
+            EncodingMap: The encoding map.
+        """
+        return EncodingMap(map=self._encoding_map, fingerprint=self.fingerprint)
+
+    def symbols(self, text: str) -> list[str]:
+        """
+        Separates a text into the symbols of the codebook.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list[str]: The symbols, where the symbols that are not in the codebook are replaced
+                       by their characters.
+
+        Raises:
+            InvalidSymbol: If a character of the text is not in the codebook.
+        """
+        tokens = TOKENIZERS[self.tokenizer](text)
+        codes = self._encoding_map
+        missing = set(tokens).difference(codes)
+        if not missing:
+            return tokens
+        if any(char not in codes for token in missing for char in token):
+            raise InvalidSymbol()
+
+        symbols = []
+        for token in tokens:
+            if token in missing:
+                symbols.extend(token)
+            else:
+                symbols.append(token)
+        return symbols
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the codebook.
+
+        Returns:
+            bytes: The contents of the file of the codebook.
+        """
+        tokenizer = self.tokenizer.encode("ascii")
+        return MAGIC + bytes([VERSION, len(tokenizer)]) + tokenizer + self.codebook.to_header()
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes) -> "PretrainedCodebook":
+        """
+        Reads a serialized codebook.
+
+        Args:
+            name (str): The name of the codebook.
+            data (bytes): The contents of the file of the codebook.
+
+        Returns:
+            PretrainedCodebook: The codebook.
+
+        Raises:
+            InvalidPretrainedCodebook: If the codebook cannot be read.
+        """
+        header = len(MAGIC) + 2
+        if data[:len(MAGIC)] != MAGIC or len(data) < header or data[len(MAGIC)] != VERSION:
+            raise InvalidPretrainedCodebook()
+        offset = header + data[header - 1]
+        try:
+            tokenizer = data[header:offset].decode("ascii")
+            codebook = Codebook.from_header(data[offset:])
+        except (UnicodeDecodeError, InvalidCodebook) as exc:
+            raise InvalidPretrainedCodebook() from exc
+        return cls(name, tokenizer, codebook)
+
+
+def train(name: str, tokenizer: str, texts: Iterable[str], encoder: HuffmanEncoder | None = None,
+          max_code_length: int | None = None) -> PretrainedCodebook:
+    """
+    Trains a codebook from the texts of a corpus.
+
+    Args:
+        name (str): The name of the codebook.
+        tokenizer (str): The name of the tokenizer, one of TOKENIZERS.
+        texts (Iterable[str]): The texts of the corpus.
+        encoder (HuffmanEncoder): The encoder that builds the codebook, or None to create one.
+        max_code_length (int): The maximum code length, or None for no limit.
+
+    Returns:
+        PretrainedCodebook: The codebook.
+
+    Raises:
+        InvalidPretrainedCodebook: If the tokenizer is unknown.
+        InvalidMaxCodeLength: If the maximum code length is too short for the symbols.
+    """
+    if tokenizer not in TOKENIZERS:
+        raise InvalidPretrainedCodebook()
+    frequencies = Counter()
+    for text in texts:
+        frequencies.update(TOKENIZERS[tokenizer](text))
+    frequencies.update(SMOOTHING_ALPHABETS[tokenizer])
+
+    encoder = encoder or HuffmanEncoder()
+    return PretrainedCodebook(name, tokenizer,
+                              encoder.build_codebook(dict(frequencies), max_code_length))
+
+
+def spanish_letters_codebook() -> PretrainedCodebook:
+    """
+    Builds the codebook of the letter frequency in Spanish, which needs no corpus.
+
+    Returns:
+        PretrainedCodebook: The codebook.
+    """
+    return PretrainedCodebook("spanish-letters", "spanish-letters",
+                              HuffmanEncoder(codebook_cache_bytes=0).build_codebook(
+                                  Constants.LETTERS_FREQ_IN_SPANISH.value))
+
+
+class PretrainedRegistry:
+    """
+    The pretrained codebooks, by name.
+
+    The codebooks are read from the files of a directory the first time they are requested, and
+    kept for the lifetime of the registry. The codebook of the letter frequency in Spanish is
+    built in.
+
+    Attributes:
+        directory (str): The directory of the files of the codebooks.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._codebooks = {}
+        self._builtin = {"spanish-letters": spanish_letters_codebook}
+
+    def names(self) -> list[str]:
+        """
+        Returns the names of the available codebooks.
+
+        Returns:
+            list[str]: The names, sorted.
+        """
+        names = set(self._builtin)
+        if os.path.isdir(self.directory):
+            names.update(file[:-len(EXTENSION)] for file in os.listdir(self.directory)
+                         if file.endswith(EXTENSION))
+        return sorted(names)
+
+    def get(self, name: str) -> PretrainedCodebook:
+        """
+        Returns a codebook, reading it if it was not requested before.
+
+        Args:
+            name (str): The name of the codebook.
+
+        Returns:
+            PretrainedCodebook: The codebook.
+
+        Raises:
+            InvalidPretrainedCodebook: If there is no codebook with that name or it cannot be read.
+        """
+        codebook = self._codebooks.get(name)
+        if codebook is None:
+            codebook = self._load(name)
+            self._codebooks[name] = codebook
+        return codebook
+
+    def _load(self, name: str) -> PretrainedCodebook:
+        """
+        Reads a codebook from its file, or builds it if it is built in.
+        """
+        if name in self._builtin:
+            return self._builtin[name]()
+        # The name is a file name, so it cannot leave the directory.
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise InvalidPretrainedCodebook()
+        try:
+            with open(os.path.join(self.directory, name + EXTENSION), "rb") as file:
+                data = file.read()
+        except OSError as exc:
+            raise InvalidPretrainedCodebook() from exc
+        return PretrainedCodebook.from_bytes(name, data)
+
+    def save(self, codebook: PretrainedCodebook) -> str:
+        """
+        Writes a codebook to its file in the directory.
+
+        Args:
+            codebook (PretrainedCodebook): The codebook.
+
+        Returns:
+            str: The path of the file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, codebook.name + EXTENSION)
+        with open(path, "wb") as file:
+            file.write(codebook.to_bytes())
+        self._codebooks[codebook.name] = codebook
+        return path
+
+
+registry = PretrainedRegistry(PRETRAINED_DIR)
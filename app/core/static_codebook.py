@@ -0,0 +1,135 @@
+"""
+This module provides the `StaticCodebook` class, the codes of a fixed frequency model compiled once
+and shared by all the requests.
+"""
+import sys
+from types import MappingProxyType
+from typing import Callable, Mapping
+from app.config import CODEBOOK_CACHE_BYTES
+from .codebook import Codebook
+from .decoding_table import DecodingTable
+from .lru_cache import LRUCache, sizeof_mapping
+
+
+def _sizeof_codebook(codebook: Codebook) -> int:
+    """
+    Estimates the size in bytes of a codebook.
+    """
+    return sys.getsizeof(codebook) + sys.getsizeof(codebook.symbols) + \
+        sys.getsizeof(codebook.lengths)
+
+
+class StaticCodebook:
+    """
+    The codes of a frequency model that never changes, such as the letter frequency in Spanish.
+
+    The encoding maps and decoding tables are compiled the first time they are needed and kept in
+    caches bounded by their size in bytes, so encoding with the model is a table lookup per symbol.
+    The default and the canonical codes are compiled when the codebook is created. A maximum code
+    length that is not shorter than the longest code without limit gives the same codes, so it is
+    the same key as no limit.
+
+    Attributes:
+        nodes (tuple): The symbols and their frequencies, sorted by frequency from highest to
+                       lowest.
+        generate_codes (Callable): A function that receives the nodes, whether to use canonical
+                                   codes and the maximum code length, and returns the encoding map.
+        max_length (int): The length of the longest code without limit.
+    """
+
+    def __init__(self, nodes: list[tuple[str, int]], generate_codes: Callable[..., dict],
+                 cache_bytes: int = CODEBOOK_CACHE_BYTES):
+        self.nodes = tuple(nodes)
+        self._generate_codes = generate_codes
+        self._encoding_maps = LRUCache(cache_bytes, sizeof=sizeof_mapping)
+        self._decoding_tables = LRUCache(cache_bytes)
+        self._codebooks = LRUCache(cache_bytes, sizeof=_sizeof_codebook)
+        codes = generate_codes(list(self.nodes), False, None)
+        self._encoding_maps.put((False, None), codes)
+        self.max_length = max(map(len, codes.values()), default=0)
+        self._codes(True, None)
+
+    def _limit(self, max_code_length: int | None) -> int | None:
+        """
+        Returns the maximum code length of the key, which is None if it does not limit the codes.
+        """
+        if max_code_length is None or max_code_length >= self.max_length:
+            return None
+        return max_code_length
+
+    def _codes(self, canonical: bool, max_code_length: int | None) -> dict[str, str]:
+        """
+        Returns the compiled encoding map for the given options, compiling it if needed.
+        """
+        max_code_length = self._limit(max_code_length)
+        key = (canonical, max_code_length)
+        codes = self._encoding_maps.get(key)
+        if codes is None:
+            codes = self._generate_codes(list(self.nodes), canonical, max_code_length)
+            self._encoding_maps.put(key, codes)
+        return codes
+
+    def encoding_map(self, canonical: bool = False,
+                     max_code_length: int | None = None) -> Mapping[str, str]:
+        """
+        Returns a read-only view of the encoding map.
+
+        Args:
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            Mapping[str, str]: The encoding map.
+        """
+        return MappingProxyType(self._codes(canonical, max_code_length))
+
+    def decoding_table(self, canonical: bool = False,
+                       max_code_length: int | None = None) -> DecodingTable:
+        """
+        Returns the decoding table of the codes.
+
+        Args:
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            DecodingTable: The decoding table.
+        """
+        key = (canonical, self._limit(max_code_length))
+        table = self._decoding_tables.get(key)
+        if table is None:
+            table = DecodingTable(self._codes(canonical, max_code_length))
+            self._decoding_tables.put(key, table)
+        return table
+
+    def codebook(self, max_code_length: int | None = None) -> Codebook:
+        """
+        Returns the canonical codebook of the codes.
+
+        Args:
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            Codebook: The canonical codebook.
+        """
+        key = self._limit(max_code_length)
+        codebook = self._codebooks.get(key)
+        if codebook is None:
+            codebook = Codebook.from_encoding_map(self._codes(True, max_code_length))
+            self._codebooks.put(key, codebook)
+        return codebook
+
+    def encode(self, symbols: list[str], canonical: bool = False,
+               max_code_length: int | None = None) -> list[str]:
+        """
+        Encodes a list of symbols.
+
+        Args:
+            symbols (list[str]): The symbols to encode.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+
+        Returns:
+            list[str]: The code of each symbol.
+        """
+        return list(map(self._codes(canonical, max_code_length).__getitem__, symbols))
@@ -0,0 +1,139 @@
+"""
+This module provides the `SyllableTokenizer` class, which separates a text into Spanish syllables
+and special characters, the tokenizer shared by all the requests, and the normalization of a text
+to the letters of the letter frequency in Spanish.
+"""
+import re
+from functools import lru_cache
+from syltippy import syllabize
+from app.core.constants import Constants
+
+LETTER_SET = frozenset(Constants.LETTERS.value)
+WORD_SPLIT_PATTERN = re.compile(f"([{re.escape(Constants.LETTERS.value)}]+)")
+SYLLABLE_CACHE_SIZE = 1 << 16
+MAX_WORD_LENGTH = 1 << 8
+
+
+class _SpanishLettersTable(dict):
+    """
+    A translation table that keeps the letters of the letter frequency in Spanish, removes the
+    accents and deletes every other character.
+    """
+
+    def __missing__(self, key: int) -> None:
+        return None
+
+
+SPANISH_LETTERS_TABLE = _SpanishLettersTable(
+    {ord(letter): ord(letter) for letter in Constants.LETTERS_FREQ_IN_SPANISH.value})
+SPANISH_LETTERS_TABLE.update(str.maketrans("ÁÉÍÓÚÜ", "AEIOUU"))
+
+
+def is_letter(char: str) -> bool:
+    """
+    Checks whether a character is one of the letters that form words.
+
+    Args:
+        char (str): The character.
+
+    Returns:
+        bool: Whether the character is in Constants.LETTERS.
+    """
+    return char in LETTER_SET
+
+
+def normalize_spanish_letters(text: str) -> str:
+    """
+    Converts a text to the letters of the letter frequency in Spanish in a single pass: the text
+    is converted to uppercase, the accents are removed and the other characters are deleted.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The normalized text.
+    """
+    return text.upper().translate(SPANISH_LETTERS_TABLE)
+
+
+class SyllableTokenizer:
+    """
+    Separates a text into syllables and special characters.
+
+    The words are found in a single pass with a regular expression, and the syllables of every
+    word are kept in a bounded LRU cache, so a word that repeats is only syllabified once. A word
+    longer than MAX_WORD_LENGTH letters is separated into pieces of that length from its first
+    letter, the last one possibly shorter, and every piece is syllabified as a word.
+    """
+
+    def __init__(self, cache_size: int = SYLLABLE_CACHE_SIZE):
+        self._syllables = lru_cache(maxsize=cache_size)(self._syllabize)
+
+    @staticmethod
+    def _syllabize(word: str) -> tuple[str, ...]:
+        """
+        Separates a word into syllables.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            tuple[str, ...]: The syllables of the word.
+        """
+        syllables, _ = syllabize(word)
+        return tuple(syllables)
+
+    def tokenize(self, text: str) -> list[str]:
+        """
+        Separates the text into syllables and special characters.
+
+        Args:
+            text (str): The text to be separated.
+
+        Returns:
+            list: A list containing the syllables and special characters.
+        """
+        symbols = []
+        extend = symbols.extend
+        syllables = self._syllables
+
+        # The split alternates the text between words, at odd positions, and the characters
+        # between them, at even positions.
+        for index, part in enumerate(WORD_SPLIT_PATTERN.split(text)):
+            if index % 2:
+                if len(part) > MAX_WORD_LENGTH:
+                    for start in range(0, len(part), MAX_WORD_LENGTH):
+                        extend(syllables(part[start:start + MAX_WORD_LENGTH]))
+                else:
+                    extend(syllables(part))
+            else:
+                extend(part)
+
+        return symbols
+
+    def cache_info(self):
+        """
+        Returns the statistics of the syllable cache.
+
+        Returns:
+            CacheInfo: The hits, misses, maximum size and current size of the cache.
+        """
+        return self._syllables.cache_info()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of words whose syllables were found in the cache.
+        """
+        info = self._syllables.cache_info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def clear_cache(self):
+        """
+        Removes all the words from the cache and resets its statistics.
+        """
+        self._syllables.cache_clear()
+
+
+syllable_tokenizer = SyllableTokenizer()
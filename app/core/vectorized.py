@@ -0,0 +1,154 @@
+"""
+This module provides the vectorized engine that encodes the characters of a text with NumPy: the
+characters are counted with `bincount`, the codes are gathered from a table with array indexing and
+the bits are packed with `packbits`. NumPy is optional; without it `AVAILABLE` is False and the
+encoders use the pure Python path.
+"""
+from typing import Iterator
+from .containers import PackedSymbols
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+AVAILABLE = np is not None
+CHUNK_SYMBOLS = 1 << 20
+FIRST_SEEN_CHUNK = 1 << 16
+
+
+def code_points(text: str):
+    """
+    Converts a text to the array of its code points.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        numpy.ndarray: The code points, as 32-bit unsigned integers.
+    """
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+
+
+def count_characters(text: str, points) -> list[tuple[str, int]]:
+    """
+    Counts the characters of a text and sorts them as the Python path does: by frequency from
+    highest to lowest and, with the same frequency, in order of first appearance.
+
+    The frequencies are counted with `bincount`. The order of first appearance is read from the
+    start of the text, a chunk at a time, until every character has been seen, which usually takes
+    a single chunk.
+
+    Args:
+        text (str): The text.
+        points (numpy.ndarray): The code points of the text.
+
+    Returns:
+        list: A list of tuples containing the characters and their frequencies.
+    """
+    counts = np.bincount(points)
+    distinct = int(np.count_nonzero(counts))
+
+    first_seen = {}
+    start = 0
+    while len(first_seen) < distinct:
+        first_seen.update(dict.fromkeys(text[start:start + FIRST_SEEN_CHUNK]))
+        start += FIRST_SEEN_CHUNK
+
+    frequencies = counts[[ord(char) for char in first_seen]].tolist()
+    return sorted(zip(first_seen, frequencies), key=lambda x: x[1], reverse=True)
+
+
+def count_bytes(data: bytes) -> list[int]:
+    """
+    Counts the bytes of a buffer with `bincount`.
+
+    Args:
+        data (bytes): The buffer.
+
+    Returns:
+        list[int]: The number of times every byte value, from 0 to 255, appears.
+    """
+    return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256).tolist()
+
+
+def _code_tables(points, codes: dict[str, str], separator: str = ""):
+    """
+    Builds the concatenation of the codes, written with one byte per character and each one
+    followed by the separator, and the arrays, indexed by code point, of the position and the
+    length of every code in it.
+    """
+    # The codes may include characters that are not in the text, such as with a shared codebook.
+    size = max(int(points.max()) if len(points) else 0, max(map(ord, codes), default=0)) + 1
+    starts = np.zeros(size, dtype=np.int64)
+    lengths = np.zeros(size, dtype=np.int64)
+    table = "".join(code + separator for code in codes.values())
+    position = 0
+    for char, code in codes.items():
+        starts[ord(char)] = position
+        lengths[ord(char)] = len(code) + len(separator)
+        position += len(code) + len(separator)
+    return np.frombuffer(table.encode("ascii"), dtype=np.uint8), starts, lengths
+
+
+def _gather_codes(points, table, starts, lengths) -> Iterator:
+    """
+    Copies the codes of the characters from the table, a chunk of characters at a time.
+
+    The byte at position i of the output belongs to the character whose code ends after i, and it
+    is the byte of the table at i minus the position where the output of that character starts
+    plus the position where its code starts in the table. That difference is constant for every
+    character, so it is repeated once per byte of its code and added to the positions.
+
+    Yields:
+        numpy.ndarray: The bytes of the codes of the chunk.
+    """
+    for start in range(0, len(points), CHUNK_SYMBOLS):
+        chunk = points[start:start + CHUNK_SYMBOLS]
+        chunk_lengths = lengths[chunk]
+        ends = np.cumsum(chunk_lengths)
+        shifts = np.repeat(starts[chunk] - (ends - chunk_lengths), chunk_lengths)
+        yield table[np.arange(len(shifts)) + shifts]
+
+
+def pack_characters(points, codes: dict[str, str]) -> PackedSymbols:
+    """
+    Packs the codes of the characters into bytes, most significant bit first.
+
+    Args:
+        points (numpy.ndarray): The code points of the text.
+        codes (dict): The encoding map.
+
+    Returns:
+        PackedSymbols: The packed codes.
+    """
+    table, starts, lengths = _code_tables(points, codes)
+    table = table - ord("0")
+    parts = []
+    carry = np.zeros(0, dtype=np.uint8)
+    bit_length = 0
+    for bits in _gather_codes(points, table, starts, lengths):
+        bit_length += len(bits)
+        bits = np.concatenate((carry, bits))
+        complete = len(bits) - len(bits) % 8
+        parts.append(np.packbits(bits[:complete]).tobytes())
+        carry = bits[complete:]
+    parts.append(np.packbits(carry).tobytes())
+
+    return PackedSymbols(data=b"".join(parts), bit_length=bit_length, padding=-bit_length % 8)
+
+
+def join_characters(points, codes: dict[str, str]) -> str:
+    """
+    Writes the codes of the characters as text, separated by spaces.
+
+    Args:
+        points (numpy.ndarray): The code points of the text.
+        codes (dict): The encoding map.
+
+    Returns:
+        str: The encoded text.
+    """
+    table, starts, lengths = _code_tables(points, codes, separator=" ")
+    text = b"".join(chunk.tobytes() for chunk in _gather_codes(points, table, starts, lengths))
+    return text[:-1].decode("ascii")
@@ -3,14 +3,12 @@ This module contains the dependencies for the FastAPI application.
 """
 from app.core.encoder import Encoder
 from app.core.decoder import Decoder
-from app.core.constants import Constants
-from app.services.encoder_service import EncoderService
-from app.services.decoder_service import DecoderService
+from app.services.encoder_service import encoder_service
+from app.services.decoder_service import decoder_service
+from app.services.batch_service import BatchService
+from app.services.block_service import BlockService
+from app.services.execution import get_process_executor
 from app.schemas import EncodeRequest, DecodeRequest
-from .exceptions import InvalidAlgorithm
-
-ENCODERS = Constants.get_encoders()
-DECODERS = Constants.get_decoders()
 
 
 async def get_encoder_service(request: EncodeRequest) -> Encoder:
@@ -26,12 +24,7 @@ async def get_encoder_service(request: EncodeRequest) -> Encoder:
     Raises:
         ValueError: If the encoding algorithm is unknown.
     """
-    algorithm = request.algorithm
-
-    if algorithm not in ENCODERS:
-        raise InvalidAlgorithm()
-
-    return EncoderService(ENCODERS[algorithm])
+    return encoder_service(request.algorithm)
 
 
 async def get_huffman_enc_service() -> Encoder:
@@ -41,7 +34,23 @@ async def get_huffman_enc_service() -> Encoder:
     Returns:
         Encoder: The encoder service for the Huffman algorithm.
     """
-    return EncoderService(ENCODERS["huffman"])
+    return encoder_service("huffman")
+
+
+async def get_stream_encoder_service(algorithm: str = "huffman") -> Encoder:
+    """
+    Return the encoder service for a stream, where the algorithm is a query parameter.
+
+    Args:
+        algorithm (str): The encoding algorithm. Default is "huffman".
+
+    Returns:
+        Encoder: The encoder service.
+
+    Raises:
+        InvalidAlgorithm: If the encoding algorithm is unknown.
+    """
+    return encoder_service(algorithm)
 
 
 async def get_decoder_service(request: DecodeRequest) -> Decoder:
@@ -57,9 +66,40 @@ async def get_decoder_service(request: DecodeRequest) -> Decoder:
     Raises:
         ValueError: If the decoding algorithm is unknown.
     """
-    algorithm = request.algorithm
+    return decoder_service(request.algorithm)
 
-    if algorithm not in DECODERS:
-        raise InvalidAlgorithm()
 
-    return DecoderService(DECODERS[algorithm])
+async def get_binary_decoder_service(algorithm: str = "huffman") -> Decoder:
+    """
+    Return the decoder service for a binary request, where the algorithm is a query parameter.
+
+    Args:
+        algorithm (str): The decoding algorithm. Default is "huffman".
+
+    Returns:
+        Decoder: The decoder service.
+
+    Raises:
+        InvalidAlgorithm: If the decoding algorithm is unknown.
+    """
+    return decoder_service(algorithm)
+
+
+async def get_batch_service() -> BatchService:
+    """
+    Return the batch service, which runs the items on the shared process pool.
+
+    Returns:
+        BatchService: The batch service.
+    """
+    return BatchService(get_process_executor())
+
+
+async def get_block_service() -> BlockService:
+    """
+    Return the block service, which runs the blocks on the shared process pool.
+
+    Returns:
+        BlockService: The block service.
+    """
+    return BlockService(get_process_executor())
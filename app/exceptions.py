@@ -19,6 +19,91 @@ class InvalidAlgorithm(CustomException):
     """
 
 
+class InvalidMaxCodeLength(CustomException):
+    """
+    Exception raised when the maximum code length is too short for the number of symbols.
+    """
+
+
+class InvalidText(CustomException):
+    """
+    Exception raised when a text to encode is not valid UTF-8.
+    """
+
+
+class InvalidEncodingMap(CustomException):
+    """
+    Exception raised when an encoding map is not a valid prefix code.
+    """
+
+
+class InvalidCodebook(CustomException):
+    """
+    Exception raised when a serialized codebook cannot be read.
+    """
+
+
+class InvalidEncodedText(CustomException):
+    """
+    Exception raised when an encoded text cannot be decoded with the encoding map.
+    """
+
+
+class InvalidContainer(CustomException):
+    """
+    Exception raised when a block container cannot be read or its checksums do not match.
+    """
+
+
+class InvalidOffsetIndex(CustomException):
+    """
+    Exception raised when an offset index cannot be read or does not match the symbol range.
+    """
+
+
+class HeaderTooLarge(CustomException):
+    """
+    Exception raised when a response header would be larger than the limit of the headers, such as
+    the encoding map of a large alphabet or the offset index of a long text in the binary output
+    format.
+    """
+
+
+class InvalidPretrainedCodebook(CustomException):
+    """
+    Exception raised when a pretrained codebook does not exist, cannot be read or does not have
+    the fingerprint of the codebook a text was encoded with.
+    """
+
+
+class InvalidSymbol(CustomException):
+    """
+    Exception raised when a text has a character that is not in the pretrained codebook.
+    """
+
+
+class InvalidOptions(CustomException):
+    """
+    Exception raised when the options of a request are not supported by the algorithm.
+    """
+
+
+ERROR_DETAILS = {
+    InvalidAlgorithm: "Invalid algorithm",
+    InvalidMaxCodeLength: "Invalid max code length",
+    InvalidText: "Invalid text",
+    InvalidEncodingMap: "Invalid encoding map",
+    InvalidCodebook: "Invalid codebook",
+    InvalidEncodedText: "Invalid encoded text",
+    InvalidOptions: "Invalid options for the algorithm",
+    InvalidContainer: "Invalid container",
+    InvalidOffsetIndex: "Invalid offset index",
+    HeaderTooLarge: "Header too large, accept application/vnd.huffman.envelope instead",
+    InvalidPretrainedCodebook: "Invalid pretrained codebook",
+    InvalidSymbol: "Invalid symbol for the pretrained codebook",
+}
+
+
 def create_exception_handler(status_code: int,
                              detail: Any,
                              headers: dict[str, str] | None = None) -> Callable[[Request, Exception], JSONResponse]:
@@ -43,5 +128,6 @@ def register_exception_handlers(app: FastAPI):
     """
     Registers exception handlers for the FastAPI application.
     """
-    app.add_exception_handler(InvalidAlgorithm,
-                              create_exception_handler(status.HTTP_400_BAD_REQUEST, "Invalid algorithm"))
+    for exception, detail in ERROR_DETAILS.items():
+        app.add_exception_handler(exception,
+                                  create_exception_handler(status.HTTP_400_BAD_REQUEST, detail))
@@ -1,14 +1,32 @@
 """
 Main module for the FastAPI application.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from app.api.compression import CompressionMiddleware
+from app.api.metrics_router import metrics_router
 from app.api.v1.v1_router import v1_router
 from app.api.views.views_router import views_router
+from app.config import COMPRESSION_LEVEL
 from app.exceptions import register_exception_handlers
+from app.services.execution import loop_lag_monitor, shutdown_executors
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Measures the lag of the event loop while the application runs, and stops the thread pool and
+    the worker processes when it shuts down.
+    """
+    loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.stop()
+    shutdown_executors()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -22,8 +40,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if COMPRESSION_LEVEL > 0:
+    app.add_middleware(CompressionMiddleware)
+
 app.include_router(v1_router)
 app.include_router(views_router)
+app.include_router(metrics_router)
 
 register_exception_handlers(app)
 
@@ -1,51 +1,49 @@
 """
 This module contains the Pydantic schemas for the API.
 """
-from pydantic import BaseModel
+from typing import Any, Literal
+from pydantic import BaseModel, Field, model_validator
+from app.config import BATCH_MAX_ITEMS
 
 
-class UnencodedSymbols(BaseModel):
+class EncodeBatchItem(BaseModel):
     """
-    Represents a list of unencoded symbols.
+    Represents a text to encode in a batch.
 
     Attributes:
-        unencoded (list[str]): The list of unencoded symbols
-    """
-    unencoded: list[str]
-
-
-class EncodedSymbols(BaseModel):
-    """
-    Represents a list of encoded symbols.
-
-    Attributes:
-        encoded (list[str]): The list of encoded symbols
-    """
-    encoded: list[str]
-
-
-class EncodingMap(BaseModel):
-    """
-    Represents an encoding map.
-
-    Attributes:
-        map (dict[str, str]): The encoding map
+        algorithm (str): The encoding algorithm to use. Default is "huffman"
+        separate_syllables (bool): Whether to separate syllables. Default is False
+        use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish. Default is
+                                        False
+        canonical (bool): Whether to use canonical codes and return a compact codebook instead of
+                          the encoding map. Default is False
+        max_code_length (int): The maximum length of the codes. Default is None, for no limit
+        pretrained (str): The name of a pretrained codebook to encode the text with, instead of
+                          the frequencies of its symbols. Default is None
+        text (str): The text to encode
     """
-    map: dict[str, str]
+    algorithm: str | None = "huffman"
+    separate_syllables: bool | None = False
+    use_spanish_frequencies: bool | None = False
+    canonical: bool = False
+    max_code_length: int | None = Field(None, ge=1)
+    pretrained: str | None = None
+    text: str
 
 
-class EncodeRequest(BaseModel):
+class EncodeRequest(EncodeBatchItem):
     """
     Represents the request to encode a text.
 
     Attributes:
-        algorithm (str): The encoding algorithm to use. Default is "huffman"
-        separate_syllables (bool): Whether to separate syllables. Default is False
-        text (str): The text to encode
+        output_format (str): "text" for space-separated codes or "binary" for codes packed into
+                             bytes. Default is "text"
+        index_interval (int): The number of symbols between the checkpoints of the offset index
+                              of the packed codes. Default is None, for no index. Only with the
+                              "binary" output format or the envelope
     """
-    algorithm: str | None = "huffman"
-    separate_syllables: bool | None = False
-    text: str
+    output_format: Literal["text", "binary"] = "text"
+    index_interval: int | None = Field(None, ge=1)
 
 
 class EncodeResponse(BaseModel):
@@ -53,11 +51,24 @@ class EncodeResponse(BaseModel):
     Represents the response of an encoding request.
 
     Attributes:
-        encoding_map (dict[str, str]): The encoding map
+        encoding_map (dict[str, str]): The encoding map, when canonical codes are not used
+        codebook (str): The canonical codebook serialized and encoded in base64, when canonical
+                        codes are used
+        pretrained (str): The name of the pretrained codebook, when the text is encoded with one
+        pretrained_fingerprint (str): The fingerprint of the pretrained codebook in hexadecimal,
+                                      which the decoder checks so a retrained codebook is not
+                                      used to decode the text
         encoded_text (str): The encoded text
+        compression_cost (float): How much larger the encoded text is because of the maximum code
+                                  length, relative to codes without a limit. Only present when
+                                  max_code_length is given
     """
-    encoding_map: dict[str, str]
+    encoding_map: dict[str, str] | None = None
+    codebook: str | None = None
+    pretrained: str | None = None
+    pretrained_fingerprint: str | None = None
     encoded_text: str
+    compression_cost: float | None = None
 
 
 class DecodeRequest(BaseModel):
@@ -67,11 +78,32 @@ class DecodeRequest(BaseModel):
     Attributes:
         algorithm (str): The decoding algorithm to use. Default is "huffman"
         encoded_text (str): The encoded text
-        encoding_map (dict[str, str]): The encoding map
+        encoding_map (dict[str, str]): The encoding map. Required if neither codebook nor
+                                       pretrained is given, except for the "adaptive" algorithm
+        codebook (str): The canonical codebook in base64, used if encoding_map is not given
+        pretrained (str): The name of the pretrained codebook the text was encoded with, used if
+                          neither encoding_map nor codebook is given
+        pretrained_fingerprint (str): The fingerprint of the pretrained codebook returned by the
+                                      encoder. If it is given, the text is only decoded if the
+                                      codebook has the same fingerprint
     """
     algorithm: str | None = "huffman"
     encoded_text: str
-    encoding_map: dict[str, str]
+    encoding_map: dict[str, str] | None = None
+    codebook: str | None = None
+    pretrained: str | None = None
+    pretrained_fingerprint: str | None = None
+
+    @model_validator(mode="after")
+    def check_encoding_map_or_codebook(self) -> "DecodeRequest":
+        """
+        Checks that the request has an encoding map, a codebook or a pretrained codebook, unless
+        the algorithm is adaptive.
+        """
+        if self.encoding_map is None and self.codebook is None and self.pretrained is None and \
+                self.algorithm != "adaptive":
+            raise ValueError("encoding_map, codebook or pretrained is required")
+        return self
 
 
 class DecodeResponse(BaseModel):
@@ -82,3 +114,127 @@ class DecodeResponse(BaseModel):
         decoded_text (str): The decoded text
     """
     decoded_text: str
+
+
+class EncodeBatchRequest(BaseModel):
+    """
+    Represents the request to encode several texts.
+
+    The items are validated one by one when they are encoded, so an invalid item is reported in
+    its result instead of rejecting the batch.
+
+    Attributes:
+        items (list[dict]): The texts to encode, each one with the fields of EncodeBatchItem
+    """
+    items: list[dict[str, Any]] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class EncodeBatchResult(BaseModel):
+    """
+    Represents the result of encoding a text of a batch.
+
+    Attributes:
+        response (EncodeResponse): The encoded text, if it could be encoded
+        error (str): The reason why the text could not be encoded
+    """
+    response: EncodeResponse | None = None
+    error: str | None = None
+
+
+class EncodeBatchResponse(BaseModel):
+    """
+    Represents the response of a batch encoding request.
+
+    Attributes:
+        results (list[EncodeBatchResult]): The results, in the order of the items
+    """
+    results: list[EncodeBatchResult]
+
+
+class DecodeBatchRequest(BaseModel):
+    """
+    Represents the request to decode several texts.
+
+    The items are validated one by one when they are decoded, so an invalid item is reported in
+    its result instead of rejecting the batch.
+
+    Attributes:
+        items (list[dict]): The texts to decode, each one with the fields of DecodeRequest
+    """
+    items: list[dict[str, Any]] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class DecodeBatchResult(BaseModel):
+    """
+    Represents the result of decoding a text of a batch.
+
+    Attributes:
+        response (DecodeResponse): The decoded text, if it could be decoded
+        error (str): The reason why the text could not be decoded
+    """
+    response: DecodeResponse | None = None
+    error: str | None = None
+
+
+class DecodeBatchResponse(BaseModel):
+    """
+    Represents the response of a batch decoding request.
+
+    Attributes:
+        results (list[DecodeBatchResult]): The results, in the order of the items
+    """
+    results: list[DecodeBatchResult]
+
+
+class EncodingSessionUpdate(BaseModel):
+    """
+    Represents the text of an encoding session after an edit.
+
+    Attributes:
+        text (str): The whole text. Default is ""
+        separate_syllables (bool): Whether to separate syllables. Default is False
+        use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish. Default is
+                                        False
+    """
+    text: str = ""
+    separate_syllables: bool = False
+    use_spanish_frequencies: bool = False
+
+
+class EncodingMapDiff(BaseModel):
+    """
+    Represents the changes of the encoding map of a session.
+
+    Attributes:
+        reset (bool): Whether the previous encoding map must be discarded before the changes are
+                      applied, on the first update and when the options change
+        updated (dict[str, str]): The symbols whose code is new or different
+        removed (list[str]): The symbols that are no longer in the encoding map
+    """
+    reset: bool = False
+    updated: dict[str, str]
+    removed: list[str]
+
+
+class EncodedTextDiff(BaseModel):
+    """
+    Represents the changes of the encoded text of a session.
+
+    Attributes:
+        start (int): The position of the encoded text from which it changed
+        text (str): The encoded text that replaces everything from the start
+    """
+    start: int
+    text: str
+
+
+class EncodingSessionDiff(BaseModel):
+    """
+    Represents the changes of an encoding session after an edit.
+
+    Attributes:
+        encoding_map (EncodingMapDiff): The changes of the encoding map
+        encoded_text (EncodedTextDiff): The changes of the encoded text
+    """
+    encoding_map: EncodingMapDiff
+    encoded_text: EncodedTextDiff
@@ -0,0 +1,160 @@
+"""
+This module contains the BatchService class, which encodes and decodes batches of texts on a process
+pool, and the functions that run in the worker processes.
+"""
+import logging
+import math
+from concurrent.futures import Executor
+from typing import Any, Callable
+from pydantic import ValidationError
+from app.config import PROCESS_WORKERS
+from app.exceptions import CustomException, ERROR_DETAILS
+from app.schemas import (DecodeBatchResult, DecodeRequest, DecodeResponse, EncodeBatchItem,
+                         EncodeBatchResult, EncodeResponse)
+from app.services.decoder_service import decoder_service
+from app.services.encoder_service import encoder_service
+from app.services.execution import run_in_pool
+
+CHUNKS_PER_WORKER = 4
+INTERNAL_ERROR = "Internal server error"
+INVALID_ITEM = "Invalid item"
+
+logger = logging.getLogger(__name__)
+
+
+class BatchService:
+    """
+    A class that represents the batch service.
+
+    The items are split into chunks, a few per worker, so the workers stay busy while the cost of
+    sending every chunk to a process is shared by several items. The results are returned in the
+    order of the items.
+
+    Attributes:
+        executor (Executor): The pool that runs the chunks, or None to run them in the calling
+                             thread.
+        workers (int): The number of workers of the pool.
+    """
+
+    def __init__(self, executor: Executor | None, workers: int = PROCESS_WORKERS):
+        self.executor = executor
+        self.workers = workers
+
+    async def encode(self, items: list[dict[str, Any]]) -> list[EncodeBatchResult]:
+        """
+        Encode the texts of a batch.
+
+        Args:
+            items (list[dict]): The texts to encode and their options, with the fields of
+                                EncodeBatchItem.
+
+        Returns:
+            list[EncodeBatchResult]: The encoded text or the error of every item, in order.
+        """
+        return await self._map(encode_items, items)
+
+    async def decode(self, items: list[dict[str, Any]]) -> list[DecodeBatchResult]:
+        """
+        Decode the texts of a batch.
+
+        Args:
+            items (list[dict]): The texts to decode and their encoding maps or codebooks, with the
+                                fields of DecodeRequest.
+
+        Returns:
+            list[DecodeBatchResult]: The decoded text or the error of every item, in order.
+        """
+        return await self._map(decode_items, items)
+
+    async def _map(self, function: Callable[[list], list], items: list) -> list:
+        """
+        Apply a function to the chunks of a list of items on the executor.
+
+        Args:
+            function (Callable): A function that receives a chunk of items and returns their
+                                 results.
+            items (list): The items.
+
+        Returns:
+            list: The results of all the items, in order.
+        """
+        if self.executor is None:
+            return function(items)
+
+        size = max(1, math.ceil(len(items) / (self.workers * CHUNKS_PER_WORKER)))
+        chunks = await run_in_pool(self.executor, function,
+                                   [(items[start:start + size],)
+                                    for start in range(0, len(items), size)])
+        return [result for chunk in chunks for result in chunk]
+
+
+def encode_items(items: list[dict[str, Any]]) -> list[EncodeBatchResult]:
+    """
+    Encode a chunk of a batch. It runs in a worker process.
+
+    Args:
+        items (list[dict]): The texts to encode and their options, not validated yet.
+
+    Returns:
+        list[EncodeBatchResult]: The encoded text or the error of every item.
+    """
+    results = []
+    for item in items:
+        try:
+            results.append(EncodeBatchResult(
+                response=_encode_item(EncodeBatchItem.model_validate(item))))
+        except Exception as exc:
+            results.append(EncodeBatchResult(error=_error_detail(exc)))
+    return results
+
+
+def decode_items(items: list[dict[str, Any]]) -> list[DecodeBatchResult]:
+    """
+    Decode a chunk of a batch. It runs in a worker process.
+
+    Args:
+        items (list[dict]): The texts to decode and their encoding maps or codebooks, not
+                            validated yet.
+
+    Returns:
+        list[DecodeBatchResult]: The decoded text or the error of every item.
+    """
+    results = []
+    for item in items:
+        try:
+            results.append(DecodeBatchResult(
+                response=_decode_item(DecodeRequest.model_validate(item))))
+        except Exception as exc:
+            results.append(DecodeBatchResult(error=_error_detail(exc)))
+    return results
+
+
+def _encode_item(item: EncodeBatchItem) -> EncodeResponse:
+    """
+    Encode a text of a batch.
+    """
+    service = encoder_service(item.algorithm)
+    return service.encode_sync(item.text, item.separate_syllables, item.use_spanish_frequencies,
+                               item.canonical, item.max_code_length, item.pretrained)
+
+
+def _decode_item(item: DecodeRequest) -> DecodeResponse:
+    """
+    Decode a text of a batch.
+    """
+    service = decoder_service(item.algorithm)
+    return service.decode_sync(item.encoded_text, item.encoding_map, item.codebook,
+                               item.pretrained, item.pretrained_fingerprint)
+
+
+def _error_detail(exc: Exception) -> str:
+    """
+    Return the message of an error, as it is returned by the exception handlers. An item whose
+    fields are not valid is an invalid item.
+    """
+    if isinstance(exc, ValidationError):
+        return INVALID_ITEM
+    if isinstance(exc, CustomException):
+        return ERROR_DETAILS.get(type(exc), INTERNAL_ERROR)
+    logger.exception("Unexpected error in a batch item")
+    return INTERNAL_ERROR
@@ -0,0 +1,113 @@
+"""
+This module contains the BlockService class, which compresses large texts in independent blocks on a
+process pool, and the functions that run in the worker processes.
+"""
+from collections import Counter
+from concurrent.futures import Executor
+from app.config import BLOCK_SIZE
+from app.core.block_container import (decode_block, encode_block, read_container, split_blocks,
+                                      write_container)
+from app.core.codebook import Codebook
+from app.exceptions import InvalidEncodedText
+from app.services.decoder_service import DECODERS
+from app.services.encoder_service import ENCODERS
+from app.services.execution import run_in_pool
+
+# Every block costs a pool task, a table entry and a CRC-32, so smaller blocks are rejected.
+MIN_BLOCK_SIZE = 1 << 10
+
+class BlockService:
+    """
+    A class that represents the block service.
+
+    The text is split into blocks of block_size characters, and every block is encoded and decoded
+    by a worker process, so the time of a large text is divided by the number of workers. Every
+    block has its own canonical codebook, which adapts the codes to the block, or all the blocks
+    share the codebook of the whole text, which is written once; then the characters are counted
+    in parallel too.
+
+    Attributes:
+        executor (Executor): The pool that runs the blocks, or None to run them in the calling
+                             thread.
+    """
+
+    def __init__(self, executor: Executor | None):
+        self.executor = executor
+
+    async def compress(self, text: str, block_size: int = BLOCK_SIZE,
+                       shared_codebook: bool = False) -> bytes:
+        """
+        Compress a text into a block container.
+
+        Args:
+            text (str): The text to compress.
+            block_size (int): The number of characters of every block.
+            shared_codebook (bool): Whether all the blocks use the codebook of the whole text.
+
+        Returns:
+            bytes: The block container.
+        """
+        blocks = split_blocks(text, block_size)
+        codebook = None
+        encoding_map = None
+        if shared_codebook and blocks:
+            frequencies = {}
+            for counts in await run_in_pool(self.executor, count_block,
+                                            [(block,) for block in blocks]):
+                # The blocks are merged in order, so the characters keep their first appearance.
+                for char, count in counts.items():
+                    frequencies[char] = frequencies.get(char, 0) + count
+            codebook = ENCODERS["huffman"].build_codebook(frequencies)
+            encoding_map = codebook.encoding_map
+
+        encoded = await run_in_pool(self.executor, compress_block,
+                                    [(block, encoding_map) for block in blocks])
+        return write_container(block_size, [(payload, bit_length, len(block))
+                                            for block, (payload, bit_length)
+                                            in zip(blocks, encoded)], codebook)
+
+    async def decompress(self, data: bytes) -> str:
+        """
+        Decompress a block container.
+
+        Args:
+            data (bytes): The block container.
+
+        Returns:
+            str: The text.
+
+        Raises:
+            InvalidContainer: If the container cannot be read or a checksum does not match.
+            InvalidCodebook: If the codebook of a block cannot be read.
+            InvalidEncodedText: If the codes of a block cannot be decoded.
+        """
+        container = read_container(data)
+        payloads = container.payloads(data)
+        texts = await run_in_pool(self.executor, decompress_block,
+                                  [(payload, block.bit_length, container.codebook)
+                                   for payload, block in zip(payloads, container.blocks)])
+        for text, block in zip(texts, container.blocks):
+            if len(text) != block.symbols:
+                raise InvalidEncodedText()
+        return "".join(texts)
+
+
+def count_block(text: str) -> dict[str, int]:
+    """
+    Count the characters of a block, in order of first appearance. It runs in a worker process.
+    """
+    return dict(Counter(text))
+
+
+def compress_block(text: str, encoding_map: dict[str, str] | None) -> tuple[bytes, int]:
+    """
+    Encode a block with the encoder of the process. It runs in a worker process.
+    """
+    return encode_block(ENCODERS["huffman"], text, encoding_map)
+
+
+def decompress_block(payload: bytes, bit_length: int, codebook: Codebook | None) -> str:
+    """
+    Decode a block with the decoder of the process. It runs in a worker process.
+    """
+    return decode_block(DECODERS["huffman"], payload, bit_length, codebook)
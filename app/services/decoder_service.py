@@ -1,37 +1,270 @@
 """
 This module contains the DecoderService class.
 """
+import base64
+from app.core.codebook import Codebook
+from app.core.constants import Constants
 from app.core.decoder import Decoder
-from app.schemas import DecodeResponse, EncodedSymbols, EncodingMap
+from app.core.metrics import metrics
+from app.core.offset_index import OffsetIndex
+from app.core.pretrained import registry
+from app.exceptions import InvalidAlgorithm, InvalidCodebook, InvalidOffsetIndex, InvalidOptions, \
+    InvalidPretrainedCodebook
+from app.core.containers import EncodedSymbols, EncodingMap, PackedSymbols
+from app.schemas import DecodeResponse
+from app.services.execution import ExecutionBackend, execution_backend
+
+DECODERS = Constants.get_decoders()
 
 
 class DecoderService:
     """
     A class that represents the decoder service.
 
+    The encoded text and the encoding map are validated by the request schemas, so they are not
+    validated again when they are passed to the decoder. The work of a request runs where the
+    execution backend chooses for the size of the encoded text, as in the encoder service.
+
     Attributes:
         decoder (Decoder): The decoder to be used.
+        algorithm (str): The name of the decoding algorithm.
+        backend (ExecutionBackend): The execution backend of the requests.
     """
 
-    def __init__(self, decoder: Decoder):
+    def __init__(self, decoder: Decoder, algorithm: str = "huffman",
+                 backend: ExecutionBackend = execution_backend):
         self.decoder = decoder
+        self.algorithm = algorithm
+        self.backend = backend
+
+    def __reduce__(self):
+        return decoder_service, (self.algorithm,)
+
+    def _encoding_map(self, encoding_map: dict[str, str] | None, codebook: str | None,
+                      pretrained: str | None = None,
+                      fingerprint: str | None = None) -> EncodingMap:
+        """
+        Return the encoding map of a request, or an empty map for an adaptive decoder, which does
+        not need it. The encoding map of a pretrained codebook has its fingerprint, so its decoding
+        tables are found without hashing the map.
+
+        Raises:
+            InvalidOptions: If a pretrained codebook is given to an adaptive decoder.
+            InvalidPretrainedCodebook: If the pretrained codebook does not exist or does not have
+                                       the given fingerprint.
+        """
+        if self.decoder.adaptive:
+            if pretrained is not None:
+                raise InvalidOptions()
+            return EncodingMap(map={})
+        if encoding_map is None and codebook is None and pretrained is not None:
+            pretrained_codebook = registry.get(pretrained)
+            # A codebook trained again under the same name gives other codes, so the text would
+            # be decoded into another text without an error.
+            if fingerprint is not None and \
+                    fingerprint.lower() != pretrained_codebook.fingerprint.hex():
+                raise InvalidPretrainedCodebook()
+            return pretrained_codebook.to_encoding_map()
+        return EncodingMap(map=resolve_encoding_map(encoding_map, codebook))
 
-    async def decode(self, encoded_text: str, encoding_map: dict[str, str]) -> DecodeResponse:
+    async def decode(self, encoded_text: str, encoding_map: dict[str, str] | None,
+                     codebook: str | None = None, pretrained: str | None = None,
+                     fingerprint: str | None = None) -> DecodeResponse:
         """
         Decode the given text.
 
         Args:
             encoded_text (str): The text to decode.
-            encoding_map (dict): The encoding map to use.
+            encoding_map (dict): The encoding map to use, or None to use the codebook.
+            codebook (str): The canonical codebook in base64, used when there is no encoding map.
+            pretrained (str): The name of the pretrained codebook, used when there is no encoding
+                              map.
+            fingerprint (str): The fingerprint of the pretrained codebook in hexadecimal, or None
+                               to use the codebook without checking it.
+
+        Returns:
+            DecodeResponse: The decoded text.
+        """
+        return await self.backend.run(len(encoded_text), self.decode_sync, encoded_text,
+                                      encoding_map, codebook, pretrained, fingerprint)
+
+    def decode_sync(self, encoded_text: str, encoding_map: dict[str, str] | None,
+                    codebook: str | None = None, pretrained: str | None = None,
+                    fingerprint: str | None = None) -> DecodeResponse:
+        """
+        Decode the given text in the calling thread.
+
+        Args:
+            encoded_text (str): The text to decode.
+            encoding_map (dict): The encoding map to use, or None to use the codebook.
+            codebook (str): The canonical codebook in base64, used when there is no encoding map.
+            pretrained (str): The name of the pretrained codebook, used when there is no encoding
+                              map.
+            fingerprint (str): The fingerprint of the pretrained codebook in hexadecimal, or None
+                               to use the codebook without checking it.
 
         Returns:
             DecodeResponse: The decoded text.
         """
-        enc_symbols = encoded_text.split()
-        enc_symbols = EncodedSymbols(encoded=enc_symbols)
-        enc_map = EncodingMap(map=encoding_map)
+        with metrics.stage("decode", "parse"):
+            enc_symbols = EncodedSymbols(encoded=encoded_text.split())
+            enc_map = self._encoding_map(encoding_map, codebook, pretrained, fingerprint)
 
         dec_symbols = self.decoder.decode(enc_map, enc_symbols)
-        dec_text = "".join(dec_symbols.unencoded)
+        with metrics.stage("decode", "serialize"):
+            response = DecodeResponse(decoded_text="".join(dec_symbols.unencoded))
 
-        return DecodeResponse(decoded_text=dec_text)
+        _observe_sizes(len(encoded_text), enc_map, response)
+        return response
+
+    async def decode_packed(self, data: bytes, bit_length: int, encoding_map: dict[str, str] | None,
+                            codebook: str | None = None, symbol_range: tuple[int, int] | None = None,
+                            index: str | OffsetIndex | None = None,
+                            pretrained: str | None = None,
+                            fingerprint: str | None = None) -> DecodeResponse:
+        """
+        Decode the given codes packed into bytes.
+
+        Args:
+            data (bytes): The packed codes.
+            bit_length (int): The number of meaningful bits in data.
+            encoding_map (dict): The encoding map to use, or None to use the codebook.
+            codebook (str): The canonical codebook in base64, used when there is no encoding map.
+            symbol_range (tuple[int, int]): The first symbol and the symbol after the last one to
+                                            decode, or None to decode all the symbols.
+            index (str | OffsetIndex): The offset index of the packed codes in base64 or read
+                                       from an envelope, used to decode only the bits around the
+                                       symbol range.
+            pretrained (str): The name of the pretrained codebook, used when there is no encoding
+                              map.
+            fingerprint (str): The fingerprint of the pretrained codebook in hexadecimal, or None
+                               to use the codebook without checking it.
+
+        Returns:
+            DecodeResponse: The decoded text.
+        """
+        return await self.backend.run(len(data) * 8, self.decode_packed_sync, data, bit_length,
+                                      encoding_map, codebook, symbol_range, index, pretrained,
+                                      fingerprint)
+
+    def decode_packed_sync(self, data: bytes, bit_length: int, encoding_map: dict[str, str] | None,
+                           codebook: str | None = None, symbol_range: tuple[int, int] | None = None,
+                           index: str | OffsetIndex | None = None,
+                           pretrained: str | None = None,
+                           fingerprint: str | None = None) -> DecodeResponse:
+        """
+        Decode the given codes packed into bytes in the calling thread.
+
+        Args:
+            data (bytes): The packed codes.
+            bit_length (int): The number of meaningful bits in data.
+            encoding_map (dict): The encoding map to use, or None to use the codebook.
+            codebook (str): The canonical codebook in base64, used when there is no encoding map.
+            symbol_range (tuple[int, int]): The first symbol and the symbol after the last one to
+                                            decode, or None to decode all the symbols.
+            index (str | OffsetIndex): The offset index of the packed codes in base64 or read
+                                       from an envelope, used to decode only the bits around the
+                                       symbol range.
+            pretrained (str): The name of the pretrained codebook, used when there is no encoding
+                              map.
+            fingerprint (str): The fingerprint of the pretrained codebook in hexadecimal, or None
+                               to use the codebook without checking it.
+
+        Returns:
+            DecodeResponse: The decoded text.
+
+        Raises:
+            InvalidOptions: If a symbol range is given to an adaptive decoder, which has to decode
+                            the symbols from the start.
+        """
+        if symbol_range is not None and self.decoder.adaptive:
+            raise InvalidOptions()
+
+        with metrics.stage("decode", "parse"):
+            packed = PackedSymbols(data=data, bit_length=bit_length,
+                                   padding=-bit_length % 8)
+            enc_map = self._encoding_map(encoding_map, codebook, pretrained, fingerprint)
+            offset_index = resolve_offset_index(index)
+
+        if symbol_range is not None:
+            dec_symbols = self.decoder.decode_range(enc_map, packed, *symbol_range, offset_index)
+        else:
+            dec_symbols = self.decoder.decode_packed(enc_map, packed)
+        with metrics.stage("decode", "serialize"):
+            response = DecodeResponse(decoded_text="".join(dec_symbols.unencoded))
+
+        _observe_sizes(len(data), enc_map, response)
+        return response
+
+
+def decoder_service(algorithm: str) -> DecoderService:
+    """
+    Return the decoder service of an algorithm with the decoder of this process.
+
+    Args:
+        algorithm (str): The name of the decoding algorithm.
+
+    Returns:
+        DecoderService: The decoder service.
+
+    Raises:
+        InvalidAlgorithm: If the decoding algorithm is unknown.
+    """
+    if algorithm not in DECODERS:
+        raise InvalidAlgorithm()
+    return DecoderService(DECODERS[algorithm], algorithm)
+
+
+def _observe_sizes(input_size: int, enc_map: EncodingMap, response: DecodeResponse):
+    """
+    Record the sizes of a decoding, counting the decoded text in UTF-8 bytes.
+    """
+    if metrics.enabled:
+        metrics.observe_sizes("decode", input_size, len(enc_map.map),
+                              len(response.decoded_text.encode("utf-8", "surrogatepass")))
+
+
+def resolve_encoding_map(encoding_map: dict[str, str] | None, codebook: str | None) -> dict[str, str]:
+    """
+    Return the encoding map, rebuilding it from the codebook if it is not given.
+
+    Args:
+        encoding_map (dict): The encoding map, or None.
+        codebook (str): The canonical codebook in base64, or None.
+
+    Returns:
+        dict: The encoding map.
+
+    Raises:
+        InvalidCodebook: If the codebook cannot be read.
+    """
+    if encoding_map is not None:
+        return encoding_map
+    try:
+        header = base64.b64decode(codebook, validate=True)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCodebook() from exc
+    return Codebook.from_header(header).encoding_map
+
+
+def resolve_offset_index(index: str | OffsetIndex | None) -> OffsetIndex | None:
+    """
+    Return the offset index serialized in base64, or None if it is not given.
+
+    Args:
+        index (str | OffsetIndex): The serialized offset index in base64, the offset index read
+                                   from an envelope, or None.
+
+    Returns:
+        OffsetIndex: The offset index, or None.
+
+    Raises:
+        InvalidOffsetIndex: If the offset index cannot be read.
+    """
+    if index is None or isinstance(index, OffsetIndex):
+        return index
+    try:
+        data = base64.b64decode(index, validate=True)
+    except (TypeError, ValueError) as exc:
+        raise InvalidOffsetIndex() from exc
+    return OffsetIndex.from_bytes(data)
@@ -1,22 +1,56 @@
 """
 This module contains the EncoderService class.
 """
-from syltippy import syllabize
+import asyncio
+import base64
+import codecs
+import tempfile
+from collections import Counter
+from typing import AsyncIterable, AsyncIterator, Iterable
 from app.core.constants import Constants
+from app.core.adaptive import AdaptiveStreamWriter
+from app.core.bitstream import BitWriter, pack_codes
+from app.core.codebook import Codebook
+from app.core.container import write_stream_header
 from app.core.encoder import Encoder
-from app.schemas import EncodeResponse, UnencodedSymbols
+from app.core.metrics import metrics
+from app.core.offset_index import OffsetIndex
+from app.core.pretrained import PretrainedCodebook, registry
+from app.core.tokenizer import MAX_WORD_LENGTH, is_letter, normalize_spanish_letters, \
+    syllable_tokenizer
+from app.exceptions import InvalidAlgorithm, InvalidOptions, InvalidText
+from app.services.execution import ExecutionBackend, execution_backend, get_thread_executor
+from app.core.containers import EncodingMap, PackedSymbols, UnencodedSymbols
+from app.schemas import EncodeResponse
+
+STREAM_CHUNK_SIZE = 1 << 16
+SPOOL_MAX_SIZE = 1 << 22
+
+ENCODERS = Constants.get_encoders()
 
 
 class EncoderService:
     """
     A class that represents the encoder service.
 
+    The work of a request runs where the execution backend chooses for the size of the text. To
+    run in a worker process, the service is sent by the name of its algorithm, and the worker uses
+    its own encoder.
+
     Attributes:
         encoder (Encoder): The encoder to be used.
+        algorithm (str): The name of the encoding algorithm.
+        backend (ExecutionBackend): The execution backend of the requests.
     """
 
-    def __init__(self, encoder: Encoder):
+    def __init__(self, encoder: Encoder, algorithm: str = "huffman",
+                 backend: ExecutionBackend = execution_backend):
         self.encoder = encoder
+        self.algorithm = algorithm
+        self.backend = backend
+
+    def __reduce__(self):
+        return encoder_service, (self.algorithm,)
 
     def _separate_into_syllables_and_special_chars(self, text: str) -> list[str]:
         """
@@ -28,22 +62,7 @@ class EncoderService:
         Returns:
             list: A list containing the syllables and special characters.
         """
-        unencoded_symbols = []
-        index = 0
-
-        while index < len(text):
-            if text[index] not in Constants.LETTERS.value:
-                unencoded_symbols.append(text[index])
-                index += 1
-            else:
-                word = ""
-                while index < len(text) and text[index] in Constants.LETTERS.value:
-                    word += text[index]
-                    index += 1
-                syllabes, _ = syllabize(word)
-                unencoded_symbols.extend(syllabes)
-
-        return unencoded_symbols
+        return syllable_tokenizer.tokenize(text)
 
     def _separate_into_chars(self, text: str):
         """
@@ -57,40 +76,474 @@ class EncoderService:
         """
         return list(text)
 
-    async def encode(self, text: str, separate_syllables: bool, use_spanish_frequencies: bool) -> EncodeResponse:
+    def _prepare_symbols(self, text: str, separate_syllables: bool,
+                         use_spanish_frequencies: bool) -> UnencodedSymbols:
         """
-        Encode the text.
+        Separate the text into the symbols to be encoded.
 
         Args:
             text (str): The text to be encoded.
             separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
 
         Returns:
-            EncodeResponse: The encoding map and the encoded symbols.
+            UnencodedSymbols: The symbols to be encoded.
         """
         if use_spanish_frequencies:
-            text = text.upper()
-            text = text.replace('Á', 'A')
-            text = text.replace('É', 'E')
-            text = text.replace('Í', 'I')
-            text = text.replace('Ó', 'O')
-            text = text.replace('Ú', 'U')
-            text = text.replace('Ü', 'U')
-            text = ''.join(e for e in text if e.isalnum())
-            unenc_symbols = UnencodedSymbols(
-                unencoded=self._separate_into_chars(text))
-            enc_map, enc_symbols = self.encoder.encode_using_letter_frequency_in_spanish(
-                unenc_symbols)
+            text = normalize_spanish_letters(text)
+            return UnencodedSymbols(unencoded=self._separate_into_chars(text))
+
+        if separate_syllables:
+            unenc_symbols = self._separate_into_syllables_and_special_chars(text)
+        else:
+            unenc_symbols = self._separate_into_chars(text)
+
+        return UnencodedSymbols(unencoded=unenc_symbols)
+
+    def _check_options(self, use_spanish_frequencies: bool, canonical: bool = False,
+                       max_code_length: int | None = None, index_interval: int | None = None,
+                       pretrained: str | None = None):
+        """
+        Check that the encoder supports the options. The adaptive encoders have no encoding map,
+        so they cannot use a fixed frequency model, canonical codes or a maximum code length, and
+        their codes depend on the symbols before, so they cannot be decoded from a checkpoint.
+        A pretrained codebook is a fixed frequency model with its own code lengths, so it cannot
+        be combined with another model or a maximum code length.
+
+        Args:
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+            index_interval (int): The interval of the offset index, or None for no index.
+            pretrained (str): The name of the pretrained codebook, or None to build the codes from
+                              the text.
+
+        Raises:
+            InvalidOptions: If the encoder does not support an option.
+        """
+        if self.encoder.adaptive and (use_spanish_frequencies or canonical or
+                                      max_code_length is not None or index_interval is not None or
+                                      pretrained is not None):
+            raise InvalidOptions()
+        if pretrained is not None and (use_spanish_frequencies or max_code_length is not None):
+            raise InvalidOptions()
+
+    def _pretrained_symbols(self, text: str,
+                            pretrained: str) -> tuple[PretrainedCodebook, list[str]]:
+        """
+        Separate the text into the symbols of a pretrained codebook.
+
+        Args:
+            text (str): The text to be encoded.
+            pretrained (str): The name of the pretrained codebook.
+
+        Returns:
+            tuple[PretrainedCodebook, list[str]]: The codebook and the symbols.
+
+        Raises:
+            InvalidPretrainedCodebook: If the codebook does not exist or cannot be read.
+            InvalidSymbol: If the text has a character that is not in the codebook.
+        """
+        codebook = registry.get(pretrained)
+        with metrics.stage("encode", "tokenize"):
+            symbols = codebook.symbols(text)
+        return codebook, symbols
+
+    def _compression_cost(self, symbols: Iterable[str], enc_map: EncodingMap,
+                          use_spanish_frequencies: bool) -> float:
+        """
+        Calculate how much larger the encoded symbols are with the given encoding map than with
+        Huffman codes without a length limit.
+
+        Args:
+            symbols (Iterable[str]): The encoded symbols.
+            enc_map (EncodingMap): The encoding map with limited code lengths.
+            use_spanish_frequencies (bool): Whether the codes use the letter frequency in Spanish.
+
+        Returns:
+            float: The relative increase of the number of bits.
+        """
+        counts = Counter(symbols)
+        model = Constants.LETTERS_FREQ_IN_SPANISH.value if use_spanish_frequencies else counts
+        if not model:
+            return 0.0
+
+        lengths = self.encoder.code_lengths(model)
+        limited_bits = sum(count * len(enc_map.map[symbol]) for symbol, count in counts.items())
+        optimal_bits = sum(count * lengths[symbol] for symbol, count in counts.items())
+        return limited_bits / optimal_bits - 1 if optimal_bits else 0.0
 
+    async def encode(self, text: str, separate_syllables: bool, use_spanish_frequencies: bool,
+                     canonical: bool = False, max_code_length: int | None = None,
+                     pretrained: str | None = None) -> EncodeResponse:
+        """
+        Encode the text.
+
+        Args:
+            text (str): The text to be encoded.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+            canonical (bool): Whether to use canonical codes and return the serialized codebook
+                              instead of the encoding map.
+            max_code_length (int): The maximum code length, or None for no limit.
+            pretrained (str): The name of a pretrained codebook to encode the text with, or None
+                              to build the codes from the text.
+
+        Returns:
+            EncodeResponse: The encoding map or the codebook, and the encoded symbols.
+        """
+        return await self.backend.run(len(text), self.encode_sync, text, separate_syllables,
+                                      use_spanish_frequencies, canonical, max_code_length,
+                                      pretrained)
+
+    def encode_sync(self, text: str, separate_syllables: bool, use_spanish_frequencies: bool,
+                    canonical: bool = False, max_code_length: int | None = None,
+                    pretrained: str | None = None) -> EncodeResponse:
+        """
+        Encode the text in the calling thread.
+
+        With a pretrained codebook the symbols are separated by the tokenizer of the codebook, so
+        separate_syllables and canonical are ignored, and the response has the name and the
+        fingerprint of the codebook instead of the encoding map.
+
+        Args:
+            text (str): The text to be encoded.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+            canonical (bool): Whether to use canonical codes and return the serialized codebook
+                              instead of the encoding map.
+            max_code_length (int): The maximum code length, or None for no limit.
+            pretrained (str): The name of a pretrained codebook to encode the text with, or None
+                              to build the codes from the text.
+
+        Returns:
+            EncodeResponse: The encoding map or the codebook, and the encoded symbols.
+
+        Raises:
+            InvalidOptions: If the encoder does not support the options.
+        """
+        self._check_options(use_spanish_frequencies, canonical, max_code_length,
+                            pretrained=pretrained)
+        if pretrained is not None:
+            codebook, symbols = self._pretrained_symbols(text, pretrained)
+            enc_map = codebook.to_encoding_map()
+            with metrics.stage("encode", "emit"):
+                encoded_text = " ".join(map(enc_map.map.__getitem__, symbols))
+        elif not separate_syllables and not use_spanish_frequencies:
+            # The characters of the text are the symbols, so the encoder can work on the text.
+            symbols = text
+            enc_map, encoded_text = self.encoder.encode_text(text, canonical, max_code_length)
         else:
-            if separate_syllables:
-                unenc_symbols = self._separate_into_syllables_and_special_chars(
-                    text)
+            with metrics.stage("encode", "tokenize"):
+                unenc_symbols = self._prepare_symbols(text, separate_syllables,
+                                                      use_spanish_frequencies)
+            symbols = unenc_symbols.unencoded
+            if use_spanish_frequencies:
+                enc_map, enc_symbols = self.encoder.encode_using_letter_frequency_in_spanish(
+                    unenc_symbols, canonical, max_code_length)
             else:
-                unenc_symbols = self._separate_into_chars(text)
+                enc_map, enc_symbols = self.encoder.encode(unenc_symbols, canonical, max_code_length)
+            with metrics.stage("encode", "emit"):
+                encoded_text = " ".join(enc_symbols.encoded)
 
-            unenc_symbols = UnencodedSymbols(unencoded=unenc_symbols)
-            enc_map, enc_symbols = self.encoder.encode(unenc_symbols)
+        with metrics.stage("encode", "serialize"):
+            response = EncodeResponse(encoded_text=encoded_text)
+            if pretrained is not None:
+                response.pretrained = pretrained
+                response.pretrained_fingerprint = codebook.fingerprint.hex()
+            elif canonical:
+                response.codebook = serialize_codebook(enc_map.map)
+            else:
+                response.encoding_map = dict(enc_map.map)
+        if max_code_length is not None:
+            response.compression_cost = self._compression_cost(symbols, enc_map,
+                                                               use_spanish_frequencies)
+        metrics.observe_sizes("encode", len(text), len(enc_map.map), len(encoded_text))
+        return response
 
-        enc_text = " ".join(enc_symbols.encoded)
-        return EncodeResponse(encoding_map=enc_map.map, encoded_text=enc_text)
+    async def encode_packed(self, text: str, separate_syllables: bool, use_spanish_frequencies: bool,
+                            canonical: bool = False, max_code_length: int | None = None,
+                            index_interval: int | None = None,
+                            pretrained: str | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encode the text and pack the codes into bytes.
+
+        Args:
+            text (str): The text to be encoded.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+            index_interval (int): The number of symbols between the checkpoints of the offset
+                                  index of the packed symbols, or None for no index.
+            pretrained (str): The name of a pretrained codebook to encode the text with, or None
+                              to build the codes from the text.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols, with their
+            offset index and the compression cost of the maximum code length if they apply.
+        """
+        return await self.backend.run(len(text), self.encode_packed_sync, text, separate_syllables,
+                                      use_spanish_frequencies, canonical, max_code_length,
+                                      index_interval, pretrained)
+
+    def encode_packed_sync(self, text: str, separate_syllables: bool, use_spanish_frequencies: bool,
+                           canonical: bool = False, max_code_length: int | None = None,
+                           index_interval: int | None = None,
+                           pretrained: str | None = None) -> tuple[EncodingMap, PackedSymbols]:
+        """
+        Encode the text and pack the codes into bytes in the calling thread.
+
+        Args:
+            text (str): The text to be encoded.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+            canonical (bool): Whether to use canonical codes.
+            max_code_length (int): The maximum code length, or None for no limit.
+            index_interval (int): The number of symbols between the checkpoints of the offset
+                                  index of the packed symbols, or None for no index.
+            pretrained (str): The name of a pretrained codebook to encode the text with, or None
+                              to build the codes from the text.
+
+        Returns:
+            tuple[EncodingMap, PackedSymbols]: The encoding map and the packed symbols, with their
+            offset index and the compression cost of the maximum code length if they apply.
+
+        Raises:
+            InvalidOptions: If the encoder does not support the options.
+        """
+        self._check_options(use_spanish_frequencies, canonical, max_code_length, index_interval,
+                            pretrained)
+        if pretrained is not None:
+            codebook, symbols = self._pretrained_symbols(text, pretrained)
+            enc_map = codebook.to_encoding_map()
+            if codebook.tokenizer == "characters":
+                # The characters of the text are the symbols, so the encoder can pack the text.
+                packed = self.encoder.pack_text(text, enc_map.map)
+            else:
+                with metrics.stage("encode", "emit"):
+                    packed = pack_codes(map(enc_map.map.__getitem__, symbols))
+        elif not separate_syllables and not use_spanish_frequencies:
+            symbols = text
+            enc_map, packed = self.encoder.encode_text_packed(text, canonical, max_code_length)
+        else:
+            with metrics.stage("encode", "tokenize"):
+                unenc_symbols = self._prepare_symbols(text, separate_syllables,
+                                                      use_spanish_frequencies)
+            symbols = unenc_symbols.unencoded
+            if use_spanish_frequencies:
+                enc_map, enc_symbols = self.encoder.encode_using_letter_frequency_in_spanish(
+                    unenc_symbols, canonical, max_code_length)
+                with metrics.stage("encode", "emit"):
+                    packed = pack_codes(enc_symbols.encoded)
+            else:
+                enc_map, packed = self.encoder.encode_packed(unenc_symbols, canonical,
+                                                             max_code_length)
+
+        if index_interval is not None:
+            with metrics.stage("encode", "index"):
+                packed.index = OffsetIndex.build(symbols, enc_map.map, index_interval)
+        if max_code_length is not None:
+            packed.compression_cost = self._compression_cost(symbols, enc_map,
+                                                             use_spanish_frequencies)
+        metrics.observe_sizes("encode", len(text), len(enc_map.map), len(packed.data))
+        return enc_map, packed
+
+    async def encode_stream(self, chunks: AsyncIterable[bytes], separate_syllables: bool,
+                            use_spanish_frequencies: bool) -> tuple[int | None, AsyncIterator[bytes]]:
+        """
+        Encode a UTF-8 text received in chunks, keeping the memory bounded.
+
+        The chunks are written to a spooled temporary file while the frequencies are counted.
+        Then the file is read again, chunk by chunk, and the packed codes are produced as they
+        are encoded. The output is the canonical codebook header, the number of meaningful bits
+        and the packed codes.
+
+        An adaptive encoder encodes every chunk as it arrives instead, in a thread, and the output
+        is the packed codes followed by the end of the stream, so the number of bits is not known
+        in advance, or by the abort mark of the stream if a later chunk is not valid UTF-8.
+
+        Args:
+            chunks (AsyncIterable[bytes]): The chunks of the text.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+
+        Returns:
+            tuple[int | None, AsyncIterator[bytes]]: The number of meaningful bits, or None with an
+            adaptive encoder, and the encoded stream.
+
+        Raises:
+            InvalidText: If the text is not valid UTF-8.
+            InvalidOptions: If the encoder does not support the options.
+        """
+        self._check_options(use_spanish_frequencies)
+        if self.encoder.adaptive:
+            return None, await self._encode_adaptive_stream(chunks, separate_syllables)
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            tokenizer = _StreamTokenizer(self, separate_syllables, use_spanish_frequencies)
+            frequencies = Counter()
+            async for data in chunks:
+                spool.write(data)
+                frequencies.update(tokenizer.feed(data))
+            frequencies.update(tokenizer.feed(b"", final=True))
+
+            if use_spanish_frequencies:
+                codebook = self.encoder.spanish_codebook.codebook()
+            elif frequencies:
+                codebook = self.encoder.build_codebook(frequencies)
+            else:
+                codebook = Codebook([], [])
+            codes = codebook.encoding_map
+            bit_length = sum(count * len(codes[symbol]) for symbol, count in frequencies.items())
+        except BaseException:
+            spool.close()
+            raise
+
+        async def encoded_stream() -> AsyncIterator[bytes]:
+            try:
+                yield write_stream_header(codebook, bit_length)
+                spool.seek(0)
+                tokenizer = _StreamTokenizer(self, separate_syllables, use_spanish_frequencies)
+                writer = BitWriter()
+                while data := spool.read(STREAM_CHUNK_SIZE):
+                    writer.write_codes(map(codes.__getitem__, tokenizer.feed(data)))
+                    if packed := writer.read():
+                        yield packed
+                writer.write_codes(map(codes.__getitem__, tokenizer.feed(b"", final=True)))
+                yield writer.close()
+            finally:
+                spool.close()
+
+        return bit_length, encoded_stream()
+
+    async def _encode_adaptive_stream(self, chunks: AsyncIterable[bytes],
+                                      separate_syllables: bool) -> AsyncIterator[bytes]:
+        """
+        Encode a UTF-8 text received in chunks with an adaptive encoder, as the chunks arrive.
+
+        The first chunk is separated before the response starts, so a text that is not valid UTF-8
+        from the start is rejected with an error status. If a later chunk is not valid UTF-8, the
+        stream ends with the abort mark instead of the end mark.
+
+        Raises:
+            InvalidText: If the first chunk is not valid UTF-8.
+        """
+        loop = asyncio.get_running_loop()
+        tokenizer = _StreamTokenizer(self, separate_syllables, False)
+        chunks = aiter(chunks)
+        first = tokenizer.feed(await anext(chunks, b""))
+
+        async def encoded_stream() -> AsyncIterator[bytes]:
+            writer = AdaptiveStreamWriter()
+            symbols = first
+            try:
+                async for data in chunks:
+                    if packed := await loop.run_in_executor(get_thread_executor(), writer.write,
+                                                            symbols):
+                        yield packed
+                    symbols = tokenizer.feed(data)
+                symbols += tokenizer.feed(b"", final=True)
+            except InvalidText:
+                # The status was sent with the first bytes, so the error is written in the stream.
+                yield writer.write(symbols) + writer.abort()
+                return
+            yield writer.write(symbols) + writer.close()
+
+        return encoded_stream()
+
+
+class _StreamTokenizer:
+    """
+    Separates a UTF-8 text received in chunks into the symbols to be encoded.
+
+    A multi-byte character or a word split between two chunks is kept until the next chunk, so the
+    symbols are the same as if the whole text was separated at once. A word longer than
+    MAX_WORD_LENGTH is separated into pieces by the tokenizer, so only its last piece is kept and
+    the memory does not grow with the length of a word.
+    """
+
+    def __init__(self, service: EncoderService, separate_syllables: bool,
+                 use_spanish_frequencies: bool):
+        self._service = service
+        self._separate_syllables = separate_syllables and not use_spanish_frequencies
+        self._use_spanish_frequencies = use_spanish_frequencies
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._pending = ""
+
+    def feed(self, data: bytes, final: bool = False) -> list[str]:
+        """
+        Separate the next chunk of the text.
+
+        Args:
+            data (bytes): The chunk of the text.
+            final (bool): Whether it is the last chunk.
+
+        Returns:
+            list: The symbols that are complete after this chunk.
+
+        Raises:
+            InvalidText: If the text is not valid UTF-8.
+        """
+        try:
+            text = self._pending + self._decoder.decode(data, final)
+        except UnicodeDecodeError as exc:
+            raise InvalidText() from exc
+
+        self._pending = ""
+        if self._separate_syllables and not final:
+            end = len(text)
+            while end > 0 and is_letter(text[end - 1]):
+                end -= 1
+            # The kept letters start a word or a piece, so the complete pieces are separated now.
+            if len(text) - end > MAX_WORD_LENGTH:
+                end += (len(text) - end - 1) // MAX_WORD_LENGTH * MAX_WORD_LENGTH
+            text, self._pending = text[:end], text[end:]
+
+        return self._service._prepare_symbols(text, self._separate_syllables,
+                                              self._use_spanish_frequencies).unencoded
+
+
+def encoder_service(algorithm: str) -> EncoderService:
+    """
+    Return the encoder service of an algorithm with the encoder of this process.
+
+    Args:
+        algorithm (str): The name of the encoding algorithm.
+
+    Returns:
+        EncoderService: The encoder service.
+
+    Raises:
+        InvalidAlgorithm: If the encoding algorithm is unknown.
+    """
+    if algorithm not in ENCODERS:
+        raise InvalidAlgorithm()
+    return EncoderService(ENCODERS[algorithm], algorithm)
+
+
+def serialize_codebook(encoding_map: dict[str, str]) -> str:
+    """
+    Serialize the canonical codebook of an encoding map.
+
+    Args:
+        encoding_map (dict): The encoding map with canonical codes.
+
+    Returns:
+        str: The serialized codebook encoded in base64.
+    """
+    return base64.b64encode(Codebook.from_encoding_map(encoding_map).to_header()).decode("ascii")
+
+
+def serialize_offset_index(index: OffsetIndex) -> str:
+    """
+    Serialize an offset index.
+
+    Args:
+        index (OffsetIndex): The offset index.
+
+    Returns:
+        str: The serialized offset index encoded in base64.
+    """
+    return base64.b64encode(index.to_bytes()).decode("ascii")
@@ -0,0 +1,237 @@
+"""
+This module contains the ExecutionBackend class, which decides where the CPU-bound work of a request
+runs so it does not block the event loop, the executors it shares, and the monitor of the lag of the
+event loop.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+from app.config import (EXECUTION_BACKEND, INLINE_MAX_SIZE, LOOP_LAG_INTERVAL, LOOP_LAG_WARNING,
+                        PROCESS_MIN_SIZE, PROCESS_WORKERS, THREAD_WORKERS)
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_thread_executor = None
+_process_executor = None
+
+
+class ExecutionBackend:
+    """
+    Runs the CPU-bound work of the requests in the event loop, a thread pool or a process pool.
+
+    In the "auto" mode the work runs in the event loop when the input is smaller than
+    inline_max_size, because sending it to a pool costs more than doing it, in the process pool
+    when the input is at least process_min_size, so it does not hold the GIL of the server, and in
+    the thread pool otherwise. The other modes always use the same place. The functions sent to the
+    process pool, and their arguments, must be picklable.
+
+    Attributes:
+        mode (str): "auto", "inline", "thread" or "process".
+        inline_max_size (int): The size from which the work leaves the event loop in "auto" mode.
+        process_min_size (int): The size from which the work runs in the process pool in "auto"
+                                mode.
+    """
+
+    def __init__(self, mode: str = EXECUTION_BACKEND, inline_max_size: int = INLINE_MAX_SIZE,
+                 process_min_size: int = PROCESS_MIN_SIZE):
+        self.mode = mode
+        self.inline_max_size = inline_max_size
+        self.process_min_size = process_min_size
+
+    def select(self, size: int) -> str:
+        """
+        Choose where the work for an input of the given size runs.
+
+        Args:
+            size (int): The size of the input, such as the length of the text.
+
+        Returns:
+            str: "inline", "thread" or "process".
+        """
+        if self.mode != "auto":
+            return self.mode
+        if size < self.inline_max_size:
+            return "inline"
+        if size >= self.process_min_size:
+            return "process"
+        return "thread"
+
+    async def run(self, size: int, function: Callable[..., Any], *args) -> Any:
+        """
+        Run a function where the size of its input says, and wait for its result without blocking
+        the event loop.
+
+        Args:
+            size (int): The size of the input.
+            function (Callable): The function.
+            *args: The arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+        """
+        where = self.select(size)
+        executor = get_process_executor() if where == "process" else \
+            get_thread_executor() if where == "thread" else None
+        if executor is None:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        if where == "process" and metrics.enabled:
+            result, observations = await loop.run_in_executor(executor, collect_metrics, function,
+                                                              *args)
+            metrics.merge(observations)
+            return result
+        return await loop.run_in_executor(executor, function, *args)
+
+
+def collect_metrics(function: Callable[..., Any], *args) -> tuple[Any, dict]:
+    """
+    Run a function in a worker process and return its result with the metrics recorded in the
+    process, so the server can merge them.
+
+    Args:
+        function (Callable): The function.
+        *args: The arguments of the function.
+
+    Returns:
+        tuple[Any, dict]: The result of the function and the metrics.
+    """
+    result = function(*args)
+    return result, metrics.collect()
+
+
+async def run_in_pool(executor: Executor | None, function: Callable[..., Any],
+                      arguments: list[tuple]) -> list:
+    """
+    Call a function once for every tuple of arguments on a pool, at the same time, and wait for all
+    the results. The metrics recorded in worker processes are merged into this process.
+
+    Args:
+        executor (Executor): The pool, or None to call the function in the calling thread.
+        function (Callable): The function.
+        arguments (list[tuple]): The arguments of every call.
+
+    Returns:
+        list: The results, in the order of the arguments.
+    """
+    if executor is None:
+        return [function(*args) for args in arguments]
+
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor) and metrics.enabled:
+        collected = await asyncio.gather(*(loop.run_in_executor(executor, collect_metrics,
+                                                                function, *args)
+                                           for args in arguments))
+        for _, observations in collected:
+            metrics.merge(observations)
+        return [result for result, _ in collected]
+    return await asyncio.gather(*(loop.run_in_executor(executor, function, *args)
+                                  for args in arguments))
+
+
+def get_thread_executor() -> Executor | None:
+    """
+    Return the thread pool shared by the requests, creating it the first time.
+
+    Returns:
+        Executor: The thread pool, or None if HUFFMAN_THREAD_WORKERS is 0.
+    """
+    global _thread_executor
+    if _thread_executor is None and THREAD_WORKERS > 0:
+        _thread_executor = ThreadPoolExecutor(max_workers=THREAD_WORKERS,
+                                              thread_name_prefix="huffman")
+    return _thread_executor
+
+
+def get_process_executor() -> Executor | None:
+    """
+    Return the process pool shared by the requests, creating it the first time.
+
+    Returns:
+        Executor: The process pool, or None if HUFFMAN_PROCESS_WORKERS is 0.
+    """
+    global _process_executor
+    if _process_executor is None and PROCESS_WORKERS > 0:
+        _process_executor = ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+    return _process_executor
+
+
+def shutdown_executors():
+    """
+    Stop the thread pool and the worker processes, if they were created.
+    """
+    global _thread_executor, _process_executor
+    for executor in (_thread_executor, _process_executor):
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    _thread_executor = _process_executor = None
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task that sleeps at a fixed interval. A late wake
+    up means that something ran in the event loop for that long without yielding.
+
+    Attributes:
+        interval (float): The seconds between two measures.
+        warning (float): The lag, in seconds, from which a warning is logged.
+        last (float): The last lag measured, in seconds.
+        max (float): The largest lag measured, in seconds.
+        total (float): The sum of the lags measured, in seconds.
+        count (int): The number of measures.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, warning: float = LOOP_LAG_WARNING):
+        self.interval = interval
+        self.warning = warning
+        self.last = self.max = self.total = 0.0
+        self.count = 0
+        self._task = None
+
+    def record(self, lag: float):
+        """
+        Add a measure of the lag.
+
+        Args:
+            lag (float): The lag in seconds.
+        """
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.count += 1
+        if lag >= self.warning:
+            logger.warning("The event loop was blocked for %.3f seconds", lag)
+
+    async def _measure(self):
+        """
+        Sleep for the interval over and over, recording how late every wake up is.
+        """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        """
+        Start measuring in the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._measure())
+
+    async def stop(self):
+        """
+        Stop measuring.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+execution_backend = ExecutionBackend()
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,187 @@
+"""
+This module contains the EncodingSession class, which encodes a text as it is edited and returns
+only what changed in the encoding map and the encoded text after every edit.
+"""
+from bisect import bisect_right
+from typing import Mapping
+from app.core.encoder import HuffmanEncoder
+from app.core.tokenizer import WORD_SPLIT_PATTERN, is_letter, normalize_spanish_letters, \
+    syllable_tokenizer
+from app.schemas import EncodedTextDiff, EncodingMapDiff, EncodingSessionDiff
+
+CHARACTERS = "characters"
+SYLLABLES = "syllables"
+SPANISH = "spanish"
+
+
+def common_prefix_length(first: str, second: str) -> int:
+    """
+    Calculates the length of the longest common prefix of two strings, comparing slices by binary
+    search instead of character by character.
+
+    Args:
+        first (str): The first string.
+        second (str): The second string.
+
+    Returns:
+        int: The number of characters at the start of both strings that are equal.
+    """
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[low:middle] == second[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class EncodingSession:
+    """
+    Encodes a text as it is edited, with the same symbols and codes as `EncoderService.encode`.
+
+    The session keeps the symbols of the text, the position where every symbol ends and the
+    frequencies of the symbols. After an edit, only the text from the first changed character is
+    separated into symbols again, and the frequencies are updated with the symbols removed and
+    added, so the work of an edit depends on its distance to the end of the text. A word is always
+    separated from its first letter, so a syllable split by the edit is not kept.
+
+    The codes are rebuilt only when the frequencies give a different histogram, and the encoded
+    text is sent again from the start only when the codes change; otherwise only the codes of the
+    new symbols are sent.
+
+    Attributes:
+        encoder (HuffmanEncoder): The encoder whose codes are used.
+    """
+
+    def __init__(self, encoder: HuffmanEncoder):
+        self.encoder = encoder
+        self._reset(None)
+
+    def _reset(self, mode: str | None):
+        """
+        Discards the text, for a new session or new options.
+        """
+        self._mode = mode
+        self._text = ""
+        self._symbols: list[str] = []
+        self._ends: list[int] = []
+        self._frequencies: dict[str, int] = {}
+        self._nodes: list[tuple[str, int]] = []
+        self._codes: Mapping[str, str] = {}
+        self._code_ends: list[int] = []
+
+    def _tokenize(self, text: str, start: int) -> tuple[list[str], list[int]]:
+        """
+        Separates the text from a position into symbols.
+
+        Args:
+            text (str): The whole text.
+            start (int): The position where the symbols start, which is not inside a word.
+
+        Returns:
+            tuple[list[str], list[int]]: The symbols and the position of the text where every one
+            ends. The syllables of a word end where the word ends.
+        """
+        symbols, ends = [], []
+        if self._mode == SPANISH:
+            for position in range(start, len(text)):
+                letters = normalize_spanish_letters(text[position])
+                symbols.extend(letters)
+                ends.extend([position + 1] * len(letters))
+        elif self._mode == SYLLABLES:
+            position = start
+            for index, part in enumerate(WORD_SPLIT_PATTERN.split(text[start:])):
+                if index % 2:
+                    syllables = syllable_tokenizer.tokenize(part)
+                    symbols.extend(syllables)
+                    ends.extend([position + len(part)] * len(syllables))
+                else:
+                    symbols.extend(part)
+                    ends.extend(range(position + 1, position + len(part) + 1))
+                position += len(part)
+        else:
+            symbols.extend(text[start:])
+            ends.extend(range(start + 1, len(text) + 1))
+        return symbols, ends
+
+    def _current_codes(self) -> Mapping[str, str]:
+        """
+        Returns the codes for the frequencies of the symbols, rebuilding them only if the histogram
+        changed.
+        """
+        if self._mode == SPANISH:
+            return self.encoder.spanish_codebook.encoding_map()
+        nodes = sorted(self._frequencies.items(), key=lambda x: x[1], reverse=True)
+        if nodes != self._nodes:
+            self._nodes = nodes
+            return self.encoder.codes(self._frequencies)
+        return self._codes
+
+    def update(self, text: str, separate_syllables: bool,
+               use_spanish_frequencies: bool) -> EncodingSessionDiff:
+        """
+        Encodes the text after an edit.
+
+        Args:
+            text (str): The whole text.
+            separate_syllables (bool): Whether to separate syllables.
+            use_spanish_frequencies (bool): Whether to use the letter frequency in Spanish.
+
+        Returns:
+            EncodingSessionDiff: The changes of the encoding map and the encoded text.
+        """
+        mode = SPANISH if use_spanish_frequencies else SYLLABLES if separate_syllables \
+            else CHARACTERS
+        reset = mode != self._mode
+        if reset:
+            self._reset(mode)
+
+        start = common_prefix_length(self._text, text)
+        if mode == SYLLABLES:
+            while start > 0 and is_letter(text[start - 1]):
+                start -= 1
+        kept = bisect_right(self._ends, start)
+        start = self._ends[kept - 1] if kept else 0
+
+        frequencies = self._frequencies
+        for symbol in self._symbols[kept:]:
+            # A symbol that first appears in the removed symbols has all its occurrences there, so
+            # the symbols left keep the order of their first appearance.
+            frequencies[symbol] -= 1
+            if not frequencies[symbol]:
+                del frequencies[symbol]
+        del self._symbols[kept:], self._ends[kept:], self._code_ends[kept:]
+
+        symbols, ends = self._tokenize(text, start)
+        for symbol in symbols:
+            frequencies[symbol] = frequencies.get(symbol, 0) + 1
+        self._symbols.extend(symbols)
+        self._ends.extend(ends)
+        self._text = text
+
+        previous, codes = self._codes, self._current_codes()
+        self._codes = codes
+        if codes == previous:
+            updated, removed = {}, []
+            new_codes = [codes[symbol] for symbol in symbols]
+            position = self._code_ends[-1] if kept else 0
+            encoded = (" " if kept and new_codes else "") + " ".join(new_codes)
+        else:
+            updated = {symbol: code for symbol, code in codes.items()
+                       if previous.get(symbol) != code}
+            removed = [symbol for symbol in previous if symbol not in codes]
+            new_codes = [codes[symbol] for symbol in self._symbols]
+            position = 0
+            encoded = " ".join(new_codes)
+            self._code_ends.clear()
+
+        # The end of every code in the encoded text, where the codes of the next edit start.
+        end = self._code_ends[-1] if self._code_ends else -1
+        for code in new_codes:
+            end += len(code) + 1
+            self._code_ends.append(end)
+
+        return EncodingSessionDiff(
+            encoding_map=EncodingMapDiff(reset=reset, updated=updated, removed=removed),
+            encoded_text=EncodedTextDiff(start=position, text=encoded))
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the encoders and decoders.
+"""
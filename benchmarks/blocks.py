@@ -0,0 +1,60 @@
+"""
+Measures the throughput of the block mode with a growing number of worker processes, against the
+encoding of the whole text as a single block.
+
+Run it with `python -m benchmarks.blocks --size 64MB --block-size 1MB --workers 1 2 4 8`.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.core.encoder import HuffmanEncoder
+from app.services.block_service import BlockService
+from .corpora import parse_size, spanish_text
+
+
+def _seconds(coroutine) -> tuple[float, object]:
+    """
+    Runs a coroutine and returns the seconds it took and its result.
+    """
+    start = time.perf_counter()
+    result = asyncio.run(coroutine)
+    return time.perf_counter() - start, result
+
+
+def main():
+    """
+    Runs the benchmark and prints the compression and decompression throughput of every number of
+    workers.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="16MB", help="size of the text, such as 64MB")
+    parser.add_argument("--block-size", default="1MB", help="characters of every block")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--shared-codebook", action="store_true")
+    args = parser.parse_args()
+
+    size, block_size = parse_size(args.size), parse_size(args.block_size)
+    text = spanish_text(size)
+
+    start = time.perf_counter()
+    HuffmanEncoder().encode_text_packed(text, canonical=True)
+    single = time.perf_counter() - start
+    print(f"single block: compress {size / single / 1e6:8.1f} MB/s")
+
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            service = BlockService(executor)
+            # The first run starts the worker processes.
+            asyncio.run(service.compress(text[:block_size * workers], block_size))
+            compress, data = _seconds(service.compress(text, block_size, args.shared_codebook))
+            decompress, decoded = _seconds(service.decompress(data))
+        assert decoded == text
+        ratio = len(data) / len(text.encode())
+        print(f"{workers:2d} workers:   compress {size / compress / 1e6:8.1f} MB/s, "
+              f"decompress {size / decompress / 1e6:8.1f} MB/s, ratio {ratio:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measures the cost of wrapping the symbols in the Pydantic models that the core used before, against
+the slotted containers of `app.core.containers`.
+
+Run it with `python -m benchmarks.containers --size 1000000`.
+"""
+import argparse
+from pydantic import BaseModel
+from app.core.containers import EncodedSymbols, EncodingMap, UnencodedSymbols
+from app.core.encoder import HuffmanEncoder
+from app.core.decoder import HuffmanDecoder
+from .decoder import generate_text, measure
+
+
+class ValidatedUnencodedSymbols(BaseModel):
+    """
+    The Pydantic model of the unencoded symbols.
+    """
+    unencoded: list[str]
+
+
+class ValidatedEncodedSymbols(BaseModel):
+    """
+    The Pydantic model of the encoded symbols.
+    """
+    encoded: list[str]
+
+
+class ValidatedEncodingMap(BaseModel):
+    """
+    The Pydantic model of the encoding map.
+    """
+    map: dict[str, str]
+
+
+def main():
+    """
+    Runs the benchmark and prints the time of wrapping the symbols of an encode and a decode, and
+    of the encode and decode themselves.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000,
+                        help="number of characters of the text")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    text = generate_text(args.size)
+    symbols = list(text)
+    encoder = HuffmanEncoder(codebook_cache_bytes=0)
+    enc_map, enc_symbols = encoder.encode(UnencodedSymbols(unencoded=symbols))
+    codes = enc_symbols.encoded
+    decoder = HuffmanDecoder()
+
+    def validated_wrapping():
+        # Every encode wrapped the symbols, the codes and the map, and every decode wrapped the
+        # codes, the map and the decoded symbols.
+        ValidatedUnencodedSymbols(unencoded=symbols)
+        ValidatedEncodedSymbols(encoded=codes)
+        ValidatedEncodingMap(map=dict(enc_map.map))
+        ValidatedEncodedSymbols(encoded=codes)
+        ValidatedEncodingMap(map=dict(enc_map.map))
+        ValidatedUnencodedSymbols(unencoded=symbols)
+
+    def slotted_wrapping():
+        UnencodedSymbols(unencoded=symbols)
+        EncodedSymbols(encoded=codes)
+        EncodingMap(map=enc_map.map)
+        EncodedSymbols(encoded=codes)
+        EncodingMap(map=enc_map.map)
+        UnencodedSymbols(unencoded=symbols)
+
+    results = {
+        "pydantic wrapping": measure(validated_wrapping, args.repeat),
+        "slotted wrapping": measure(slotted_wrapping, args.repeat),
+        "encode": measure(lambda: encoder.encode(UnencodedSymbols(unencoded=symbols)),
+                          args.repeat),
+        "decode": measure(lambda: decoder.decode(enc_map, EncodedSymbols(encoded=codes)),
+                          args.repeat),
+    }
+
+    print(f"symbols: {len(symbols)}")
+    for name, elapsed in results.items():
+        print(f"{name:>17}: {elapsed * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Generates the texts of the benchmarks locally, so they do not depend on downloaded files: synthetic
+texts over alphabets of a given size, and Spanish texts built from common words.
+"""
+import random
+import re
+
+SIZE_PATTERN = re.compile(r"^(\d+)\s*([KMG]?B?)$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "B": 1, "K": 1 << 10, "KB": 1 << 10, "M": 1 << 20, "MB": 1 << 20,
+              "G": 1 << 30, "GB": 1 << 30}
+
+SPANISH_WORDS = (
+    "de la que el en y a los se del las un por con no una su para es al lo como más pero sus le "
+    "ya o este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde "
+    "todo nos durante todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué "
+    "unos yo otro otras otra él tanto esa estos mucho quienes nada muchos cual poco ella estar "
+    "estas algunas algo nosotros mi mis tú te ti tu tus ellas nosotras vosotros vosotras os mío "
+    "mía míos mías tuyo tuya suyo suya nuestro nuestra vuestro vuestra esos esas estoy estás está "
+    "estamos estáis están esté estés estemos estéis estén estaré estarás estará año día vez "
+    "tiempo hombre mujer niño niña país ciudad mundo vida casa trabajo gobierno parte lugar forma "
+    "momento caso agua camión corazón canción árbol lápiz pingüino cigüeña acción educación "
+    "información música teléfono fácil difícil rápido último próximo también además después "
+    "según mañana pequeño español señor compañía año niñez extraño sueño otoño"
+).split()
+SPANISH_PUNCTUATION = (" ", " ", " ", " ", " ", " ", " ", ", ", ". ", "; ", ": ", "? ", "! ")
+
+
+def parse_size(value: str) -> int:
+    """
+    Converts a size such as "1KB", "10MB" or "512" to a number of characters.
+
+    Args:
+        value (str): The size, with an optional unit of 1024 characters.
+
+    Returns:
+        int: The number of characters.
+
+    Raises:
+        ValueError: If the size cannot be read.
+    """
+    match = SIZE_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError(f"invalid size: {value}")
+    number, unit = match.groups()
+    return int(number) * SIZE_UNITS[unit.upper()]
+
+
+def format_size(size: int) -> str:
+    """
+    Writes a number of characters with the largest unit that divides it.
+
+    Args:
+        size (int): The number of characters.
+
+    Returns:
+        str: The size, such as "1KB" or "100MB".
+    """
+    for unit in ("GB", "MB", "KB"):
+        if size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def alphabet(size: int) -> list[str]:
+    """
+    Returns an alphabet with the given number of characters, printable ASCII first and then Latin
+    and other characters from U+0100.
+
+    Args:
+        size (int): The number of characters.
+
+    Returns:
+        list[str]: The characters.
+    """
+    printable = [chr(code) for code in range(0x21, 0x7F)]
+    if size <= len(printable):
+        return printable[:size]
+    return printable + [chr(0x100 + index) for index in range(size - len(printable))]
+
+
+def synthetic_text(size: int, alphabet_size: int, seed: int = 0) -> str:
+    """
+    Generates a text whose character frequencies follow Zipf's law over an alphabet, which gives
+    Huffman trees of realistic depth.
+
+    Args:
+        size (int): The number of characters.
+        alphabet_size (int): The number of distinct characters.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        str: The generated text.
+    """
+    characters = alphabet(alphabet_size)
+    weights = [1 / rank for rank in range(1, alphabet_size + 1)]
+    rng = random.Random(seed)
+    # Every character appears at least once, so the text uses the whole alphabet.
+    text = characters + rng.choices(characters, weights, k=max(0, size - alphabet_size))
+    return "".join(text[:size])
+
+
+def spanish_text(size: int, seed: int = 0) -> str:
+    """
+    Generates a Spanish text from common words with Zipf frequencies, capitalized sentences and
+    punctuation.
+
+    Args:
+        size (int): The number of characters.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        str: The generated text.
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(SPANISH_WORDS) + 1)]
+    parts = []
+    length = 0
+    capitalize = True
+    while length < size:
+        for word in rng.choices(SPANISH_WORDS, weights, k=1024):
+            separator = rng.choice(SPANISH_PUNCTUATION)
+            part = (word.capitalize() if capitalize else word) + separator
+            capitalize = separator.strip() in (".", "?", "!")
+            parts.append(part)
+            length += len(part)
+    return "".join(parts)[:size]
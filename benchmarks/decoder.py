@@ -0,0 +1,83 @@
+"""
+Measures the throughput of the decoders in MB/s.
+
+Run it with `python -m benchmarks.decoder --size 1000000`.
+"""
+import argparse
+import random
+import time
+from app.core.constants import Constants
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.core.containers import EncodedSymbols, UnencodedSymbols
+
+
+def generate_text(size: int, seed: int = 0) -> str:
+    """
+    Generates a text with the letter frequency in Spanish.
+
+    Args:
+        size (int): The number of characters.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        str: The generated text.
+    """
+    frequencies = Constants.LETTERS_FREQ_IN_SPANISH.value
+    rng = random.Random(seed)
+    return "".join(rng.choices(list(frequencies), list(frequencies.values()), k=size))
+
+
+def measure(function, repeat: int, setup=None) -> float:
+    """
+    Returns the best time of several runs of a function.
+
+    Args:
+        function (Callable): The function to run.
+        repeat (int): The number of runs.
+        setup (Callable): A function run before every run and not timed, or None.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """
+    Runs the benchmark and prints the throughput of each decoder.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000,
+                        help="number of characters of the text")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    text = generate_text(args.size)
+    symbols = UnencodedSymbols(unencoded=list(text))
+    enc_map, enc_symbols = HuffmanEncoder().encode(symbols)
+    _, packed = HuffmanEncoder().encode_packed(symbols)
+    decoder = HuffmanDecoder()
+
+    megabytes = len(text.encode()) / 1e6
+    results = {
+        "separated codes": measure(lambda: decoder.decode(
+            enc_map, EncodedSymbols(encoded=enc_symbols.encoded)), args.repeat),
+        "packed bitstream": measure(lambda: decoder.decode_packed(enc_map, packed), args.repeat),
+    }
+
+    print(f"decoded text: {megabytes:.2f} MB, packed input: {len(packed.data) / 1e6:.2f} MB")
+    for name, elapsed in results.items():
+        print(f"{name:>17}: {megabytes / elapsed:8.2f} MB/s ({elapsed:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures the bytes on the wire and the latency of the representations of an encoding response:
+JSON serialized as FastAPI does for a route that returns a model, JSON serialized by
+`app.api.negotiation.json_response`, and the binary envelope, each one without compression and
+with gzip and deflate. The response cache is disabled, so every request encodes the text again.
+
+Run it with `python -m benchmarks.formats --size 1MB --alphabet 256`.
+"""
+import argparse
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from app.api.negotiation import ENVELOPE_MEDIA_TYPE, json_response
+from app.api.response_cache import ResponseCache, response_cache
+from app.main import app
+from app.services.encoder_service import encoder_service
+from .corpora import format_size, parse_size, spanish_text, synthetic_text
+from .decoder import measure
+
+
+def main():
+    """
+    Runs the benchmark and prints the size and the time of every representation: the time of the
+    serialization alone, and of the whole request through the application.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="1MB", help="size of the text, such as 100KB")
+    parser.add_argument("--alphabet", type=int, default=None,
+                        help="symbols of a synthetic text (default a Spanish text)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    text = synthetic_text(size, args.alphabet) if args.alphabet else spanish_text(size)
+    response = encoder_service("huffman").encode_sync(text, False, False)
+
+    def fastapi_json() -> bytes:
+        return json.dumps(jsonable_encoder(response, exclude_none=True), ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    print(f"text: {format_size(size)}, {len(response.encoding_map)} symbols")
+    print("serialization:")
+    for name, function in (("fastapi json", fastapi_json),
+                           ("json_response", lambda: json_response(response).body)):
+        elapsed = measure(function, args.repeat)
+        print(f"  {name:>14}: {len(function()):>10} bytes {elapsed * 1000:9.2f} ms")
+
+    # The same request is sent again and again, which would measure the hits of the cache.
+    response_cache.entries = ResponseCache(max_bytes=0).entries
+    client = TestClient(app)
+    print("requests:")
+    for accept in ("application/json", ENVELOPE_MEDIA_TYPE):
+        for coding in ("identity", "gzip", "deflate"):
+            headers = {"Accept": accept, "Accept-Encoding": coding}
+
+            def request():
+                return client.post("/v1/encoder/", json={"text": text}, headers=headers)
+
+            wire = request().num_bytes_downloaded
+            elapsed = measure(request, args.repeat)
+            print(f"  {accept:>32} {coding:>8}: {wire:>10} bytes {elapsed * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
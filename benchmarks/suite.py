@@ -0,0 +1,222 @@
+"""
+Runs the benchmarks of the core and the services over several input sizes and alphabet sizes,
+saves the results as JSON and, given the results of a previous run, fails when a benchmark got
+slower than a threshold. The caches of the encoder, the decoder and the syllables are empty at the
+start of every run, and the throughput is in millions of input characters per second.
+
+Run it with `python -m benchmarks.suite --output results.json`, and later with
+`python -m benchmarks.suite --baseline results.json --threshold 0.2` to check for regressions.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+from typing import Callable
+from app.core.containers import EncodedSymbols, UnencodedSymbols
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.core.tokenizer import syllable_tokenizer
+from app.services.decoder_service import DecoderService
+from app.services.encoder_service import EncoderService
+from app.services.execution import ExecutionBackend
+from .corpora import format_size, parse_size, spanish_text, synthetic_text
+from .decoder import measure
+
+DEFAULT_SIZES = ("1KB", "100KB", "1MB")
+DEFAULT_ALPHABETS = (2, 26, 256, 4096)
+LARGE_SIZE = 10 << 20
+
+
+def _encoder() -> HuffmanEncoder:
+    """
+    Returns an encoder without the codebook cache, so every run builds the tree.
+    """
+    return HuffmanEncoder(codebook_cache_bytes=0)
+
+
+def _decoder() -> HuffmanDecoder:
+    """
+    Returns a decoder without the table cache, so every run builds the tables.
+    """
+    return HuffmanDecoder(table_cache_bytes=0)
+
+
+def spanish_benchmarks(size: int) -> dict[str, Callable[[], object]]:
+    """
+    Prepares the benchmarks of a Spanish text.
+
+    Args:
+        size (int): The number of characters of the text.
+
+    Returns:
+        dict: The functions to measure, by name.
+    """
+    text = spanish_text(size)
+    symbols = UnencodedSymbols(unencoded=list(text))
+    encoder, decoder = _encoder(), _decoder()
+    enc_map, enc_symbols = encoder.encode(symbols)
+    _, packed = encoder.encode_packed(symbols)
+
+    backend = ExecutionBackend("inline")
+    encoder_service = EncoderService(encoder, backend=backend)
+    decoder_service = DecoderService(decoder, backend=backend)
+    response = encoder_service.encode_sync(text, True, False)
+
+    return {
+        "encoder.encode": lambda: encoder.encode(symbols),
+        "decoder.decode": lambda: decoder.decode(enc_map, EncodedSymbols(encoded=enc_symbols.encoded)),
+        "decoder.decode_packed": lambda: decoder.decode_packed(enc_map, packed),
+        "tokenizer.tokenize": lambda: syllable_tokenizer.tokenize(text),
+        "encoder_service.characters": lambda: encoder_service.encode_sync(text, False, False),
+        "encoder_service.syllables": lambda: encoder_service.encode_sync(text, True, False),
+        "encoder_service.spanish_frequencies": lambda: encoder_service.encode_sync(text, False, True),
+        "decoder_service.decode": lambda: decoder_service.decode_sync(response.encoded_text,
+                                                                      response.encoding_map),
+    }
+
+
+def synthetic_benchmarks(size: int, alphabet_size: int) -> dict[str, Callable[[], object]]:
+    """
+    Prepares the benchmarks of a synthetic text.
+
+    Args:
+        size (int): The number of characters of the text.
+        alphabet_size (int): The number of distinct characters of the text.
+
+    Returns:
+        dict: The functions to measure, by name.
+    """
+    text = synthetic_text(size, alphabet_size)
+    symbols = UnencodedSymbols(unencoded=list(text))
+    encoder, decoder = _encoder(), _decoder()
+    nodes = encoder._calculate_frequencies(symbols)
+    tree, _ = encoder._build_huffman_tree(nodes)
+    enc_map, enc_symbols = encoder.encode(symbols)
+
+    return {
+        "encoder.encode": lambda: encoder.encode(symbols),
+        "encoder._build_huffman_tree": lambda: encoder._build_huffman_tree(nodes),
+        "encoder._huffman_code_tree": lambda: encoder._huffman_code_tree(tree),
+        "decoder.decode": lambda: decoder.decode(enc_map, EncodedSymbols(encoded=enc_symbols.encoded)),
+    }
+
+
+def run_suite(sizes: list[int], alphabets: list[int], repeat: int,
+              patterns: list[str] | None = None) -> list[dict]:
+    """
+    Runs the benchmarks.
+
+    Args:
+        sizes (list[int]): The numbers of characters of the texts.
+        alphabets (list[int]): The alphabet sizes of the synthetic texts.
+        repeat (int): The number of runs of every benchmark, the best one is reported. The texts
+                      of at least 10 MB are run once.
+        patterns (list[str]): Glob patterns of the names of the benchmarks to run, or None for all.
+
+    Returns:
+        list[dict]: The result of every benchmark.
+    """
+    results = []
+    print(f"{'benchmark':<60} {'best time':>15} {'M input chars/s':>16}", file=sys.stderr)
+    for size in sizes:
+        runs = repeat if size < LARGE_SIZE else 1
+        corpora = [("spanish", None, spanish_benchmarks)] + \
+            [("synthetic", alphabet_size, synthetic_benchmarks) for alphabet_size in alphabets]
+        for corpus, alphabet_size, prepare in corpora:
+            benchmarks = prepare(size) if alphabet_size is None else prepare(size, alphabet_size)
+            for name, function in benchmarks.items():
+                if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                    continue
+                # The syllables of the words are cached by the tokenizer of the services, which
+                # would be warm after the first run.
+                seconds = measure(function, runs, setup=syllable_tokenizer.clear_cache)
+                throughput = size / seconds / 1e6 if seconds else None
+                results.append({"benchmark": name, "corpus": corpus, "alphabet": alphabet_size,
+                                "size": format_size(size), "seconds": seconds,
+                                "throughput_mchars_s": throughput})
+                print(f"{_key(results[-1]):<60} {seconds * 1000:12.3f} ms "
+                      f"{throughput or 0:16.2f}", file=sys.stderr)
+    return results
+
+
+def find_regressions(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Compares the results with the results of a previous run.
+
+    Args:
+        results (list[dict]): The results of this run.
+        baseline (list[dict]): The results of the previous run.
+        threshold (float): The relative increase of the time that is a regression, such as 0.2 for
+                           20 % slower.
+
+    Returns:
+        list[str]: A description of every benchmark that got slower than the threshold. The
+        benchmarks that are not in both runs are not compared.
+    """
+    previous = {_key(result): result["seconds"] for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if not before:
+            continue
+        change = result["seconds"] / before - 1
+        if change > threshold:
+            regressions.append(f"{_key(result)}: {before * 1000:.3f} ms -> "
+                               f"{result['seconds'] * 1000:.3f} ms (+{change:.0%})")
+    return regressions
+
+
+def _key(result: dict) -> str:
+    """
+    Returns the name that identifies a benchmark between runs.
+    """
+    alphabet = f"[{result['alphabet']}]" if result["alphabet"] is not None else ""
+    return f"{result['benchmark']} {result['corpus']}{alphabet} {result['size']}"
+
+
+def main() -> int:
+    """
+    Runs the suite, saves the results and checks them against the baseline.
+
+    Returns:
+        int: The exit status, 1 if there are regressions.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="sizes of the texts, such as 1KB, 10MB or 100MB")
+    parser.add_argument("--alphabets", nargs="+", type=int, default=DEFAULT_ALPHABETS,
+                        help="alphabet sizes of the synthetic texts")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs, the best one is reported")
+    parser.add_argument("--benchmarks", nargs="+", default=None,
+                        help="glob patterns of the benchmarks to run, such as 'decoder.*'")
+    parser.add_argument("--output", help="file where the results are saved as JSON")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown that fails the comparison, default 0.2")
+    args = parser.parse_args()
+
+    results = run_suite([parse_size(size) for size in args.sizes], args.alphabets, args.repeat,
+                        args.benchmarks)
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+This module contains tests for the content negotiation and the compression of the responses.
+"""
+import gzip
+import zlib
+import pytest
+from fastapi.testclient import TestClient
+from app.api.negotiation import (ENVELOPE_MEDIA_TYPE, JSON_MEDIA_TYPE, choose_content_coding,
+                                 choose_media_type, json_response)
+from app.main import app
+from app.schemas import DecodeResponse
+
+client = TestClient(app)
+
+OFFERED = (JSON_MEDIA_TYPE, ENVELOPE_MEDIA_TYPE)
+
+
+@pytest.mark.parametrize("accept, media_type", [
+    (None, JSON_MEDIA_TYPE),
+    ("*/*", JSON_MEDIA_TYPE),
+    (ENVELOPE_MEDIA_TYPE, ENVELOPE_MEDIA_TYPE),
+    (f"application/json;q=0.5, {ENVELOPE_MEDIA_TYPE}", ENVELOPE_MEDIA_TYPE),
+    (f"application/json, {ENVELOPE_MEDIA_TYPE};q=0.9", JSON_MEDIA_TYPE),
+    ("application/*;q=0.2, application/json;q=0.1", ENVELOPE_MEDIA_TYPE),
+    ("text/html", JSON_MEDIA_TYPE)])
+def test_choose_media_type(accept, media_type):
+    """
+    Test that the media type with the highest quality of its most specific match is chosen.
+    """
+    assert choose_media_type(accept, OFFERED) == media_type
+
+
+@pytest.mark.parametrize("accept_encoding, coding", [
+    (None, None), ("identity", None), ("gzip", "gzip"), ("deflate", "deflate"),
+    ("gzip;q=0.5, deflate", "deflate"), ("gzip, deflate, br", "gzip"), ("*", "gzip"),
+    ("*, gzip;q=0", "deflate"), ("gzip;q=0", None)])
+def test_choose_content_coding(accept_encoding, coding):
+    """
+    Test that the content coding with the highest quality is chosen, preferring gzip.
+    """
+    assert choose_content_coding(accept_encoding) == coding
+
+
+def test_json_response_escapes_lone_surrogates():
+    """
+    Test that a text that is not valid UTF-8 is still serialized.
+    """
+    assert json_response(DecodeResponse(decoded_text="a\ud800")).body == \
+        b'{"decoded_text":"a\\ud800"}'
+
+
+@pytest.mark.parametrize("coding, decompress", [("gzip", gzip.decompress),
+                                                ("deflate", zlib.decompress)])
+def test_large_responses_are_compressed(coding, decompress):
+    """
+    Test that a response above the threshold is compressed with the accepted coding.
+    """
+    text = "abracadabra " * 1000
+    res = client.post("/v1/encoder/", json={"text": text}, headers={"Accept-Encoding": coding})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == coding
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert int(res.headers["content-length"]) < len(res.content)
+    assert res.json()["encoded_text"]
+
+
+def test_small_and_binary_responses_are_not_compressed():
+    """
+    Test that the responses below the threshold and the packed codes are sent as they are.
+    """
+    res = client.post("/v1/encoder/", json={"text": "abc"}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+    res = client.post("/v1/encoder/", json={"text": "abracadabra " * 1000,
+                                            "output_format": "binary"},
+                      headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+
+
+@pytest.mark.parametrize("accept", [None, JSON_MEDIA_TYPE, ENVELOPE_MEDIA_TYPE])
+def test_negotiated_responses_vary_on_accept(accept):
+    """
+    Test that both representations of an encoding say that they depend on the Accept header.
+    """
+    headers = {"Accept": accept} if accept else {}
+    res = client.post("/v1/encoder/", json={"text": "vary"}, headers=headers)
+    assert res.status_code == 200
+    assert "Accept" in res.headers["vary"]
@@ -0,0 +1,139 @@
+"""
+This module contains tests for the cache of the responses and the conditional requests.
+"""
+import asyncio
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from app.api.compression import coded_etag
+from app.api.response_cache import ResponseCache, cache_key, etag_matches, response_cache
+from app.main import app
+from tests.constants import Constants
+
+client = TestClient(app)
+
+
+def test_cache_key_depends_on_the_text_and_every_option():
+    """
+    Test that the requests that give different responses have different keys.
+    """
+    keys = {cache_key("encoder", "hola", "huffman", False, False),
+            cache_key("encoder", "hola", "huffman", True, False),
+            cache_key("encoder", "hola", "huffman", False, True),
+            cache_key("encoder", "hola", "adaptive", False, False),
+            cache_key("encoder", "holas", "huffman", False, False),
+            cache_key("huffman-coding", "hola", "huffman", False, False)}
+    assert len(keys) == 6
+    assert cache_key("encoder", "hola", "huffman") == cache_key("encoder", "hola", "huffman")
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False), ("", False), ('"abc"', True), ('W/"abc"', True), ('"x", "abc"', True),
+    ("*", False), ('"abc-gzip"', True), ('"abd"', False)])
+def test_etag_matches(if_none_match, matches):
+    """
+    Test the weak comparison of the If-None-Match header, with the tags of compressed bodies.
+    """
+    assert etag_matches(if_none_match, '"abc"') == matches
+
+
+def test_coded_etag():
+    """
+    Test that only strong tags get the content coding.
+    """
+    assert coded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert coded_etag('W/"abc"', "gzip") == 'W/"abc"'
+
+
+def test_cache_evicts_the_least_recently_used_responses():
+    """
+    Test that the cache keeps the responses within its capacity and produces the evicted ones
+    again.
+    """
+    cache = ResponseCache(max_bytes=1 << 20)
+    produced = []
+
+    async def produce(body):
+        produced.append(body)
+        return Response(content=body, media_type="text/plain")
+
+    async def request(body):
+        return await cache.respond(cache_key("test", body.decode()), None, lambda: produce(body))
+
+    first, second, third = b"a" * 500, b"b" * 500, b"c" * 500
+    asyncio.run(request(first))
+    # Room for two responses.
+    cache.entries.max_bytes = 2 * cache.entries.cache_info().currbytes
+    for body in (second, first, third, first, second):
+        assert asyncio.run(request(body)).body == body
+    assert produced == [first, second, third, second]
+    assert cache.entries.cache_info().currbytes <= cache.entries.max_bytes
+
+
+@pytest.mark.parametrize("url, kwargs", [
+    ("/v1/encoder/", {"json": {"text": Constants.TEXT_2.value}}),
+    ("/v1/encoder/", {"json": {"text": Constants.TEXT_2.value, "output_format": "binary"}}),
+    ("/v1/decoder/", {"json": {"encoded_text": Constants.ENC_TEXT_2.value,
+                               "encoding_map": Constants.ENC_MAP_2.value}}),
+    ("/huffman-coding", {"data": {"text": Constants.TEXT_2.value}})])
+def test_repeated_request_is_cached_and_conditional_request_is_not_modified(url, kwargs):
+    """
+    Test that a repeated request is answered from the cache with the same body and ETag, and that
+    a request with the ETag is answered with 304 Not Modified.
+    """
+    first = client.post(url, **kwargs)
+    hits = response_cache.entries.cache_info().hits
+    second = client.post(url, **kwargs)
+    assert first.status_code == second.status_code == 200
+    assert response_cache.entries.cache_info().hits == hits + 1
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert first.headers["etag"].startswith('"')
+
+    not_modified = client.post(url, headers={"If-None-Match": first.headers["etag"]}, **kwargs)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == first.headers["etag"]
+
+    any_tag = client.post(url, headers={"If-None-Match": "*"}, **kwargs)
+    assert any_tag.status_code == 200
+    assert any_tag.content == first.content
+
+
+def test_envelope_and_json_are_cached_apart():
+    """
+    Test that the representations of the same request are different responses.
+    """
+    json_response = client.post("/v1/encoder/", json={"text": "abracadabra"})
+    envelope = client.post("/v1/encoder/", json={"text": "abracadabra"},
+                           headers={"Accept": "application/vnd.huffman.envelope"})
+    assert json_response.headers["etag"] != envelope.headers["etag"]
+    assert envelope.headers["content-type"] == "application/vnd.huffman.envelope"
+
+
+def test_compressed_response_has_the_coded_etag():
+    """
+    Test that a compressed response has its own strong ETag, which makes a conditional request
+    not modified.
+    """
+    text = Constants.TEXT_1.value * 20
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.post("/v1/encoder/", json={"text": text}, headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+
+    not_modified = client.post("/v1/encoder/", json={"text": text},
+                               headers={**headers, "If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == response.headers["etag"]
+
+
+def test_errors_are_not_cached():
+    """
+    Test that a request that fails is not cached.
+    """
+    entries = len(response_cache.entries)
+    for _ in range(2):
+        response = client.post("/v1/encoder/", json={"text": "hola", "algorithm": "unknown"})
+        assert response.status_code == 400
+    assert len(response_cache.entries) == entries
@@ -0,0 +1,66 @@
+"""
+This module contains tests for the views of the web page.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.services.encoder_service import encoder_service
+
+client = TestClient(app)
+
+SESSION_URL = "/huffman-coding/ws"
+
+
+def test_huffman_coding_fragment():
+    """
+    Test that the form is answered with the encoded text and the encoding table.
+    """
+    response = client.post("/huffman-coding", data={"text": "aab"})
+    assert response.status_code == 200
+    assert "text/html" in response.headers["content-type"]
+    assert encoder_service("huffman").encode_sync("aab", False, False).encoded_text in response.text
+
+
+def test_page_opens_the_session():
+    """
+    Test that the page connects to the WebSocket session and posts the form only without it.
+    """
+    response = client.get("/")
+    assert response.status_code == 200
+    assert SESSION_URL in response.text
+    assert "htmx:beforeRequest" in response.text
+
+
+def test_session_sends_the_changes_of_every_edit():
+    """
+    Test that the WebSocket session answers every edit with the changes of the encoding.
+    """
+    encoding_map, encoded_text = {}, ""
+    with client.websocket_connect(SESSION_URL) as websocket:
+        for text, separate_syllables in [("compilar", True), ("compilar compiladores", True),
+                                         ("compilar", True), ("compilar", False)]:
+            websocket.send_json({"text": text, "separate_syllables": separate_syllables})
+            diff = websocket.receive_json()
+            if diff["encoding_map"]["reset"]:
+                encoding_map = {}
+            for symbol in diff["encoding_map"]["removed"]:
+                del encoding_map[symbol]
+            encoding_map.update(diff["encoding_map"]["updated"])
+            start = diff["encoded_text"]["start"]
+            encoded_text = encoded_text[:start] + diff["encoded_text"]["text"]
+
+            response = encoder_service("huffman").encode_sync(text, separate_syllables, False)
+            assert encoded_text == response.encoded_text
+            assert encoding_map == response.encoding_map
+
+
+def test_session_closes_on_invalid_message():
+    """
+    Test that a message that is not a valid update closes the session.
+    """
+    with client.websocket_connect(SESSION_URL) as websocket:
+        websocket.send_json({"text": 1})
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+    assert exc_info.value.code == 1003
@@ -1,13 +1,18 @@
 """
 This module contains tests for the decoder router.
 """
+import json
+import pytest
 from fastapi.testclient import TestClient
+from app.api.v1 import encoder_router
 from app.main import app
 from tests.constants import Constants
 
 client = TestClient(app)
 
 DECODER_URL = "/v1/decoder/"
+BINARY_DECODER_URL = "/v1/decoder/binary"
+BATCH_URL = "/v1/decoder/batch"
 
 
 def test_invalid_algorithm():
@@ -72,3 +77,285 @@ def test_decode_enc_text_separate_syllables():
     assert res.status_code == 200
     assert res.json() == {
         "decoded_text": Constants.TEXT_SEPARATE_SYLLABLES.value}
+
+
+def test_decode_binary_roundtrip():
+    """
+    Test that the binary output of the encoder is decoded back to the text.
+    """
+    enc_res = client.post("/v1/encoder/",
+                          json={"separate_syllables": True,
+                                "output_format": "binary",
+                                "text": Constants.TEXT_SEPARATE_SYLLABLES.value})
+    res = client.post(BINARY_DECODER_URL,
+                      content=enc_res.content,
+                      headers={"X-Encoding-Map": enc_res.headers["x-encoding-map"],
+                               "X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert res.status_code == 200
+    assert res.json() == {"decoded_text": Constants.TEXT_SEPARATE_SYLLABLES.value}
+
+
+def test_decode_binary_with_padding():
+    """
+    Test the case when the number of bits is given by the padding.
+    """
+    bits = Constants.ENC_TEXT_2.value.replace(" ", "")
+    padding = -len(bits) % 8
+    data = int(bits + "0" * padding, 2).to_bytes((len(bits) + padding) // 8, "big")
+    res = client.post(BINARY_DECODER_URL,
+                      content=data,
+                      headers={"X-Encoding-Map": json.dumps(Constants.ENC_MAP_2.value),
+                               "X-Padding": str(padding)})
+    assert res.status_code == 200
+    assert res.json() == {"decoded_text": Constants.TEXT_2.value}
+
+
+def test_decode_binary_invalid_encoding_map():
+    """
+    Test the case when the encoding map is not a prefix code.
+    """
+    res = client.post(BINARY_DECODER_URL,
+                      content=b"\x00",
+                      headers={"X-Encoding-Map": json.dumps({"a": "0", "b": "01"}),
+                               "X-Bit-Length": "8"})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid encoding map"}
+
+
+def test_decode_invalid_encoding_map():
+    """
+    Test the case when the encoding map of an encoded text is not a prefix code.
+    """
+    res = client.post(DECODER_URL,
+                      json={"encoded_text": "0 01",
+                            "encoding_map": {"a": "0", "b": "01"}})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid encoding map"}
+
+
+def test_decode_unknown_code():
+    """
+    Test the case when the encoded text has a code that is not in the encoding map.
+    """
+    res = client.post(DECODER_URL,
+                      json={"encoded_text": "0 11",
+                            "encoding_map": {"a": "0", "b": "10"}})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid encoded text"}
+
+
+def test_decode_binary_invalid_algorithm():
+    """
+    Test the case when the algorithm is invalid.
+    """
+    res = client.post(BINARY_DECODER_URL + "?algorithm=invalid",
+                      content=b"\x00",
+                      headers={"X-Encoding-Map": json.dumps(Constants.ENC_MAP_2.value)})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid algorithm"}
+
+
+def test_decode_with_codebook():
+    """
+    Test decoding a text encoded with canonical codes using the codebook.
+    """
+    enc_res = client.post("/v1/encoder/",
+                          json={"canonical": True,
+                                "separate_syllables": True,
+                                "text": Constants.TEXT_SEPARATE_SYLLABLES.value})
+    res = client.post(DECODER_URL, json=enc_res.json())
+    assert res.status_code == 200
+    assert res.json() == {"decoded_text": Constants.TEXT_SEPARATE_SYLLABLES.value}
+
+
+def test_decode_binary_with_codebook():
+    """
+    Test decoding the binary output of canonical codes using the codebook header.
+    """
+    enc_res = client.post("/v1/encoder/",
+                          json={"canonical": True,
+                                "output_format": "binary",
+                                "text": Constants.TEXT_1.value})
+    res = client.post(BINARY_DECODER_URL,
+                      content=enc_res.content,
+                      headers={"X-Codebook": enc_res.headers["x-codebook"],
+                               "X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert res.status_code == 200
+    assert res.json() == {"decoded_text": Constants.TEXT_1.value}
+
+
+def test_decode_invalid_codebook():
+    """
+    Test the case when the codebook is not valid.
+    """
+    res = client.post(DECODER_URL,
+                      json={"codebook": "not base64!",
+                            "encoded_text": Constants.ENC_TEXT_1.value})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid codebook"}
+
+
+def test_decode_batch():
+    """
+    Test that the texts of a batch are decoded in order, and that an item that cannot be decoded
+    does not affect the others.
+    """
+    items = [{"encoded_text": Constants.ENC_TEXT_1.value, "encoding_map": Constants.ENC_MAP_1.value},
+             {"encoded_text": "0 11", "encoding_map": {"a": "0", "b": "10"}},
+             {"encoded_text": Constants.ENC_TEXT_2.value, "encoding_map": Constants.ENC_MAP_2.value},
+             {"encoded_text": "0", "codebook": "invalid"},
+             {"encoded_text": "0", "encoding_map": {"a": "0"}, "algorithm": "invalid"},
+             {"encoded_text": "0"}]
+    res = client.post(BATCH_URL, json={"items": items * 10})
+    assert res.status_code == 200
+
+    assert res.json()["results"] == [
+        {"response": {"decoded_text": Constants.TEXT_1.value}},
+        {"error": "Invalid encoded text"},
+        {"response": {"decoded_text": Constants.TEXT_2.value}},
+        {"error": "Invalid codebook"},
+        {"error": "Invalid algorithm"},
+        {"error": "Invalid item"},
+    ] * 10
+
+
+@pytest.mark.parametrize("shared_codebook", ["false", "true"])
+def test_blocks_round_trip(shared_codebook):
+    """
+    Test compressing a text in blocks and decompressing the container.
+    """
+    text = Constants.TEXT_1.value * 30 + "ñandú"
+    enc_res = client.post(f"/v1/encoder/blocks?block_size=1024&shared_codebook={shared_codebook}",
+                          content=text.encode())
+    assert enc_res.status_code == 200
+    assert enc_res.headers["x-block-count"] == "3"
+
+    dec_res = client.post("/v1/decoder/blocks", content=enc_res.content)
+    assert dec_res.status_code == 200
+    assert dec_res.json()["decoded_text"] == text
+
+
+def test_blocks_too_small():
+    """
+    Test the case when the blocks are smaller than the minimum.
+    """
+    res = client.post("/v1/encoder/blocks?block_size=100", content=Constants.TEXT_2.value.encode())
+    assert res.status_code == 422
+
+
+def test_blocks_invalid_container():
+    """
+    Test the case when the container is corrupted.
+    """
+    data = bytearray(client.post("/v1/encoder/blocks?block_size=1024",
+                                 content=Constants.TEXT_2.value.encode()).content)
+    data[-1] ^= 0xFF
+    res = client.post("/v1/decoder/blocks", content=bytes(data))
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid container"}
+
+
+@pytest.mark.parametrize("separate_syllables", [False, True])
+def test_decode_binary_range_with_offset_index(separate_syllables):
+    """
+    Test decoding a range of symbols with the offset index returned by the encoder.
+    """
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value
+    enc_res = client.post("/v1/encoder/",
+                          json={"separate_syllables": separate_syllables,
+                                "output_format": "binary",
+                                "index_interval": 4,
+                                "text": text})
+    headers = {"X-Encoding-Map": enc_res.headers["x-encoding-map"],
+               "X-Bit-Length": enc_res.headers["x-bit-length"],
+               "X-Offset-Index": enc_res.headers["x-offset-index"]}
+    full = client.post(BINARY_DECODER_URL, content=enc_res.content, headers=headers)
+    assert full.json() == {"decoded_text": text}
+
+    symbols = client.post(BINARY_DECODER_URL, params={"start": 0, "stop": 1},
+                          content=enc_res.content, headers=headers).json()["decoded_text"]
+    res = client.post(BINARY_DECODER_URL, params={"start": 5, "stop": 11},
+                      content=enc_res.content, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["decoded_text"] in text
+    if not separate_syllables:
+        assert symbols == text[0]
+        assert res.json() == {"decoded_text": text[5:11]}
+    res = client.post(BINARY_DECODER_URL, params={"start": 5},
+                      content=enc_res.content, headers=headers)
+    assert text.endswith(res.json()["decoded_text"])
+
+
+def test_decode_binary_range_without_offset_index():
+    """
+    Test decoding a range of symbols when the encoder did not return an index.
+    """
+    text = Constants.TEXT_1.value
+    enc_res = client.post("/v1/encoder/", json={"output_format": "binary", "text": text})
+    res = client.post(BINARY_DECODER_URL, params={"start": 2, "stop": 9},
+                      content=enc_res.content,
+                      headers={"X-Encoding-Map": enc_res.headers["x-encoding-map"],
+                               "X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert res.status_code == 200
+    assert res.json() == {"decoded_text": text[2:9]}
+
+
+def test_decode_binary_invalid_offset_index():
+    """
+    Test the case when the offset index is not valid.
+    """
+    enc_res = client.post("/v1/encoder/", json={"output_format": "binary",
+                                                "text": Constants.TEXT_1.value})
+    res = client.post(BINARY_DECODER_URL, params={"start": 2},
+                      content=enc_res.content,
+                      headers={"X-Encoding-Map": enc_res.headers["x-encoding-map"],
+                               "X-Offset-Index": "not base64!"})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid offset index"}
+
+
+def test_offset_index_requires_binary_output():
+    """
+    Test that an offset index cannot be requested with the JSON response.
+    """
+    res = client.post("/v1/encoder/", json={"index_interval": 4, "text": Constants.TEXT_1.value})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid options for the algorithm"}
+
+
+def test_decode_envelope_range_with_offset_index():
+    """
+    Test that the offset index is carried in the envelope and used to decode a range.
+    """
+    text = Constants.TEXT_1.value * 50
+    enc_res = client.post("/v1/encoder/", json={"index_interval": 8, "text": text},
+                          headers={"Accept": "application/vnd.huffman.envelope"})
+    assert enc_res.status_code == 200
+    assert "x-offset-index" not in enc_res.headers
+    res = client.post(BINARY_DECODER_URL, params={"start": 100, "stop": 140},
+                      content=enc_res.content,
+                      headers={"Content-Type": "application/vnd.huffman.envelope"})
+    assert res.json() == {"decoded_text": text[100:140]}
+
+
+def test_offset_index_too_large_for_a_header(monkeypatch):
+    """
+    Test that an offset index larger than the limit of the headers is rejected with the binary
+    output format.
+    """
+    monkeypatch.setattr(encoder_router, "MAX_HEADER_BYTES", 16)
+    res = client.post("/v1/encoder/", json={"output_format": "binary", "index_interval": 1,
+                                            "text": Constants.TEXT_1.value * 10})
+    assert res.status_code == 400
+    assert res.json() == {
+        "detail": "Header too large, accept application/vnd.huffman.envelope instead"}
+
+
+def test_invalid_envelope():
+    """
+    Test the case when a body sent as an envelope cannot be read.
+    """
+    res = client.post("/v1/decoder/binary", content=b"HUFE\x01\x09",
+                      headers={"Content-Type": "application/vnd.huffman.envelope"})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid container"}
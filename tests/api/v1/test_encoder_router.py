@@ -1,13 +1,26 @@
 """
 This module contains tests for the encoder router.
 """
+import asyncio
+import base64
+import json
+import pytest
 from fastapi.testclient import TestClient
+from app.api.v1 import encoder_router
+from app.core.adaptive import AdaptiveHuffmanDecoder
+from app.core.container import read_stream_header
+from app.core.envelope import read_envelope
+from app.core.pretrained import registry
+from app.core.tokenizer import MAX_WORD_LENGTH
 from app.main import app
+from app.services.encoder_service import _StreamTokenizer, encoder_service
 from tests.constants import Constants
 
 client = TestClient(app)
 
 ENCODER_URL = "/v1/encoder/"
+STREAM_URL = "/v1/encoder/stream"
+BATCH_URL = "/v1/encoder/batch"
 
 
 def test_invalid_algorithm():
@@ -62,3 +75,496 @@ def test_encode_text_separated_into_syllables():
     assert res.status_code == 200
     assert res.json() == {"encoding_map": Constants.ENC_MAP_SEPARATE_SYLLABLES.value,
                           "encoded_text": Constants.ENC_TEXT_SEPARATE_SYLLABLES.value}
+
+
+def test_encode_spanish_frequencies_ignores_other_characters():
+    """
+    Test that the characters outside the letter frequency in Spanish are not encoded.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": "Año 2024: ¡acción!",
+                            "algorithm": "huffman",
+                            "use_spanish_frequencies": True})
+    assert res.status_code == 200
+    enc_map = res.json()["encoding_map"]
+    assert res.json()["encoded_text"] == " ".join(enc_map[letter] for letter in "AÑOACCION")
+
+
+def test_encode_text_1_binary():
+    """
+    Test the case when the text is Constants.TEXT_1 and the output format is binary.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_1.value,
+                            "output_format": "binary"})
+    bits = Constants.ENC_TEXT_1.value.replace(" ", "")
+    padding = -len(bits) % 8
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/octet-stream"
+    assert json.loads(res.headers["x-encoding-map"]) == Constants.ENC_MAP_1.value
+    assert int(res.headers["x-bit-length"]) == len(bits)
+    assert int(res.headers["x-padding"]) == padding
+    assert res.content == int(bits + "0" * padding, 2).to_bytes(len(res.content), "big")
+
+
+def test_invalid_output_format():
+    """
+    Test the case when the output format is invalid.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_1.value,
+                            "output_format": "invalid"})
+    assert res.status_code == 422
+
+
+def test_canonical_round_trip_with_lone_surrogate():
+    """
+    Test that a text with a lone surrogate is encoded with canonical codes and decoded back.
+    """
+    text = "a\ud800b"
+    enc_res = client.post(ENCODER_URL, json={"text": text, "canonical": True})
+    assert enc_res.status_code == 200
+    dec_res = client.post("/v1/decoder/", json={"encoded_text": enc_res.json()["encoded_text"],
+                                                "codebook": enc_res.json()["codebook"]})
+    assert dec_res.status_code == 200
+    assert dec_res.json()["decoded_text"] == text
+
+
+def test_encode_canonical():
+    """
+    Test that the canonical codes return the codebook instead of the encoding map.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_2.value,
+                            "canonical": True})
+    assert res.status_code == 200
+    assert set(res.json()) == {"codebook", "encoded_text"}
+    assert res.json()["encoded_text"] == "0 0 0 0 0 0 110 111 111 111 10 10 10 10 10"
+
+
+def _decode_stream(data: bytes) -> str:
+    """
+    Decodes the output of the stream endpoint.
+    """
+    codebook, bit_length, offset = read_stream_header(data)
+    return "".join(codebook.decoding_table().decode(data[offset:], bit_length))
+
+
+def test_encode_stream():
+    """
+    Test that a text sent in chunks is encoded with the same codes as the whole text.
+    """
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value * 50
+
+    def chunks():
+        data = text.encode()
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+
+    res = client.post(STREAM_URL + "?separate_syllables=true", content=chunks())
+    enc_res = client.post(ENCODER_URL,
+                          json={"text": text, "separate_syllables": True, "canonical": True})
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/octet-stream"
+    codebook, bit_length, _ = read_stream_header(res.content)
+    assert base64.b64decode(enc_res.json()["codebook"]) == codebook.to_header()
+    assert bit_length == len(enc_res.json()["encoded_text"].replace(" ", ""))
+    assert int(res.headers["x-bit-length"]) == bit_length
+    assert _decode_stream(res.content) == text
+
+
+def test_encode_stream_long_word(monkeypatch):
+    """
+    Test that a word longer than MAX_WORD_LENGTH is not kept whole between the chunks, and is
+    encoded with the same codes as the whole text.
+    """
+    text = "ñandú" * 2000
+    pending = []
+    feed = _StreamTokenizer.feed
+
+    def tracked_feed(self, data, final=False):
+        symbols = feed(self, data, final)
+        pending.append(len(self._pending))
+        return symbols
+
+    def chunks():
+        data = text.encode()
+        for start in range(0, len(data), 97):
+            yield data[start:start + 97]
+
+    monkeypatch.setattr(_StreamTokenizer, "feed", tracked_feed)
+    res = client.post(STREAM_URL + "?separate_syllables=true", content=chunks())
+    enc_res = client.post(ENCODER_URL,
+                          json={"text": text, "separate_syllables": True, "canonical": True})
+
+    assert res.status_code == 200
+    assert max(pending) <= MAX_WORD_LENGTH
+    codebook, _, _ = read_stream_header(res.content)
+    assert base64.b64decode(enc_res.json()["codebook"]) == codebook.to_header()
+    assert _decode_stream(res.content) == text
+
+
+def test_encode_stream_file_upload():
+    """
+    Test encoding a text uploaded as a file.
+    """
+    text = "ñandú " * 1000
+    res = client.post(STREAM_URL, files={"file": ("text.txt", text.encode(), "text/plain")})
+    assert res.status_code == 200
+    assert _decode_stream(res.content) == text
+
+
+def test_encode_stream_empty():
+    """
+    Test encoding an empty stream.
+    """
+    res = client.post(STREAM_URL, content=b"")
+    assert res.status_code == 200
+    assert _decode_stream(res.content) == ""
+
+
+def test_encode_stream_invalid_utf8():
+    """
+    Test the case when the text is not valid UTF-8.
+    """
+    res = client.post(STREAM_URL, content=b"abc\xff")
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid text"}
+
+
+def test_encode_max_code_length():
+    """
+    Test that limiting the code length reports the compression cost of the limit.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_1.value,
+                            "max_code_length": 4})
+    assert res.status_code == 200
+    encoding_map = res.json()["encoding_map"]
+    optimal_bits = len(Constants.ENC_TEXT_1.value.replace(" ", ""))
+    limited_bits = len(res.json()["encoded_text"].replace(" ", ""))
+    assert max(len(code) for code in encoding_map.values()) == 4
+    assert res.json()["compression_cost"] == pytest.approx(limited_bits / optimal_bits - 1)
+    assert res.json()["compression_cost"] > 0
+
+    bin_res = client.post(ENCODER_URL, json={"text": Constants.TEXT_1.value, "max_code_length": 4,
+                                             "output_format": "binary"})
+    assert float(bin_res.headers["x-compression-cost"]) == res.json()["compression_cost"]
+    assert "x-compression-cost" not in client.post(
+        ENCODER_URL, json={"text": Constants.TEXT_1.value, "output_format": "binary"}).headers
+
+
+def test_encode_max_code_length_too_short():
+    """
+    Test the case when the maximum code length cannot fit all the symbols.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_1.value,
+                            "max_code_length": 2})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid max code length"}
+
+
+def test_encode_invalid_max_code_length():
+    """
+    Test the case when the maximum code length is not positive.
+    """
+    res = client.post(ENCODER_URL,
+                      json={"text": Constants.TEXT_1.value,
+                            "max_code_length": 0})
+    assert res.status_code == 422
+
+
+def test_encode_batch():
+    """
+    Test that the texts of a batch are encoded in order, each one with its options.
+    """
+    items = [{"text": Constants.TEXT_1.value},
+             {"text": Constants.TEXT_2.value},
+             {"text": Constants.TEXT_1.value, "separate_syllables": True}] * 20
+    res = client.post(BATCH_URL, json={"items": items})
+    assert res.status_code == 200
+
+    results = res.json()["results"]
+    assert len(results) == len(items)
+    for item, result in zip(items, results):
+        expected = client.post(ENCODER_URL, json=item).json()
+        assert result == {"response": expected}
+
+
+def test_encode_batch_reports_errors_per_item():
+    """
+    Test that an item that cannot be encoded does not affect the others.
+    """
+    items = [{"text": Constants.TEXT_1.value},
+             {"text": Constants.TEXT_1.value, "algorithm": "invalid"},
+             {"text": Constants.TEXT_1.value, "max_code_length": 2},
+             {"text": Constants.TEXT_1.value, "max_code_length": 0},
+             {"max_code_length": 4},
+             {"text": Constants.TEXT_2.value}]
+    res = client.post(BATCH_URL, json={"items": items})
+    assert res.status_code == 200
+
+    results = res.json()["results"]
+    assert results[0]["response"]["encoding_map"] == Constants.ENC_MAP_1.value
+    assert results[1] == {"error": "Invalid algorithm"}
+    assert results[2] == {"error": "Invalid max code length"}
+    assert results[3] == {"error": "Invalid item"}
+    assert results[4] == {"error": "Invalid item"}
+    assert results[5]["response"]["encoding_map"] == Constants.ENC_MAP_2.value
+
+
+def test_encode_batch_empty():
+    """
+    Test that a batch without items is rejected.
+    """
+    res = client.post(BATCH_URL, json={"items": []})
+    assert res.status_code == 422
+
+
+def test_metrics():
+    """
+    Test that the metrics are exported in the Prometheus text format after an encoding.
+    """
+    client.post(ENCODER_URL, json={"text": Constants.TEXT_1.value, "separate_syllables": True})
+
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'huffman_stage_duration_seconds_count{operation="encode",stage="tokenize"}' in res.text
+    assert "# TYPE huffman_codebook_cache_hits_total counter" in res.text
+    assert "huffman_event_loop_lag_seconds" in res.text
+
+
+@pytest.mark.parametrize("separate_syllables", [False, True])
+def test_adaptive_round_trip(separate_syllables):
+    """
+    Test encoding with the adaptive algorithm and decoding without an encoding map.
+    """
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value
+    enc_res = client.post(ENCODER_URL, json={"text": text, "algorithm": "adaptive",
+                                             "separate_syllables": separate_syllables})
+    assert enc_res.status_code == 200
+    assert enc_res.json()["encoding_map"] == {}
+
+    dec_res = client.post("/v1/decoder/", json={"encoded_text": enc_res.json()["encoded_text"],
+                                                "algorithm": "adaptive"})
+    assert dec_res.status_code == 200
+    assert dec_res.json()["decoded_text"] == text
+
+
+def test_adaptive_binary_round_trip():
+    """
+    Test the binary output of the adaptive algorithm.
+    """
+    text = Constants.TEXT_1.value
+    enc_res = client.post(ENCODER_URL, json={"text": text, "algorithm": "adaptive",
+                                             "output_format": "binary"})
+    dec_res = client.post("/v1/decoder/binary?algorithm=adaptive", content=enc_res.content,
+                          headers={"X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert dec_res.status_code == 200
+    assert dec_res.json()["decoded_text"] == text
+
+
+def test_adaptive_stream():
+    """
+    Test that the adaptive algorithm encodes a stream without the codebook header.
+    """
+    text = "ñandú compilador " * 500
+    data = text.encode()
+    res = client.post(STREAM_URL + "?algorithm=adaptive&separate_syllables=true",
+                      content=(data[start:start + 1000] for start in range(0, len(data), 1000)))
+
+    assert res.status_code == 200
+    assert "x-bit-length" not in res.headers
+    parts = AdaptiveHuffmanDecoder().decode_stream([res.content])
+    assert "".join(symbol for part in parts for symbol in part) == text
+
+
+def test_adaptive_stream_invalid_utf8_in_the_first_chunk():
+    """
+    Test that the adaptive stream rejects a first chunk that is not valid UTF-8 before the
+    response starts.
+    """
+    res = client.post(STREAM_URL + "?algorithm=adaptive", content=iter([b"abc\xff", b"def"]))
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid text"}
+
+
+def test_adaptive_stream_invalid_utf8_in_a_later_chunk():
+    """
+    Test that the adaptive stream ends with the abort mark when a later chunk is not valid UTF-8,
+    after the response started, and that the decoder rejects it.
+    """
+    async def chunks():
+        yield b"abc"
+        yield b"def\xff"
+
+    async def encode():
+        _, stream = await encoder_service("adaptive").encode_stream(chunks(), False, False)
+        return b"".join([data async for data in stream])
+
+    dec_res = client.post("/v1/decoder/binary?algorithm=adaptive", content=asyncio.run(encode()))
+    assert dec_res.status_code == 400
+    assert dec_res.json() == {"detail": "Invalid text"}
+
+
+@pytest.mark.parametrize("separate_syllables", ["false", "true"])
+def test_adaptive_stream_decoded_by_the_binary_decoder(separate_syllables):
+    """
+    Test that the adaptive stream of the encoder, with its end mark and padding, is decoded by the
+    binary decoder.
+    """
+    text = "ñandú compilador " * 500
+    res = client.post(f"{STREAM_URL}?algorithm=adaptive&separate_syllables={separate_syllables}",
+                      content=text.encode())
+    assert res.status_code == 200
+
+    dec_res = client.post("/v1/decoder/binary?algorithm=adaptive", content=res.content)
+    assert dec_res.status_code == 200
+    assert dec_res.json()["decoded_text"] == text
+
+
+@pytest.mark.parametrize("options", [{"canonical": True}, {"max_code_length": 4},
+                                     {"use_spanish_frequencies": True}])
+def test_adaptive_invalid_options(options):
+    """
+    Test that the options that need an encoding map are rejected by the adaptive algorithm.
+    """
+    res = client.post(ENCODER_URL, json={"text": "abc", "algorithm": "adaptive", **options})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "Invalid options for the algorithm"}
+
+
+def test_list_pretrained():
+    """
+    Test that the pretrained codebooks are listed by name.
+    """
+    res = client.get("/v1/encoder/pretrained")
+    assert res.status_code == 200
+    assert {"english", "json", "logs", "spanish-letters", "spanish-syllables"} <= set(res.json())
+
+
+@pytest.mark.parametrize("name", ["english", "json", "spanish-syllables"])
+def test_pretrained_round_trip(name):
+    """
+    Test encoding with a pretrained codebook and decoding with its name, without an encoding map.
+    """
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value
+    enc_res = client.post(ENCODER_URL, json={"text": text, "pretrained": name})
+    assert enc_res.status_code == 200
+    assert enc_res.json().keys() == {"pretrained", "pretrained_fingerprint", "encoded_text"}
+    assert enc_res.json()["pretrained_fingerprint"] == registry.get(name).fingerprint.hex()
+    dec_res = client.post("/v1/decoder/", json={"encoded_text": enc_res.json()["encoded_text"],
+                                                "pretrained": name})
+    assert dec_res.json() == {"decoded_text": text}
+    dec_res = client.post("/v1/decoder/", json={
+        "encoded_text": enc_res.json()["encoded_text"], "pretrained": name,
+        "pretrained_fingerprint": enc_res.json()["pretrained_fingerprint"]})
+    assert dec_res.json() == {"decoded_text": text}
+
+
+def test_pretrained_fingerprint_mismatch():
+    """
+    Test that a text encoded with another version of a pretrained codebook is not decoded.
+    """
+    enc_res = client.post(ENCODER_URL, json={"text": Constants.TEXT_1.value,
+                                             "pretrained": "english"})
+    dec_res = client.post("/v1/decoder/", json={"encoded_text": enc_res.json()["encoded_text"],
+                                                "pretrained": "english",
+                                                "pretrained_fingerprint": "00" * 16})
+    assert dec_res.status_code == 400
+    assert dec_res.json() == {"detail": "Invalid pretrained codebook"}
+
+    enc_res = client.post(ENCODER_URL, json={"text": Constants.TEXT_1.value,
+                                             "pretrained": "english", "output_format": "binary"})
+    dec_res = client.post("/v1/decoder/binary", content=enc_res.content,
+                          headers={"X-Pretrained": "english",
+                                   "X-Pretrained-Fingerprint": "00" * 16,
+                                   "X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert dec_res.status_code == 400
+    assert dec_res.json() == {"detail": "Invalid pretrained codebook"}
+
+
+@pytest.mark.parametrize("name", ["english", "spanish-syllables"])
+def test_pretrained_binary_round_trip(name):
+    """
+    Test the binary output format with a pretrained codebook.
+    """
+    text = Constants.TEXT_1.value
+    enc_res = client.post(ENCODER_URL, json={"text": text, "pretrained": name,
+                                             "output_format": "binary"})
+    assert enc_res.status_code == 200
+    assert enc_res.headers["x-pretrained"] == name
+    assert "x-encoding-map" not in enc_res.headers
+    dec_res = client.post("/v1/decoder/binary", content=enc_res.content,
+                          headers={"X-Pretrained": name,
+                                   "X-Pretrained-Fingerprint":
+                                       enc_res.headers["x-pretrained-fingerprint"],
+                                   "X-Bit-Length": enc_res.headers["x-bit-length"]})
+    assert dec_res.json() == {"decoded_text": text}
+
+
+@pytest.mark.parametrize("options, detail", [
+    ({"pretrained": "missing"}, "Invalid pretrained codebook"),
+    ({"pretrained": "english", "text": "漢字"}, "Invalid symbol for the pretrained codebook"),
+    ({"pretrained": "english", "max_code_length": 12}, "Invalid options for the algorithm"),
+    ({"pretrained": "english", "use_spanish_frequencies": True},
+     "Invalid options for the algorithm"),
+    ({"pretrained": "english", "algorithm": "adaptive"}, "Invalid options for the algorithm")])
+def test_pretrained_invalid(options, detail):
+    """
+    Test that a missing codebook, a text with unknown characters and the options that change the
+    codes are rejected.
+    """
+    res = client.post(ENCODER_URL, json={"text": "abc", **options})
+    assert res.status_code == 400
+    assert res.json() == {"detail": detail}
+
+
+@pytest.mark.parametrize("options", [{}, {"canonical": True}, {"pretrained": "english"}])
+def test_envelope_round_trip(options):
+    """
+    Test that a client that accepts the envelope gets the packed codes and the model to decode
+    them in a single body.
+    """
+    text = Constants.TEXT_1.value
+    res = client.post(ENCODER_URL, json={"text": text, **options},
+                      headers={"Accept": "application/vnd.huffman.envelope"})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/vnd.huffman.envelope"
+    envelope = read_envelope(res.content)
+    headers = {"X-Bit-Length": str(envelope.packed.bit_length)}
+    if envelope.encoding_map is not None:
+        headers["X-Encoding-Map"] = json.dumps(envelope.encoding_map)
+    elif envelope.codebook is not None:
+        headers["X-Codebook"] = base64.b64encode(envelope.codebook.to_header()).decode("ascii")
+    else:
+        headers["X-Pretrained"] = envelope.pretrained
+    dec_res = client.post("/v1/decoder/binary", content=envelope.packed.data, headers=headers)
+    assert dec_res.json() == {"decoded_text": text}
+
+    dec_res = client.post("/v1/decoder/binary", content=res.content,
+                          headers={"Content-Type": "application/vnd.huffman.envelope"})
+    assert dec_res.json() == {"decoded_text": text}
+
+
+def test_binary_encoding_map_too_large_for_a_header(monkeypatch):
+    """
+    Test that an encoding map larger than the limit of the headers is rejected with the binary
+    output format, and that the envelope carries it in the body.
+    """
+    monkeypatch.setattr(encoder_router, "MAX_HEADER_BYTES", 64)
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value + " con un mapa demasiado grande"
+    res = client.post(ENCODER_URL, json={"text": text, "separate_syllables": True,
+                                         "output_format": "binary"})
+    assert res.status_code == 400
+    assert res.json() == {
+        "detail": "Header too large, accept application/vnd.huffman.envelope instead"}
+
+    res = client.post(ENCODER_URL, json={"text": text, "separate_syllables": True},
+                      headers={"Accept": "application/vnd.huffman.envelope"})
+    assert res.status_code == 200
+    assert read_envelope(res.content).encoding_map is not None
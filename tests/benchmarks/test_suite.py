@@ -0,0 +1,46 @@
+"""
+This module contains tests for the generated texts and the regression check of the benchmark suite.
+"""
+import pytest
+from benchmarks.corpora import format_size, parse_size, spanish_text, synthetic_text
+from benchmarks.suite import find_regressions
+
+
+@pytest.mark.parametrize("value, size", [("512", 512), ("1KB", 1 << 10), ("10mb", 10 << 20),
+                                         ("100MB", 100 << 20)])
+def test_parse_size(value, size):
+    """
+    Test that the sizes are read with units of 1024 characters, and written back.
+    """
+    assert parse_size(value) == size
+    assert parse_size(format_size(size)) == size
+
+
+def test_generated_texts():
+    """
+    Test that the texts have the requested size and alphabet, and do not change between runs.
+    """
+    text = synthetic_text(1000, 256)
+    assert len(text) == 1000
+    assert len(set(text)) == 256
+    assert text == synthetic_text(1000, 256)
+    assert len(spanish_text(1000)) == 1000
+
+
+def test_find_regressions():
+    """
+    Test that only the benchmarks slower than the threshold are reported, and that the benchmarks
+    missing from the baseline are ignored.
+    """
+    def result(name, seconds):
+        return {"benchmark": name, "corpus": "spanish", "alphabet": None, "size": "1KB",
+                "seconds": seconds}
+
+    baseline = [result("encoder.encode", 1.0), result("decoder.decode", 1.0)]
+    results = [result("encoder.encode", 1.1), result("decoder.decode", 1.5),
+               result("tokenizer.tokenize", 9.0)]
+
+    regressions = find_regressions(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("decoder.decode spanish 1KB")
@@ -0,0 +1,155 @@
+"""
+This module contains tests for the adaptive Huffman encoder and decoder.
+"""
+import random
+import pytest
+from app.core.adaptive import (AdaptiveHuffmanDecoder, AdaptiveHuffmanEncoder, AdaptiveHuffmanTree,
+                               AdaptiveStreamWriter)
+from app.core.bitstream import pack_codes
+from app.core.containers import EncodedSymbols, EncodingMap, PackedSymbols, UnencodedSymbols
+from app.exceptions import InvalidEncodedText, InvalidOptions, InvalidText
+from tests.constants import Constants
+
+
+def _assert_sibling_property(tree: AdaptiveHuffmanTree):
+    """
+    Check that the weights never increase along the nodes and that every internal node weighs as
+    much as its children.
+    """
+    weight = tree._weight
+    assert all(weight[i] >= weight[i + 1] for i in range(len(weight) - 1))
+    for node, left in enumerate(tree._left):
+        if left != -1:
+            assert weight[node] == weight[left] + weight[tree._right[node]]
+
+
+@pytest.mark.parametrize("text", [Constants.TEXT_1.value, Constants.TEXT_2.value, "a", "ñandú ü €",
+                                  "abracadabra" * 20])
+def test_encode_decode(text):
+    """
+    Test that the decoder returns the symbols given to the encoder, as text and packed.
+    """
+    enc_map, enc_symbols = AdaptiveHuffmanEncoder().encode(UnencodedSymbols(unencoded=list(text)))
+    decoder = AdaptiveHuffmanDecoder()
+
+    assert enc_map.map == {}
+    assert "".join(decoder.decode(enc_map, enc_symbols).unencoded) == text
+    packed = pack_codes(enc_symbols.encoded)
+    assert "".join(decoder.decode_packed(enc_map, packed).unencoded) == text
+
+
+def test_tree_keeps_sibling_property():
+    """
+    Test that the tree is a Huffman tree after every update.
+    """
+    rng = random.Random(0)
+    tree = AdaptiveHuffmanTree()
+    for _ in range(2000):
+        tree.encode(chr(0x41 + int(rng.paretovariate(1.2)) % 60))
+        _assert_sibling_property(tree)
+
+
+def test_block_leaders_are_the_first_node_of_every_weight():
+    """
+    Test that the leader of every block is the first node with its weight, with many symbols that
+    share the same weight.
+    """
+    rng = random.Random(1)
+    tree = AdaptiveHuffmanTree()
+    for symbol in [chr(0x4E00 + index) for index in range(500)] + \
+            [chr(0x4E00 + rng.randrange(600)) for _ in range(1000)]:
+        tree.encode(symbol)
+        first = {}
+        for node, weight in enumerate(tree._weight):
+            first.setdefault(weight, node)
+        assert tree._leaders == first
+
+
+def test_codes_adapt_to_frequencies():
+    """
+    Test that a frequent symbol gets a shorter code than a rare one.
+    """
+    tree = AdaptiveHuffmanTree()
+    for symbol in "a" * 50 + "bcd":
+        tree.encode(symbol)
+    assert len(tree.encode("a")) < len(tree.encode("d"))
+
+
+def test_new_symbol_is_sent_after_nyt():
+    """
+    Test that the first symbol is sent as its UTF-8 length and bytes, without a code.
+    """
+    assert AdaptiveHuffmanTree().encode("ñ") == "00000010" + "11000011" + "10110001"
+
+
+def test_stream_round_trip_in_small_chunks():
+    """
+    Test that a stream is decoded from chunks split anywhere, up to its end mark.
+    """
+    symbols = ["com", "pi", "lar", " ", "com", "pi", "la", "do", "res"] * 50
+    writer = AdaptiveStreamWriter()
+    data = writer.write(symbols[:100]) + writer.write(symbols[100:]) + writer.close()
+
+    chunks = (data[start:start + 3] for start in range(0, len(data), 3))
+    decoded = [symbol for part in AdaptiveHuffmanDecoder().decode_stream(chunks) for symbol in part]
+
+    assert decoded == symbols
+
+
+def test_truncated_stream():
+    """
+    Test that a stream without its end mark is rejected.
+    """
+    data = AdaptiveStreamWriter().write(list("abc"))
+    with pytest.raises(InvalidEncodedText):
+        list(AdaptiveHuffmanDecoder().decode_stream([data]))
+
+
+def test_aborted_stream():
+    """
+    Test that a stream that ends with the abort mark is rejected, whether it is read as a stream
+    or as packed codes.
+    """
+    writer = AdaptiveStreamWriter()
+    data = writer.write(list("abc")) + writer.abort()
+    with pytest.raises(InvalidText):
+        list(AdaptiveHuffmanDecoder().decode_stream([data]))
+    with pytest.raises(InvalidText):
+        AdaptiveHuffmanDecoder().decode_packed(EncodingMap(map={}),
+                                               PackedSymbols(data=data, bit_length=len(data) * 8,
+                                                             padding=0))
+
+
+def test_packed_stream_with_end_mark():
+    """
+    Test that packed codes that end with the end mark of a stream are decoded up to the mark, and
+    that only the padding may follow it.
+    """
+    writer = AdaptiveStreamWriter()
+    data = writer.write(list("abracadabra")) + writer.close()
+    decoder = AdaptiveHuffmanDecoder()
+    packed = PackedSymbols(data=data, bit_length=len(data) * 8, padding=0)
+    assert "".join(decoder.decode_packed(EncodingMap(map={}), packed).unencoded) == "abracadabra"
+
+    extra = data + b"\x00"
+    with pytest.raises(InvalidEncodedText):
+        decoder.decode_packed(EncodingMap(map={}),
+                              PackedSymbols(data=extra, bit_length=len(extra) * 8, padding=0))
+
+
+@pytest.mark.parametrize("encoded", ["0", "012", "00000001"])
+def test_invalid_encoded_text(encoded):
+    """
+    Test that bits that end in the middle of a symbol, or are not bits, are rejected.
+    """
+    with pytest.raises(InvalidEncodedText):
+        AdaptiveHuffmanDecoder().decode(EncodingMap(map={}), EncodedSymbols(encoded=[encoded]))
+
+
+@pytest.mark.parametrize("options", [{"canonical": True}, {"max_code_length": 4}])
+def test_unsupported_options(options):
+    """
+    Test that the options that need an encoding map are rejected.
+    """
+    with pytest.raises(InvalidOptions):
+        AdaptiveHuffmanEncoder().encode(UnencodedSymbols(unencoded=list("abc")), **options)
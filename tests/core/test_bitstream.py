@@ -0,0 +1,49 @@
+"""
+This module contains tests for the bitstream helpers.
+"""
+from app.core.bitstream import BitWriter, pack_codes
+
+
+def test_pack_codes():
+    """
+    Test that the codes are packed most significant bit first and the last byte is padded.
+    """
+    packed = pack_codes(["1", "011", "010", "00", "1111"])
+    assert packed.data == bytes([0b10110100, 0b01111000])
+    assert packed.bit_length == 13
+    assert packed.padding == 3
+
+
+def test_pack_no_codes():
+    """
+    Test the case when there are no codes to pack.
+    """
+    packed = pack_codes([])
+    assert packed.data == b""
+    assert packed.bit_length == 0
+    assert packed.padding == 0
+
+
+def test_writer_read_returns_complete_bytes():
+    """
+    Test that reading the writer only returns complete bytes and keeps the rest.
+    """
+    writer = BitWriter()
+    writer.write("1010101011")
+    assert writer.read() == bytes([0b10101010])
+    writer.write("000000")
+    assert writer.read() == bytes([0b11000000])
+    writer.write("1")
+    assert writer.read() == b""
+    assert writer.close() == bytes([0b10000000])
+    assert writer.bit_length == 17
+
+
+def test_write_codes_across_chunks():
+    """
+    Test that packing the codes in small chunks gives the same bytes.
+    """
+    codes = ["1", "011", "010", "00", "1111"] * 7
+    writer = BitWriter()
+    writer.write_codes(codes, chunk_size=3)
+    assert writer.close() == pack_codes(codes).data
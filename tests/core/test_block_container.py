@@ -0,0 +1,82 @@
+"""
+This module contains tests for the block container and the encoding and decoding of its blocks.
+"""
+from collections import Counter
+import pytest
+from app.core.block_container import (decode_block, encode_block, read_container, split_blocks,
+                                      write_container)
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.exceptions import InvalidContainer
+from tests.constants import Constants
+
+TEXT = Constants.TEXT_1.value + Constants.TEXT_2.value + "ñandú €"
+
+
+def _compress(text: str, block_size: int, shared: bool, encoder: HuffmanEncoder) -> bytes:
+    """
+    Compress a text in blocks in the calling thread.
+    """
+    codebook = encoder.build_codebook(Counter(text)) if shared else None
+    blocks = split_blocks(text, block_size)
+    encoded = [encode_block(encoder, block, codebook.encoding_map if shared else None)
+               for block in blocks]
+    return write_container(block_size, [(payload, bits, len(block))
+                                        for block, (payload, bits) in zip(blocks, encoded)], codebook)
+
+
+def _decompress(data: bytes) -> str:
+    """
+    Decompress a container in the calling thread.
+    """
+    container = read_container(data)
+    decoder = HuffmanDecoder()
+    return "".join(decode_block(decoder, payload, block.bit_length, container.codebook)
+                   for payload, block in zip(container.payloads(data), container.blocks))
+
+
+@pytest.mark.parametrize("shared", [False, True])
+@pytest.mark.parametrize("vectorize_min_size", [1, 1 << 30])
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1000])
+def test_round_trip(block_size, vectorize_min_size, shared):
+    """
+    Test that the blocks are decoded back to the text, with their own or a shared codebook, and
+    with the NumPy and the Python paths.
+    """
+    encoder = HuffmanEncoder(vectorize_min_size=vectorize_min_size)
+    data = _compress(TEXT, block_size, shared, encoder)
+
+    container = read_container(data)
+    assert len(container.blocks) == -(-len(TEXT) // block_size)
+    assert (container.codebook is not None) == shared
+    assert _decompress(data) == TEXT
+
+
+def test_empty_text():
+    """
+    Test a container without blocks.
+    """
+    data = _compress("", 10, False, HuffmanEncoder())
+    assert read_container(data).blocks == []
+    assert _decompress(data) == ""
+
+
+@pytest.mark.parametrize("position", [0, 6, -1])
+def test_corrupted_container(position):
+    """
+    Test that a change in the magic bytes, the header or a payload is detected.
+    """
+    data = bytearray(_compress(TEXT, 16, False, HuffmanEncoder()))
+    data[position] ^= 0x01
+    with pytest.raises(InvalidContainer):
+        container = read_container(bytes(data))
+        container.payloads(bytes(data))
+
+
+def test_truncated_container():
+    """
+    Test that a container without its last bytes is rejected.
+    """
+    data = _compress(TEXT, 16, True, HuffmanEncoder())
+    with pytest.raises(InvalidContainer):
+        read_container(data[:-1]).payloads(data[:-1])
@@ -0,0 +1,81 @@
+"""
+This module contains tests for the canonical codebook.
+"""
+import json
+import pytest
+from app.core.codebook import Codebook
+from app.exceptions import InvalidCodebook
+from tests.constants import Constants
+
+
+def test_canonical_codes_of_enc_map_1():
+    """
+    Test the canonical codes for the code lengths of Constants.ENC_MAP_1.
+    """
+    codebook = Codebook.from_encoding_map(Constants.ENC_MAP_1.value)
+    assert codebook.encoding_map == {
+        "2": "0",
+        "0": "100",
+        "4": "101",
+        "7": "110",
+        "6": "1110",
+        "3": "11110",
+        "1": "111110",
+        "5": "111111"
+    }
+
+
+def test_header_roundtrip():
+    """
+    Test that a codebook is rebuilt from its header.
+    """
+    codebook = Codebook.from_lengths({"com": 2, "pi": 2, " ": 3, "la": 3, "ñú": 3, "do": 3})
+    rebuilt = Codebook.from_header(codebook.to_header())
+    assert rebuilt.symbols == codebook.symbols
+    assert rebuilt.encoding_map == codebook.encoding_map
+
+
+def test_header_is_smaller_than_json_map():
+    """
+    Test that the header is smaller than the encoding map serialized as JSON.
+    """
+    codebook = Codebook.from_encoding_map(Constants.ENC_MAP_SEPARATE_SYLLABLES.value)
+    encoding_map = json.dumps(codebook.encoding_map).encode()
+    assert len(codebook.to_header()) < len(encoding_map) / 2
+
+
+def test_header_roundtrip_with_lone_surrogate():
+    """
+    Test that a symbol with a lone surrogate is serialized as the rest of the formats do.
+    """
+    codebook = Codebook.from_encoding_map({"a": "0", "\ud800": "10", "b": "11"})
+    assert Codebook.from_header(codebook.to_header()).encoding_map == codebook.encoding_map
+
+
+def test_read_header_at_offset():
+    """
+    Test reading a header followed by other data.
+    """
+    header = Codebook.from_encoding_map(Constants.ENC_MAP_2.value).to_header()
+    codebook, offset = Codebook.read_header(b"xx" + header + b"data", 2)
+    assert codebook.encoding_map == Codebook.from_encoding_map(Constants.ENC_MAP_2.value).encoding_map
+    assert offset == len(header) + 2
+
+
+@pytest.mark.parametrize("header", [
+    b"",
+    b"\x02\x01\x01\x01\x01a",
+    b"\x01\x02\x01\x02\x01a",
+    b"\x01\x03\x01\x03\x01a\x01b\x01c",
+    b"\x01\x02\x01\x02\x01a\x01a",
+    b"\x01\x01\x01\x01\x05a",
+    b"\x01\x01\x01\x01\x01a\x00",
+    b"\x01\xff\xff\xff\xff\x0f\x01\xff\xff\xff\xff\x0f",
+    b"\x01\x01\xff\xff\xff\xff\x0f\x01",
+])
+def test_invalid_headers(header):
+    """
+    Test that truncated, oversubscribed or inconsistent headers are rejected.
+    """
+    with pytest.raises(InvalidCodebook):
+        Codebook.from_header(header)
@@ -0,0 +1,91 @@
+"""
+This module contains tests for the Huffman decoder and its table cache.
+"""
+import pytest
+from app.core.bitstream import pack_codes
+from app.core.decoder import HuffmanDecoder
+from app.exceptions import InvalidEncodedText, InvalidEncodingMap
+from app.core.containers import EncodedSymbols, EncodingMap
+from tests.constants import Constants
+
+
+def test_decode_reuses_cached_map():
+    """
+    Test that the same encoding map is validated and inverted only once.
+    """
+    decoder = HuffmanDecoder()
+    enc_map = EncodingMap(map=Constants.ENC_MAP_1.value)
+    enc_symbols = EncodedSymbols(encoded=Constants.ENC_TEXT_1.value.split())
+
+    for _ in range(3):
+        dec_symbols = decoder.decode(enc_map, enc_symbols)
+        assert "".join(dec_symbols.unencoded) == Constants.TEXT_1.value
+
+    info = decoder.table_cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+
+def test_decode_packed_reuses_cached_table():
+    """
+    Test that the lookup table of the same encoding map is built only once.
+    """
+    decoder = HuffmanDecoder()
+    enc_map = EncodingMap(map=Constants.ENC_MAP_2.value)
+    packed = pack_codes(Constants.ENC_TEXT_2.value.split())
+
+    first = decoder.decode_packed(enc_map, packed)
+    table = decoder._decoding_table(enc_map.map)
+    second = decoder.decode_packed(enc_map, packed)
+
+    assert first.unencoded == second.unencoded
+    assert "".join(second.unencoded) == Constants.TEXT_2.value
+    assert decoder._decoding_table(enc_map.map) is table
+    assert decoder.table_cache.cache_info().misses == 1
+
+
+def test_maps_with_different_codes_are_cached_separately():
+    """
+    Test that the fingerprint depends on the codes of the map.
+    """
+    decoder = HuffmanDecoder()
+    first = decoder.decode(EncodingMap(map={"a": "0", "b": "1"}), EncodedSymbols(encoded=["0"]))
+    second = decoder.decode(EncodingMap(map={"a": "1", "b": "0"}), EncodedSymbols(encoded=["0"]))
+
+    assert (first.unencoded, second.unencoded) == (["a"], ["b"])
+    assert len(decoder.table_cache) == 2
+
+
+def test_decode_invalid_map_is_not_cached():
+    """
+    Test that a map that is not a prefix code is rejected every time.
+    """
+    decoder = HuffmanDecoder()
+    enc_map = EncodingMap(map={"a": "0", "b": "01"})
+    for _ in range(2):
+        with pytest.raises(InvalidEncodingMap):
+            decoder.decode(enc_map, EncodedSymbols(encoded=["0"]))
+    assert len(decoder.table_cache) == 0
+
+
+def test_decode_unknown_code():
+    """
+    Test that a code that is not in the encoding map is rejected.
+    """
+    decoder = HuffmanDecoder()
+    with pytest.raises(InvalidEncodedText):
+        decoder.decode(EncodingMap(map={"a": "0", "b": "1"}), EncodedSymbols(encoded=["01"]))
+
+
+def test_cache_is_bounded():
+    """
+    Test that the tables are evicted when the cache is full.
+    """
+    decoder = HuffmanDecoder(table_cache_bytes=1 << 16)
+    for size in range(2, 40):
+        enc_map = {f"s{i}": format(i, f"0{size.bit_length()}b") for i in range(size)}
+        decoder.decode(EncodingMap(map=enc_map), EncodedSymbols(encoded=[]))
+        decoder.decode_packed(EncodingMap(map=enc_map), pack_codes([]))
+
+    info = decoder.table_cache.cache_info()
+    assert info.evictions > 0
+    assert info.currbytes <= info.maxbytes
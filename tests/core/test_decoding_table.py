@@ -0,0 +1,97 @@
+"""
+This module contains tests for the decoding table.
+"""
+import random
+import pytest
+from app.core.bitstream import pack_codes
+from app.core.decoding_table import DecodingTable, validate_prefix_free
+from app.core.encoder import HuffmanEncoder
+from app.exceptions import InvalidEncodedText, InvalidEncodingMap
+from app.core.containers import UnencodedSymbols
+from tests.constants import Constants
+
+
+@pytest.mark.parametrize("lookup_bits", [1, 2, 3, 10])
+def test_decode_enc_text_1(lookup_bits):
+    """
+    Test decoding Constants.ENC_TEXT_1 with primary tables shorter and longer than the codes.
+    """
+    packed = pack_codes(Constants.ENC_TEXT_1.value.split())
+    table = DecodingTable(Constants.ENC_MAP_1.value, lookup_bits=lookup_bits)
+    assert "".join(table.decode(packed.data, packed.bit_length)) == Constants.TEXT_1.value
+
+
+def test_decode_random_texts():
+    """
+    Test that random texts encoded with the Huffman encoder are decoded back.
+    """
+    rng = random.Random(0)
+    encoder = HuffmanEncoder()
+    for _ in range(50):
+        weights = [rng.randint(1, 2 ** rng.randint(0, 12)) for _ in range(rng.randint(1, 80))]
+        symbols = rng.choices([f"s{i}" for i in range(len(weights))], weights, k=500)
+        enc_map, packed = encoder.encode_packed(UnencodedSymbols(unencoded=symbols))
+
+        table = DecodingTable(enc_map.map, lookup_bits=4)
+        assert table.decode(packed.data, packed.bit_length) == symbols
+
+
+def test_decode_codes_longer_than_refill():
+    """
+    Test codes longer than the bits read from the stream at once.
+    """
+    enc_map = {"a": "1", "b": "0" * 70 + "1", "c": "0" * 71}
+    codes = ["1", "0" * 70 + "1", "0" * 71, "1"]
+    packed = pack_codes(codes)
+    table = DecodingTable(enc_map)
+    assert table.decode(packed.data, packed.bit_length) == ["a", "b", "c", "a"]
+
+
+def test_overlapping_codes():
+    """
+    Test that a map where a code is a prefix of another is rejected.
+    """
+    with pytest.raises(InvalidEncodingMap):
+        DecodingTable({"a": "0", "b": "01"})
+
+
+def test_truncated_code():
+    """
+    Test that a bitstream that ends in the middle of a code is rejected.
+    """
+    table = DecodingTable(Constants.ENC_MAP_2.value)
+    with pytest.raises(InvalidEncodedText):
+        table.decode(bytes([0b10100000]), 3)
+
+
+def test_unknown_code():
+    """
+    Test that bits that do not match any code are rejected.
+    """
+    table = DecodingTable({"a": "1", "b": "01"})
+    with pytest.raises(InvalidEncodedText):
+        table.decode(bytes([0b00000000]), 8)
+
+
+@pytest.mark.parametrize("encoding_map", [
+    {"a": "0", "b": "01"},
+    {"a": "10", "b": "10"},
+    {"a": "1", "b": "0", "c": "1011111111111111"},
+    {"a": "", "b": "1"},
+    {"a": "2", "b": "1"},
+])
+def test_validate_prefix_free_rejects(encoding_map):
+    """
+    Test that codes that are empty, not binary, repeated or prefixes of other codes are rejected.
+    """
+    with pytest.raises(InvalidEncodingMap):
+        validate_prefix_free(encoding_map)
+
+
+def test_validate_prefix_free_accepts_huffman_codes():
+    """
+    Test that the Huffman codes are accepted.
+    """
+    validate_prefix_free(Constants.ENC_MAP_1.value)
+    validate_prefix_free(Constants.ENC_MAP_2.value)
+    validate_prefix_free({})
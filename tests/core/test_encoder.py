@@ -0,0 +1,317 @@
+"""
+This module contains tests for the Huffman encoder.
+"""
+import heapq
+import itertools
+import pickle
+import random
+from collections import Counter
+from fractions import Fraction
+import pytest
+from app.core.bitstream import pack_codes
+from app.core.decoding_table import DecodingTable
+from app.core.encoder import HuffmanEncoder
+from app.exceptions import InvalidMaxCodeLength
+from app.core.node_tree import HuffmanTree
+from app.core.containers import EncodingMap, UnencodedSymbols
+from tests.constants import Constants
+
+encoder = HuffmanEncoder()
+
+
+def _sorted_list_huffman_tree(nodes):
+    """
+    Reference implementation that re-sorts the list of nodes after every merge.
+    """
+    tree = HuffmanTree([symbol for symbol, _ in nodes])
+    nodes = [(leaf, frequency) for leaf, (_, frequency) in enumerate(nodes)]
+    while len(nodes) > 1:
+        (key1, c1) = nodes[-1]
+        (key2, c2) = nodes[-2]
+        nodes = nodes[:-2]
+        nodes.append((tree.merge(key1, key2), c1 + c2))
+        nodes = sorted(nodes, key=lambda x: x[1], reverse=True)
+    return tree, nodes[0][1]
+
+
+def _distinct_symbol_nodes(size: int):
+    """
+    Returns `size` distinct symbols with random frequencies, sorted as the encoder sorts them.
+    """
+    rng = random.Random(size)
+    nodes = [(f"s{i}", rng.randint(1, 1000)) for i in range(size)]
+    return sorted(nodes, key=lambda x: x[1], reverse=True)
+
+
+def _count_leaves(tree: HuffmanTree) -> int:
+    """
+    Counts the leaves reached from the root of a Huffman tree, without recursion.
+    """
+    leaves = 0
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        if tree.is_leaf(node):
+            leaves += 1
+        else:
+            stack.extend((tree.left[node], tree.right[node]))
+    return leaves
+
+
+def _table_decode(encoding_map, codes):
+    """
+    Decodes a list of codes with a decoding table.
+    """
+    packed = pack_codes(codes)
+    return DecodingTable(encoding_map).decode(packed.data, packed.bit_length)
+
+
+@pytest.mark.parametrize("text, encoding_map", [
+    (Constants.TEXT_1.value, Constants.ENC_MAP_1.value),
+    (Constants.TEXT_2.value, Constants.ENC_MAP_2.value),
+])
+def test_golden_encoding_maps(text, encoding_map):
+    """
+    Test that the heap-based tree keeps the encoding maps of Constants.
+    """
+    enc_map, _ = encoder.encode(UnencodedSymbols(unencoded=list(text)))
+    assert enc_map.map == encoding_map
+
+
+def test_same_tie_breaking_as_sorted_list():
+    """
+    Test that the heap-based tree breaks ties like the sorted-list construction.
+    """
+    rng = random.Random(0)
+    for _ in range(500):
+        alphabet = rng.randint(1, 40)
+        symbols = [str(rng.randrange(alphabet))
+                   for _ in range(rng.randint(1, 200))]
+        nodes = encoder._calculate_frequencies(
+            UnencodedSymbols(unencoded=symbols))
+
+        expected = encoder._huffman_code_tree(
+            _sorted_list_huffman_tree(list(nodes))[0])
+        actual = encoder._huffman_code_tree(
+            encoder._build_huffman_tree(list(nodes))[0])
+
+        assert list(actual.items()) == list(expected.items())
+
+
+@pytest.mark.parametrize("size", [10, 1_000, 10_000, 100_000])
+def test_build_huffman_tree_distinct_symbols(size):
+    """
+    Test that the tree is built for alphabets of up to 10^5 distinct symbols.
+    """
+    nodes = _distinct_symbol_nodes(size)
+    tree, frequency = encoder._build_huffman_tree(nodes)
+
+    assert frequency == sum(count for _, count in nodes)
+    assert _count_leaves(tree) == size
+    assert len(tree) == 2 * size - 1
+
+
+@pytest.mark.parametrize("size", [10, 10_000])
+def test_build_huffman_tree_heap_operations(monkeypatch, size):
+    """
+    Test that building the tree takes one heapify, then two pops and one push of a heap of at most
+    n nodes per merge, each O(log n), so it grows as O(n log n) rather than quadratically.
+    """
+    calls = Counter()
+    heap_sizes = []
+
+    def counted(name):
+        function = getattr(heapq, name)
+
+        def wrapper(heap, *args):
+            calls[name] += 1
+            heap_sizes.append(len(heap))
+            return function(heap, *args)
+        return wrapper
+
+    for name in ("heapify", "heappop", "heappush"):
+        monkeypatch.setattr(heapq, name, counted(name))
+    encoder._build_huffman_tree(_distinct_symbol_nodes(size))
+
+    assert calls == {"heapify": 1, "heappop": 2 * (size - 1), "heappush": size - 1}
+    assert max(heap_sizes) == size
+
+
+def test_encode_packed():
+    """
+    Test that packing the codes gives the same bits as the encoded symbols.
+    """
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_2.value))
+    enc_map, packed = encoder.encode_packed(symbols)
+    bits = Constants.ENC_TEXT_2.value.replace(" ", "")
+
+    assert enc_map.map == Constants.ENC_MAP_2.value
+    assert packed.bit_length == len(bits)
+    assert packed.data == int(bits + "0" * packed.padding, 2).to_bytes(len(packed.data), "big")
+
+
+def test_encode_single_symbol():
+    """
+    Test that a text with a single distinct symbol gets a one-bit code.
+    """
+    enc_map, enc_symbols = encoder.encode(UnencodedSymbols(unencoded=list("aaa")))
+    assert enc_map.map == {"a": "0"}
+    assert enc_symbols.encoded == ["0", "0", "0"]
+
+
+def test_code_tree_deeper_than_recursion_limit():
+    """
+    Test the codes of a tree deeper than the recursion limit, given by Fibonacci frequencies.
+    """
+    frequencies = [1, 1]
+    while len(frequencies) < 1500:
+        frequencies.append(frequencies[-1] + frequencies[-2])
+    nodes = sorted(((f"s{i}", f) for i, f in enumerate(frequencies)),
+                   key=lambda x: x[1], reverse=True)
+
+    tree, _ = encoder._build_huffman_tree(nodes)
+    codes = encoder._huffman_code_tree(tree)
+    lengths = encoder._code_lengths(tree)
+
+    assert max(len(code) for code in codes.values()) == len(frequencies) - 1
+    assert lengths == {symbol: len(code) for symbol, code in codes.items()}
+
+
+def test_encode_canonical():
+    """
+    Test that the canonical codes have the same lengths as the Huffman codes.
+    """
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    enc_map, enc_symbols = encoder.encode(symbols, canonical=True)
+
+    assert {s: len(c) for s, c in enc_map.map.items()} == \
+        {s: len(c) for s, c in Constants.ENC_MAP_1.value.items()}
+    assert enc_symbols.encoded == [enc_map.map[symbol] for symbol in symbols.unencoded]
+
+
+def _brute_force_cost(frequencies, max_code_length):
+    """
+    Returns the minimum cost of a prefix code with a maximum code length by trying every length.
+    """
+    best = None
+    for lengths in itertools.product(range(1, max_code_length + 1), repeat=len(frequencies)):
+        if sum(Fraction(1, 2 ** length) for length in lengths) <= 1:
+            cost = sum(f * length for f, length in zip(frequencies, lengths))
+            best = cost if best is None else min(best, cost)
+    return best
+
+
+def test_length_limited_code_lengths_are_optimal():
+    """
+    Test that package-merge finds the optimal length-limited code lengths of small alphabets.
+    """
+    rng = random.Random(1)
+    for _ in range(100):
+        size = rng.randint(2, 6)
+        nodes = sorted(((f"s{i}", rng.randint(1, 50)) for i in range(size)),
+                       key=lambda x: x[1], reverse=True)
+        max_code_length = rng.randint((size - 1).bit_length(), 5)
+
+        lengths = encoder._length_limited_code_lengths(nodes, max_code_length)
+
+        assert max(lengths.values()) <= max_code_length
+        assert sum(f * lengths[s] for s, f in nodes) == \
+            _brute_force_cost([f for _, f in nodes], max_code_length)
+
+
+def test_encode_max_code_length():
+    """
+    Test that the codes of Constants.TEXT_1 are limited to 4 bits.
+    """
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    enc_map, enc_symbols = encoder.encode(symbols, max_code_length=4)
+
+    assert max(len(code) for code in enc_map.map.values()) == 4
+    assert "".join(_table_decode(enc_map.map, enc_symbols.encoded)) == Constants.TEXT_1.value
+
+
+def test_encode_max_code_length_not_reached():
+    """
+    Test that the Huffman codes are kept when they are shorter than the maximum.
+    """
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    enc_map, _ = encoder.encode(symbols, max_code_length=6)
+    assert enc_map.map == Constants.ENC_MAP_1.value
+
+
+def test_max_code_length_too_short():
+    """
+    Test that a maximum code length that cannot fit all the symbols is rejected.
+    """
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    with pytest.raises(InvalidMaxCodeLength):
+        encoder.encode(symbols, max_code_length=2)
+
+
+def test_codebook_cache_skips_tree_construction(monkeypatch):
+    """
+    Test that a text with the same frequency histogram reuses the cached codes.
+    """
+    cached_encoder = HuffmanEncoder()
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    enc_map, _ = cached_encoder.encode(symbols)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The tree was built again")
+
+    monkeypatch.setattr(cached_encoder, "_build_huffman_tree", fail)
+    assert cached_encoder.encode(symbols)[0].map == enc_map.map
+    assert cached_encoder.encode_packed(symbols)[0].map == enc_map.map
+
+    info = cached_encoder.codebook_cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+
+    with pytest.raises(AssertionError):
+        cached_encoder.encode(UnencodedSymbols(unencoded=list(Constants.TEXT_2.value)))
+
+
+def test_codebook_cache_keys_include_options():
+    """
+    Test that the canonical and length-limited codes are cached separately.
+    """
+    cached_encoder = HuffmanEncoder()
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    default_map, _ = cached_encoder.encode(symbols)
+    canonical_map, _ = cached_encoder.encode(symbols, canonical=True)
+    limited_map, _ = cached_encoder.encode(symbols, max_code_length=4)
+
+    assert default_map.map == Constants.ENC_MAP_1.value
+    assert canonical_map.map == encoder.encode(symbols, canonical=True)[0].map
+    assert max(len(code) for code in limited_map.map.values()) == 4
+    assert cached_encoder.codebook_cache.cache_info().misses == 3
+
+
+def test_codebook_cache_disabled():
+    """
+    Test that a cache without capacity keeps no codes.
+    """
+    uncached_encoder = HuffmanEncoder(codebook_cache_bytes=0)
+    symbols = UnencodedSymbols(unencoded=list(Constants.TEXT_1.value))
+    assert uncached_encoder.encode(symbols)[0].map == Constants.ENC_MAP_1.value
+    assert len(uncached_encoder.codebook_cache) == 0
+
+
+def test_cached_encoding_map_can_be_pickled():
+    """
+    Test that an encoding map with a read-only view of a cached map can be sent to another process.
+    """
+    encoder = HuffmanEncoder()
+    enc_map, _ = encoder.encode_packed(UnencodedSymbols(unencoded=list("abracadabra")))
+    assert pickle.loads(pickle.dumps(enc_map)) == EncodingMap(map=dict(enc_map.map))
+
+
+@pytest.mark.parametrize("text", ["", "a", "abracadabra", Constants.TEXT_1.value])
+def test_codes_from_frequencies(text):
+    """
+    Test that the codes for the frequencies of a text are the codes of its encoding.
+    """
+    frequencies = {}
+    for char in text:
+        frequencies[char] = frequencies.get(char, 0) + 1
+    enc_map, _ = encoder.encode(UnencodedSymbols(unencoded=list(text)))
+    assert dict(encoder.codes(frequencies)) == enc_map.map
@@ -0,0 +1,67 @@
+"""
+This module contains tests for the binary envelope of an encoding.
+"""
+import pytest
+from app.core.codebook import Codebook
+from app.core.containers import UnencodedSymbols
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.core.envelope import read_envelope, write_envelope
+from app.core.offset_index import OffsetIndex
+from app.exceptions import InvalidContainer
+from tests.constants import Constants
+
+TEXT = Constants.TEXT_1.value + "ñandú €😀"
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_round_trip(canonical):
+    """
+    Test that the packed codes and the encoding map or the codebook are read back.
+    """
+    enc_map, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=list(TEXT)),
+                                                     canonical)
+    if canonical:
+        data = write_envelope(packed, codebook=Codebook.from_encoding_map(enc_map.map))
+    else:
+        data = write_envelope(packed, enc_map.map)
+
+    envelope = read_envelope(data)
+    assert envelope.packed == packed
+    encoding_map = envelope.codebook.encoding_map if canonical else envelope.encoding_map
+    assert encoding_map == dict(enc_map.map)
+    assert "".join(HuffmanDecoder().decode_packed(enc_map, envelope.packed).unencoded) == TEXT
+
+
+def test_offset_index_round_trip():
+    """
+    Test that the offset index of the packed codes is read back.
+    """
+    symbols = list(TEXT)
+    enc_map, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=symbols))
+    packed.index = OffsetIndex.build(symbols, enc_map.map, 4)
+    envelope = read_envelope(write_envelope(packed, enc_map.map))
+    assert envelope.packed.index == packed.index
+
+
+def test_pretrained_round_trip():
+    """
+    Test that the name and the fingerprint of a pretrained codebook are read back.
+    """
+    _, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=list("abc")))
+    envelope = read_envelope(write_envelope(packed, pretrained="english",
+                                            fingerprint=bytes(range(16))))
+    assert envelope.pretrained == "english"
+    assert envelope.fingerprint == bytes(range(16))
+    assert envelope.encoding_map is None and envelope.codebook is None
+
+
+@pytest.mark.parametrize("data", [b"", b"HUFE", b"HUFE\x02\x00", b"HUFE\x01\x07\x00",
+                                  b"HUFE\x01\x00\x01\x01a\x01", b"HUFE\x01\x02\x01x\x09\x00",
+                                  b"HUFE\x01\x02\x01x" + bytes(15)])
+def test_invalid_envelope(data):
+    """
+    Test that an envelope that is truncated or malformed is rejected.
+    """
+    with pytest.raises(InvalidContainer):
+        read_envelope(data)
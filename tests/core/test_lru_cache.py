@@ -0,0 +1,83 @@
+"""
+This module contains tests for the LRU cache bounded by size in bytes.
+"""
+from app.core.lru_cache import LRUCache, sizeof_mapping
+
+
+def test_get_and_put():
+    """
+    Test that a cached value is returned and the lookups are counted.
+    """
+    cache = LRUCache(1 << 20)
+    assert cache.get("a") is None
+    cache.put("a", "value")
+    assert cache.get("a") == "value"
+    assert "a" in cache and len(cache) == 1
+
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_evicts_least_recently_used_by_bytes():
+    """
+    Test that the least recently used entries are evicted when the size exceeds the capacity.
+    """
+    cache = LRUCache(1 << 20, sizeof=lambda value: value)
+    size = cache.max_bytes // 2 - 100
+    cache.put(1, size)
+    cache.put(2, size)
+    cache.get(1)
+    cache.put(3, size)
+
+    assert 1 in cache and 3 in cache
+    assert 2 not in cache
+    info = cache.cache_info()
+    assert info.evictions == 1
+    assert info.currbytes <= info.maxbytes
+
+
+def test_replacing_a_key_updates_the_size():
+    """
+    Test that adding a key again replaces its value and its size.
+    """
+    cache = LRUCache(1 << 20, sizeof=lambda value: value)
+    cache.put("a", 1000)
+    cache.put("a", 10)
+    assert len(cache) == 1
+    assert cache.cache_info().currbytes < 1000
+
+
+def test_value_larger_than_capacity_is_not_cached():
+    """
+    Test that a value that does not fit in the cache is not stored, and that a zero capacity
+    disables the cache.
+    """
+    cache = LRUCache(100, sizeof=lambda value: value)
+    cache.put("a", 1000)
+    assert "a" not in cache
+
+    disabled = LRUCache(0)
+    disabled.put("a", "b")
+    assert len(disabled) == 0
+
+
+def test_clear():
+    """
+    Test that clearing the cache removes the entries and resets the statistics.
+    """
+    cache = LRUCache(1 << 20)
+    cache.put("a", "b")
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.cache_info()[:5] == (0, 0, 0, 0, 0)
+
+
+def test_sizeof_mapping_counts_keys_and_values():
+    """
+    Test that the size of a mapping grows with its keys and values.
+    """
+    small = {"a": "1"}
+    large = {"a" * 100: "1" * 100}
+    assert sizeof_mapping(large) > sizeof_mapping(small) > 0
@@ -0,0 +1,65 @@
+"""
+This module contains tests for the metrics of the encoding and decoding work.
+"""
+from app.core.containers import UnencodedSymbols
+from app.core.encoder import HuffmanEncoder
+from app.core.metrics import Histogram, Metrics, metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    """
+    Test that every bucket counts the observations not greater than its bound.
+    """
+    histogram = Histogram("test_seconds", "Test.", ("stage",), (1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value, ("tree",))
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{stage="tree",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="tree",le="2.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="tree",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="tree"} 6.0' in lines
+    assert 'test_seconds_count{stage="tree"} 4' in lines
+
+
+def test_disabled_metrics_record_nothing():
+    """
+    Test that the disabled metrics do not record the stages or the sizes.
+    """
+    disabled = Metrics(enabled=False)
+    with disabled.stage("encode", "tree"):
+        pass
+    disabled.observe_sizes("encode", 10, 2, 3)
+
+    assert all(not series for series in disabled.collect().values())
+
+
+def test_collect_and_merge():
+    """
+    Test that the observations taken from a process are removed from it and added to another.
+    """
+    worker, server = Metrics(enabled=True), Metrics(enabled=True)
+    worker.observe_sizes("encode", 10, 2, 3)
+
+    server.merge(worker.collect())
+
+    assert all(not series for series in worker.collect().values())
+    assert server.input_size.snapshot()[("encode",)][2] == 1
+
+
+def test_encoder_records_stages():
+    """
+    Test that the encoder records the time of its stages.
+    """
+    encoder = HuffmanEncoder(codebook_cache_bytes=0)
+    enabled = metrics.enabled
+    metrics.enabled = True
+    try:
+        metrics.collect()
+        encoder.encode(UnencodedSymbols(unencoded=list("abracadabra")))
+        stages = metrics.collect()[metrics.stage_seconds.name]
+    finally:
+        metrics.enabled = enabled
+
+    assert {stage for _, stage in stages} == {"frequencies", "tree", "codes", "emit"}
@@ -0,0 +1,50 @@
+"""
+This module contains tests for the array-backed Huffman tree.
+"""
+import sys
+import pytest
+from app.core.encoder import HuffmanEncoder
+from app.core.node_tree import HuffmanTree
+from app.core.containers import UnencodedSymbols
+from tests.constants import Constants
+
+encoder = HuffmanEncoder()
+
+
+def _tree(text: str) -> HuffmanTree:
+    """
+    Builds the Huffman tree of the characters of a text.
+    """
+    nodes = encoder._calculate_frequencies(UnencodedSymbols(unencoded=list(text)))
+    return encoder._build_huffman_tree(nodes)[0]
+
+
+def test_parent_is_after_children():
+    """
+    Test that every node is added before its parent and that the last node is the root.
+    """
+    tree = _tree(Constants.TEXT_2.value)
+    for node in range(len(tree) - 1):
+        assert node < tree.parent[node]
+        assert node in (tree.left[tree.parent[node]], tree.right[tree.parent[node]])
+    assert tree.parent[tree.root] == -1
+
+
+@pytest.mark.parametrize("text", [Constants.TEXT_1.value, Constants.TEXT_2.value, "a", "aaab"])
+def test_code_lengths_match_the_encoder(text):
+    """
+    Test that the depths of the leaves are the code lengths of the encoder.
+    """
+    enc_map, _ = encoder.encode(UnencodedSymbols(unencoded=list(text)))
+    tree = _tree(text)
+    assert tree.code_lengths() == {symbol: len(code) if len(tree) > 1 else 0
+                                   for symbol, code in enc_map.map.items()}
+
+
+def test_compact_size():
+    """
+    Test that a node takes a few bytes instead of an object.
+    """
+    nodes = [(f"s{i}", 10_000 - i) for i in range(10_000)]
+    tree, _ = encoder._build_huffman_tree(nodes)
+    assert sys.getsizeof(tree) < 40 * len(tree)
@@ -0,0 +1,61 @@
+"""
+This module contains tests for the offset index and the decoding of a range of symbols.
+"""
+import pytest
+from app.core.containers import UnencodedSymbols
+from app.core.decoder import HuffmanDecoder
+from app.core.encoder import HuffmanEncoder
+from app.core.offset_index import OffsetIndex
+from app.exceptions import InvalidOffsetIndex
+from tests.constants import Constants
+
+TEXT = Constants.TEXT_1.value + Constants.TEXT_2.value + "ñandú €😀"
+
+
+@pytest.mark.parametrize("interval", [1, 3, 8, 1000])
+def test_offsets_are_the_bits_before_the_symbols(interval):
+    """
+    Test that every checkpoint is the number of bits of the codes before its symbol.
+    """
+    enc_map, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=list(TEXT)))
+    index = OffsetIndex.build(TEXT, enc_map.map, interval)
+    assert index.symbols == len(TEXT)
+    assert len(index.offsets) == len(TEXT) // interval + 1
+    for number, offset in enumerate(index.offsets):
+        assert offset == sum(len(enc_map.map[char]) for char in TEXT[:number * interval])
+    assert OffsetIndex.from_bytes(index.to_bytes()) == index
+
+
+@pytest.mark.parametrize("interval", [1, 5, 64])
+@pytest.mark.parametrize("start, stop", [(0, 0), (0, 1), (3, 17), (10, 10), (0, 10 ** 6),
+                                         (len(TEXT) - 1, len(TEXT)), (len(TEXT) + 5, 10 ** 6),
+                                         (20, 5)])
+def test_decode_range(interval, start, stop):
+    """
+    Test that decoding a range with and without the index returns the symbols of the range.
+    """
+    enc_map, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=list(TEXT)))
+    index = OffsetIndex.build(TEXT, enc_map.map, interval)
+    decoder = HuffmanDecoder()
+    for offsets in (index, None):
+        decoded = decoder.decode_range(enc_map, packed, start, stop, offsets)
+        assert "".join(decoded.unencoded) == TEXT[start:stop]
+
+
+@pytest.mark.parametrize("data", [b"", b"\x00", b"\x02", b"\x02\x04\x01", b"\x02\x04\x01\x01\x01"])
+def test_invalid_offset_index(data):
+    """
+    Test that a truncated or malformed index is rejected.
+    """
+    with pytest.raises(InvalidOffsetIndex):
+        OffsetIndex.from_bytes(data)
+
+
+def test_offsets_out_of_the_packed_symbols():
+    """
+    Test that an index with offsets after the end of the packed symbols is rejected.
+    """
+    enc_map, packed = HuffmanEncoder().encode_packed(UnencodedSymbols(unencoded=list("abcab")))
+    index = OffsetIndex(interval=2, symbols=5, offsets=[0, 4, packed.bit_length + 1])
+    with pytest.raises(InvalidOffsetIndex):
+        HuffmanDecoder().decode_range(enc_map, packed, 4, 5, index)
@@ -0,0 +1,96 @@
+"""
+This module contains tests for the pretrained codebooks.
+"""
+import os
+import pytest
+from app.cli import train_codebook
+from app.config import PRETRAINED_DIR
+from app.core.containers import EncodedSymbols
+from app.core.decoder import HuffmanDecoder
+from app.core.pretrained import PretrainedCodebook, PretrainedRegistry, registry, train
+from app.exceptions import InvalidPretrainedCodebook, InvalidSymbol
+from tests.constants import Constants
+
+CORPUS = [Constants.TEXT_1.value, Constants.TEXT_2.value]
+
+
+@pytest.mark.parametrize("tokenizer", ["characters", "syllables", "spanish-letters"])
+def test_round_trip(tokenizer):
+    """
+    Test that a text is decoded back with the codebook, including the symbols that are not in the
+    corpus, and that the serialized codebook is the same.
+    """
+    codebook = train("test", tokenizer, CORPUS)
+    text = "El ñandú comió kiwi: ¡qué rico!"
+    codes = [codebook.encoding_map[symbol] for symbol in codebook.symbols(text)]
+    decoded = HuffmanDecoder().decode(codebook.to_encoding_map(), EncodedSymbols(encoded=codes))
+    expected = "ELÑANDUCOMIOKIWIQUERICO" if tokenizer == "spanish-letters" else text
+    assert "".join(decoded.unencoded) == expected
+
+    read = PretrainedCodebook.from_bytes("test", codebook.to_bytes())
+    assert read.tokenizer == tokenizer
+    assert dict(read.encoding_map) == dict(codebook.encoding_map)
+    assert read.fingerprint == codebook.fingerprint
+
+
+def test_unknown_syllables_are_split_into_characters():
+    """
+    Test that a syllable that is not in the codebook is encoded as its characters.
+    """
+    codebook = train("test", "syllables", ["la casa"])
+    assert codebook.symbols("la pasa") == ["la", " ", "p", "a", "sa"]
+
+
+def test_invalid_symbol():
+    """
+    Test that a character that is not in the codebook is rejected.
+    """
+    with pytest.raises(InvalidSymbol):
+        train("test", "characters", CORPUS).symbols("漢字")
+
+
+@pytest.mark.parametrize("data", [b"", b"HUFM", b"HUFM\x02\x00", b"XXXX\x01\x00",
+                                  b"HUFM\x01\x05chars\x01"])
+def test_invalid_file(data):
+    """
+    Test that a file that is not a codebook is rejected.
+    """
+    with pytest.raises(InvalidPretrainedCodebook):
+        PretrainedCodebook.from_bytes("test", data)
+
+
+def test_registry_loads_lazily(tmp_path):
+    """
+    Test that the codebooks are read the first time they are requested and then kept.
+    """
+    codebooks = PretrainedRegistry(str(tmp_path))
+    assert codebooks.names() == ["spanish-letters"]
+    PretrainedRegistry(str(tmp_path)).save(train("news", "characters", CORPUS))
+    assert codebooks.names() == ["news", "spanish-letters"]
+    codebook = codebooks.get("news")
+    assert codebooks.get("news") is codebook
+    for name in ("missing", "../news", ".", ""):
+        with pytest.raises(InvalidPretrainedCodebook):
+            codebooks.get(name)
+
+
+@pytest.mark.parametrize("name", ["english", "json", "logs", "spanish-letters",
+                                  "spanish-syllables"])
+def test_shipped_codebooks(name):
+    """
+    Test that the codebooks shipped with the application can be read.
+    """
+    assert name in registry.names()
+    assert registry.get(name).encoding_map
+
+
+@pytest.mark.parametrize("name", ["english", "json", "logs", "spanish-syllables"])
+def test_shipped_codebooks_are_trained_from_their_corpus(name, tmp_path):
+    """
+    Test that every shipped codebook is the one trained from its committed corpus.
+    """
+    shipped = registry.get(name)
+    path = train_codebook(name, [os.path.join(PRETRAINED_DIR, "corpora", name + ".txt")],
+                          shipped.tokenizer, str(tmp_path))
+    with open(path, "rb") as file:
+        assert file.read() == shipped.to_bytes()
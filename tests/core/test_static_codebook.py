@@ -0,0 +1,81 @@
+"""
+This module contains tests for the static codebook of the letter frequency in Spanish.
+"""
+import pytest
+from app.core.bitstream import pack_codes
+from app.core.constants import Constants
+from app.core.encoder import HuffmanEncoder
+from app.core.static_codebook import StaticCodebook
+from app.core.containers import UnencodedSymbols
+
+encoder = HuffmanEncoder()
+
+
+@pytest.mark.parametrize("canonical, max_code_length", [(False, None), (True, None), (False, 6)])
+def test_same_codes_as_rebuilding_the_tree(canonical, max_code_length):
+    """
+    Test that the compiled codes are the ones built from the frequency model.
+    """
+    nodes = encoder._get_letter_frequency_in_spanish()
+    expected = encoder._generate_codes(nodes, canonical, max_code_length)
+
+    enc_map, enc_symbols = encoder.encode_using_letter_frequency_in_spanish(
+        UnencodedSymbols(unencoded=list("HOLAMUNDO")), canonical, max_code_length)
+    assert enc_map.map == expected
+    assert enc_symbols.encoded == [expected[symbol] for symbol in "HOLAMUNDO"]
+
+
+def test_codes_are_compiled_once():
+    """
+    Test that the encoding maps, decoding tables and codebooks are reused.
+    """
+    codebook = encoder.spanish_codebook
+    assert codebook.encoding_map() == codebook.encoding_map()
+    assert codebook.decoding_table() is codebook.decoding_table()
+    assert codebook.codebook() is codebook.codebook()
+    assert set(codebook.codebook().symbols) == set(Constants.LETTERS_FREQ_IN_SPANISH.value)
+
+
+def test_encoding_map_is_read_only():
+    """
+    Test that the shared encoding map cannot be modified.
+    """
+    with pytest.raises(TypeError):
+        encoder.spanish_codebook.encoding_map()["A"] = "1"
+
+
+def test_decoding_table_roundtrip():
+    """
+    Test that the compiled decoding table decodes the compiled codes.
+    """
+    codebook = encoder.spanish_codebook
+    packed = pack_codes(codebook.encode(list("ESPAÑA")))
+    assert codebook.decoding_table().decode(packed.data, packed.bit_length) == list("ESPAÑA")
+
+
+def test_unlimited_max_code_lengths_share_the_codes():
+    """
+    Test that every maximum code length from the longest code up is cached as no limit.
+    """
+    codebook = encoder.spanish_codebook
+    entries = len(codebook._encoding_maps)
+    for max_code_length in range(codebook.max_length, codebook.max_length + 100):
+        assert codebook.encoding_map(False, max_code_length) == codebook.encoding_map()
+        assert codebook.decoding_table(True, max_code_length) is codebook.decoding_table(True)
+        assert codebook.codebook(max_code_length) is codebook.codebook()
+    assert len(codebook._encoding_maps) == entries
+
+
+def test_caches_are_bounded():
+    """
+    Test that the compiled codes are kept in caches bounded by their size in bytes.
+    """
+    codebook = StaticCodebook(encoder._get_letter_frequency_in_spanish(), encoder._generate_codes,
+                              cache_bytes=1 << 12)
+    for max_code_length in range(5, codebook.max_length):
+        codebook.encoding_map(True, max_code_length)
+        codebook.decoding_table(True, max_code_length)
+        codebook.codebook(max_code_length)
+    assert codebook._encoding_maps.cache_info().currbytes <= 1 << 12
+    assert codebook._decoding_tables.cache_info().currbytes <= 1 << 12
+    assert codebook._codebooks.cache_info().currbytes <= 1 << 12
@@ -0,0 +1,106 @@
+"""
+This module contains tests for the syllable tokenizer.
+"""
+import random
+from syltippy import syllabize
+from app.core.constants import Constants as AppConstants
+from app.core.tokenizer import MAX_WORD_LENGTH, SyllableTokenizer, normalize_spanish_letters
+from tests.constants import Constants
+
+
+def _character_loop_tokenize(text: str) -> list[str]:
+    """
+    Reference implementation that builds the words one character at a time.
+    """
+    symbols = []
+    index = 0
+    while index < len(text):
+        if text[index] not in AppConstants.LETTERS.value:
+            symbols.append(text[index])
+            index += 1
+        else:
+            word = ""
+            while index < len(text) and text[index] in AppConstants.LETTERS.value:
+                word += text[index]
+                index += 1
+            symbols.extend(syllabize(word)[0])
+    return symbols
+
+
+def test_tokenize_separate_syllables_text():
+    """
+    Test the syllables of Constants.TEXT_SEPARATE_SYLLABLES.
+    """
+    tokenizer = SyllableTokenizer()
+    assert tokenizer.tokenize(Constants.TEXT_SEPARATE_SYLLABLES.value) == [
+        "com", "pi", "lar", " ", "com", "pi", "la", "do", "res", " ", "com", "pi", "la", "dos"]
+
+
+def test_same_symbols_as_character_loop():
+    """
+    Test that the tokenizer gives the same symbols as separating the words character by character.
+    """
+    rng = random.Random(0)
+    words = ["compilador", "Árbol", "pingüino", "ñandú", "código", "Huffman", "a", "ESPAÑA"]
+    separators = [" ", ", ", ".\n", "¿", "?", "1", "\t", "—", "😀"]
+    tokenizer = SyllableTokenizer()
+    for _ in range(200):
+        text = "".join(rng.choice(words) + rng.choice(separators)
+                       for _ in range(rng.randint(0, 10)))
+        text = rng.choice(["", "123", " "]) + text
+        assert tokenizer.tokenize(text) == _character_loop_tokenize(text)
+
+
+def test_long_word_separated_in_pieces():
+    """
+    Test that a word longer than MAX_WORD_LENGTH is syllabified in pieces of that length.
+    """
+    word = "ca" * MAX_WORD_LENGTH + "sa"
+    tokenizer = SyllableTokenizer()
+    assert tokenizer.tokenize(word + " ") == (list(syllabize(word[:MAX_WORD_LENGTH])[0]) * 2
+                                              + list(syllabize("sa")[0]) + [" "])
+
+
+def test_cache_counters():
+    """
+    Test that repeated words are served from the cache.
+    """
+    tokenizer = SyllableTokenizer()
+    tokenizer.tokenize("casa perro casa casa gato perro")
+
+    info = tokenizer.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (3, 3, 3)
+    assert tokenizer.hit_rate == 0.5
+
+    tokenizer.clear_cache()
+    assert tokenizer.hit_rate == 0.0
+
+
+def test_cache_is_bounded():
+    """
+    Test that the cache does not keep more words than its size.
+    """
+    tokenizer = SyllableTokenizer(cache_size=2)
+    tokenizer.tokenize("uno dos tres cuatro")
+    assert tokenizer.cache_info().currsize == 2
+
+
+def test_normalize_spanish_letters():
+    """
+    Test that the text is reduced to the uppercase letters of the letter frequency in Spanish.
+    """
+    assert normalize_spanish_letters("¡Pingüino, acción y año 2024!") == "PINGUINOACCIONYAÑO"
+    assert normalize_spanish_letters("ÁÉÍÓÚÜáéíóúü") == "AEIOUUAEIOUU"
+    assert normalize_spanish_letters("") == ""
+
+
+def test_normalize_spanish_letters_matches_replace_chain():
+    """
+    Test that the translation table gives the same letters as the chained replacements.
+    """
+    text = Constants.TEXT_1.value + Constants.TEXT_2.value
+    expected = text.upper()
+    for accented, letter in zip("ÁÉÍÓÚÜ", "AEIOUU"):
+        expected = expected.replace(accented, letter)
+    expected = "".join(char for char in expected if char.isalpha())
+    assert normalize_spanish_letters(text) == expected
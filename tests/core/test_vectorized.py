@@ -0,0 +1,77 @@
+"""
+This module contains tests for the NumPy encoding engine.
+"""
+import random
+import pytest
+from app.core import vectorized
+from app.core.encoder import HuffmanEncoder
+from tests.constants import Constants
+
+pytest.importorskip("numpy")
+
+python_encoder = HuffmanEncoder(vectorize_min_size=1 << 62)
+numpy_encoder = HuffmanEncoder(vectorize_min_size=0)
+
+
+def _random_text(rng: random.Random, size: int) -> str:
+    """
+    Returns a text with skewed frequencies, accents, astral characters and a lone surrogate.
+    """
+    alphabet = list("abcdefghij klmnñopqrstuvwxyzáéí,.😀\ud800")
+    return "".join(rng.choices(alphabet, weights=range(1, len(alphabet) + 1), k=size))
+
+
+@pytest.mark.parametrize("text", [Constants.TEXT_1.value, Constants.TEXT_2.value, "a", "ab" * 7])
+def test_same_result_as_python_path(text):
+    """
+    Test that the vectorized engine gives the same map, encoded text and packed codes.
+    """
+    for canonical in (False, True):
+        expected_map, expected_text = python_encoder.encode_text(text, canonical)
+        enc_map, encoded_text = numpy_encoder.encode_text(text, canonical)
+        assert enc_map.map == expected_map.map
+        assert encoded_text == expected_text
+
+        expected_map, expected_packed = python_encoder.encode_text_packed(text, canonical)
+        enc_map, packed = numpy_encoder.encode_text_packed(text, canonical)
+        assert enc_map.map == expected_map.map
+        assert packed == expected_packed
+
+
+def test_random_texts_across_chunks(monkeypatch):
+    """
+    Test random texts whose codes cross the chunks and the bytes of the output.
+    """
+    monkeypatch.setattr(vectorized, "CHUNK_SYMBOLS", 7)
+    monkeypatch.setattr(vectorized, "FIRST_SEEN_CHUNK", 5)
+    rng = random.Random(13)
+    for _ in range(50):
+        text = _random_text(rng, rng.randint(1, 300))
+        max_code_length = rng.choice([None, 6])
+        assert numpy_encoder.encode_text(text, max_code_length=max_code_length) == \
+            python_encoder.encode_text(text, max_code_length=max_code_length)
+        assert numpy_encoder.encode_text_packed(text, max_code_length=max_code_length) == \
+            python_encoder.encode_text_packed(text, max_code_length=max_code_length)
+
+
+def test_count_characters_breaks_ties_by_first_appearance():
+    """
+    Test that the characters with the same frequency keep the order in which they appear.
+    """
+    text = "cbaabc" + "d" * 3 + "e"
+    nodes = vectorized.count_characters(text, vectorized.code_points(text))
+    assert nodes == [("d", 3), ("c", 2), ("b", 2), ("a", 2), ("e", 1)]
+
+
+def test_small_texts_use_python_path(monkeypatch):
+    """
+    Test that the texts shorter than the threshold are not encoded with NumPy.
+    """
+    def fail(*args):
+        raise AssertionError("The vectorized engine was used")
+
+    monkeypatch.setattr(vectorized, "code_points", fail)
+    encoder = HuffmanEncoder(vectorize_min_size=100)
+    enc_map, _ = encoder.encode_text(Constants.TEXT_1.value[:99])
+    assert enc_map.map
+    assert encoder.encode_text("") == python_encoder.encode_text("")
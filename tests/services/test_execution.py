@@ -0,0 +1,77 @@
+"""
+This module contains tests for the execution backend and the monitor of the event loop lag.
+"""
+import asyncio
+import pickle
+import time
+import pytest
+from app.services.decoder_service import decoder_service
+from app.services.encoder_service import encoder_service
+from app.services.execution import ExecutionBackend, LoopLagMonitor
+from tests.constants import Constants
+
+
+@pytest.mark.parametrize("size, where", [(0, "inline"), (99, "inline"), (100, "thread"),
+                                         (999, "thread"), (1000, "process")])
+def test_auto_mode_selects_by_size(size, where):
+    """
+    Test that the "auto" mode chooses the place of the work by the size of the input.
+    """
+    backend = ExecutionBackend("auto", inline_max_size=100, process_min_size=1000)
+    assert backend.select(size) == where
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_fixed_modes_ignore_size(mode):
+    """
+    Test that the other modes always use the same place.
+    """
+    backend = ExecutionBackend(mode)
+    assert backend.select(0) == backend.select(1 << 30) == mode
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_services_give_the_same_result_in_every_mode(mode):
+    """
+    Test that the services encode and decode the same in the event loop, a thread or a process.
+    """
+    encoder = encoder_service("huffman")
+    decoder = decoder_service("huffman")
+    encoder.backend = decoder.backend = ExecutionBackend(mode)
+
+    async def roundtrip():
+        response = await encoder.encode(Constants.TEXT_1.value, False, False)
+        decoded = await decoder.decode(response.encoded_text, response.encoding_map)
+        return response, decoded
+
+    response, decoded = asyncio.run(roundtrip())
+    assert response.encoding_map == Constants.ENC_MAP_1.value
+    assert decoded.decoded_text == Constants.TEXT_1.value
+
+
+def test_services_are_sent_by_algorithm():
+    """
+    Test that a service is pickled as the name of its algorithm.
+    """
+    service = pickle.loads(pickle.dumps(encoder_service("huffman")))
+    assert service.algorithm == "huffman"
+    assert service.encoder is encoder_service("huffman").encoder
+
+
+def test_loop_lag_monitor_records_blocking():
+    """
+    Test that blocking the event loop is measured as lag.
+    """
+    monitor = LoopLagMonitor(interval=0.01, warning=10)
+
+    async def block():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+    asyncio.run(block())
+    assert monitor.count >= 1
+    assert monitor.max >= 0.05
+    assert monitor.total >= monitor.max
@@ -0,0 +1,109 @@
+"""
+This module contains tests for the encoding session, which encodes a text as it is edited.
+"""
+import random
+import pytest
+from app.services.encoder_service import encoder_service
+from app.services.session_service import EncodingSession, common_prefix_length
+from tests.constants import Constants
+
+service = encoder_service("huffman")
+
+
+class Replica:
+    """
+    Applies the changes of a session, as the page does.
+    """
+
+    def __init__(self):
+        self.encoding_map = {}
+        self.encoded_text = ""
+
+    def apply(self, diff):
+        if diff.encoding_map.reset:
+            self.encoding_map = {}
+        for symbol in diff.encoding_map.removed:
+            del self.encoding_map[symbol]
+        self.encoding_map.update(diff.encoding_map.updated)
+        self.encoded_text = self.encoded_text[:diff.encoded_text.start] + diff.encoded_text.text
+
+
+def assert_same_as_service(replica, text, separate_syllables, use_spanish_frequencies):
+    response = service.encode_sync(text, separate_syllables, use_spanish_frequencies)
+    assert replica.encoded_text == response.encoded_text
+    assert replica.encoding_map == response.encoding_map
+
+
+@pytest.mark.parametrize("first, second, length", [("", "", 0), ("abc", "", 0), ("abc", "abd", 2),
+                                                   ("abc", "abcdef", 3), ("xbc", "abc", 0)])
+def test_common_prefix_length(first, second, length):
+    """
+    Test the length of the common prefix of two strings.
+    """
+    assert common_prefix_length(first, second) == length
+
+
+@pytest.mark.parametrize("separate_syllables, use_spanish_frequencies",
+                         [(False, False), (True, False), (False, True)])
+def test_typing_gives_the_same_encoding_as_the_service(separate_syllables,
+                                                       use_spanish_frequencies):
+    """
+    Test that a text typed character by character and then erased is encoded as by the service
+    after every edit.
+    """
+    session, replica = EncodingSession(service.encoder), Replica()
+    text = Constants.TEXT_SEPARATE_SYLLABLES.value + ", ¿y el ñandú?"
+    edits = [text[:end] for end in range(len(text) + 1)] + \
+        [text[:end] for end in range(len(text), -1, -3)]
+    for edit in edits:
+        replica.apply(session.update(edit, separate_syllables, use_spanish_frequencies))
+        assert_same_as_service(replica, edit, separate_syllables, use_spanish_frequencies)
+
+
+def test_random_edits_and_options():
+    """
+    Test that random insertions, deletions and changes of the options are encoded as by the
+    service.
+    """
+    generator = random.Random(7)
+    alphabet = "holá mundo ñandú, ¿qué tal? camión\n"
+    session, replica = EncodingSession(service.encoder), Replica()
+    text, options = "", (False, False)
+    for step in range(500):
+        position = generator.randint(0, len(text))
+        if generator.random() < 0.6:
+            inserted = "".join(generator.choices(alphabet, k=generator.randint(1, 5)))
+            text = text[:position] + inserted + text[position:]
+        else:
+            text = text[:position] + text[position + generator.randint(1, 5):]
+        if step % 40 == 0:
+            options = generator.choice([(False, False), (True, False), (False, True), (True, True)])
+        replica.apply(session.update(text, *options))
+        assert_same_as_service(replica, text, *options)
+
+
+def test_append_sends_only_the_new_codes():
+    """
+    Test that an edit that keeps the codes sends only the codes after the edit.
+    """
+    session = EncodingSession(service.encoder)
+    first = session.update("abab", False, False)
+    assert first.encoding_map.reset
+    assert first.encoded_text.start == 0
+
+    diff = session.update("ababab", False, False)
+    assert not diff.encoding_map.reset
+    assert diff.encoding_map.updated == {} and diff.encoding_map.removed == []
+    assert diff.encoded_text.start == len(first.encoded_text.text)
+    assert diff.encoded_text.text == " " + " ".join(first.encoded_text.text.split()[:2])
+
+
+def test_changing_the_options_resets_the_encoding_map():
+    """
+    Test that a change of the options discards the previous encoding map.
+    """
+    session = EncodingSession(service.encoder)
+    session.update("hola", False, False)
+    diff = session.update("hola", False, True)
+    assert diff.encoding_map.reset
+    assert diff.encoding_map.updated == dict(service.encoder.spanish_codebook.encoding_map())
@@ -0,0 +1,57 @@
+"""
+This module contains tests for the command-line interface.
+"""
+import pytest
+from app.cli import main
+from app.core.block_container import read_container
+from app.core.pretrained import PretrainedRegistry
+
+DATA = bytes(range(256)) + "El pingüino Wenceslao hizo kilómetros bajo exhaustiva lluvia".encode() * 50
+
+
+@pytest.mark.parametrize("window", [1, 100, 4096, 1 << 20])
+@pytest.mark.parametrize("data", [b"", b"a", b"aaaa", DATA])
+def test_compress_and_decompress(tmp_path, capsys, window, data):
+    """
+    Test that a file is decompressed back to the same bytes, with a block per window.
+    """
+    source, compressed, decompressed = tmp_path / "in", tmp_path / "in.huf", tmp_path / "out"
+    source.write_bytes(data)
+
+    assert main(["compress", str(source), str(compressed), "--window", str(window)]) == 0
+    container = read_container(compressed.read_bytes())
+    assert len(container.blocks) == -(-len(data) // window)
+    assert main(["decompress", str(compressed), str(decompressed)]) == 0
+    assert decompressed.read_bytes() == data
+    assert "MB/s, peak RSS" in capsys.readouterr().err
+
+
+def test_decompress_invalid_container(tmp_path, capsys):
+    """
+    Test that a file that is not a container is reported as an error.
+    """
+    source = tmp_path / "in"
+    source.write_bytes(DATA)
+    compressed = tmp_path / "in.huf"
+    main(["compress", str(source), str(compressed)])
+    corrupted = bytearray(compressed.read_bytes())
+    corrupted[-1] ^= 0xFF
+    compressed.write_bytes(bytes(corrupted))
+
+    assert main(["decompress", str(source), str(tmp_path / "out")]) == 1
+    assert main(["decompress", str(compressed), str(tmp_path / "out")]) == 1
+    assert "Invalid container" in capsys.readouterr().err
+
+
+def test_train(tmp_path, capsys):
+    """
+    Test that a codebook is trained from the files of a corpus and written to the directory.
+    """
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_bytes(DATA)
+    assert main(["train", "test", str(corpus), "--tokenizer", "syllables",
+                 "--output", str(tmp_path)]) == 0
+    codebook = PretrainedRegistry(str(tmp_path)).get("test")
+    assert codebook.tokenizer == "syllables"
+    assert "güi" in codebook.encoding_map
+    assert "bytes of corpus" in capsys.readouterr().err